@@ -0,0 +1,244 @@
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from docgen.cache import render_cache
+
+# Defaults for the artifact store, overridable from the environment
+DEFAULT_MEMORY_BYTES = 32 * 1024 * 1024
+DEFAULT_DISK_BYTES = 512 * 1024 * 1024
+DEFAULT_TTL = 15 * 60
+
+# Expired entries are swept at most this often, in seconds
+SWEEP_INTERVAL = 5.0
+
+
+# One rendered document: its bytes while in memory, or the file it was spilled to
+class Artifact:
+    __slots__ = ("size", "data", "path", "sessions")
+
+    def __init__(self, data):
+        self.size = len(data)
+        self.data = data
+        self.path = None
+        # session id -> expiry time of that session's reference
+        self.sessions = {}
+
+
+# Whether a Streamlit session is still connected. Outside a running Streamlit
+# server there are no sessions to end.
+def session_active(session):
+    try:
+        from streamlit import runtime
+    except ImportError:
+        return True
+    return not runtime.exists() or runtime.get_instance().is_active_session(session)
+
+
+# Rendered documents handed out to sessions for download. Every session that
+# downloads a document holds a reference to it that expires `ttl` seconds after
+# its last use, or when the session ends, and a document is dropped once no
+# session refers to it.
+#
+# Documents are held in memory up to a global budget shared by all sessions;
+# beyond it the least recently used ones are spilled to temporary files and
+# read back for each download from then on. Bytes that `shared` (the render
+# cache) also holds cost nothing extra, so they are neither counted against
+# the budget nor spilled; once the cache evicts them they count like any
+# other. Memory-resident documents are handed out as the stored bytes object
+# itself; Streamlit keeps whatever it is handed in its own media storage.
+class ArtifactStore:
+    def __init__(self, max_memory=DEFAULT_MEMORY_BYTES, max_disk=DEFAULT_DISK_BYTES, ttl=DEFAULT_TTL, spill_dir=None,
+                 shared=None, session_active=session_active):
+        self.max_memory = max_memory
+        self.max_disk = max_disk
+        self.ttl = ttl
+        self.spill_dir = spill_dir
+        self.shared = shared
+        self.session_active = session_active
+        self._own_dir = None
+        self._entries = OrderedDict()
+        self._memory = 0
+        self._disk = 0
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        self.spills = 0
+        self.expired = 0
+        self.dropped = 0
+
+    # Build the store from DOCGEN_ARTIFACT_MEMORY_MB, DOCGEN_ARTIFACT_DISK_MB,
+    # DOCGEN_ARTIFACT_TTL and DOCGEN_ARTIFACT_DIR
+    @classmethod
+    def from_env(cls, environ=os.environ, shared=None):
+        memory_mb = environ.get("DOCGEN_ARTIFACT_MEMORY_MB")
+        disk_mb = environ.get("DOCGEN_ARTIFACT_DISK_MB")
+        ttl = environ.get("DOCGEN_ARTIFACT_TTL")
+        return cls(
+            max_memory=int(float(memory_mb) * 1024 * 1024) if memory_mb else DEFAULT_MEMORY_BYTES,
+            max_disk=int(float(disk_mb) * 1024 * 1024) if disk_mb else DEFAULT_DISK_BYTES,
+            ttl=float(ttl) if ttl else DEFAULT_TTL,
+            spill_dir=environ.get("DOCGEN_ARTIFACT_DIR") or None,
+            shared=shared,
+        )
+
+    # The bytes stored under `key`, renewing `session`'s reference, or None
+    # when they are not stored. Spilled documents are read back from disk.
+    def get(self, key, session=None):
+        self.sweep()
+        with self._lock:
+            artifact = self._entries.get(key)
+            if artifact is None:
+                return None
+            self._entries.move_to_end(key)
+            self._refer(artifact, session)
+            if artifact.data is not None:
+                return artifact.data
+            path = artifact.path
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    # Store a document for `session` and return the bytes to hand out
+    def put(self, key, data, session=None):
+        if hasattr(data, "getvalue"):
+            data = data.getvalue()
+        data = bytes(data)
+        with self._lock:
+            artifact = self._entries.get(key)
+            if artifact is None:
+                artifact = self._entries[key] = Artifact(data)
+                self._memory += artifact.size
+            self._entries.move_to_end(key)
+            self._refer(artifact, session)
+            self._enforce_budget()
+        self.sweep()
+        return data
+
+    def _refer(self, artifact, session):
+        artifact.sessions[session] = time.monotonic() + self.ttl
+
+    def _shared(self, key, artifact):
+        return self.shared is not None and self.shared.holds(key, artifact.data)
+
+    # Bytes held in memory by this store alone
+    def _exclusive(self):
+        return sum(artifact.size for key, artifact in self._entries.items()
+                   if artifact.data is not None and not self._shared(key, artifact))
+
+    # Spill the least recently used in-memory documents nobody else holds until
+    # the memory budget holds, then drop the oldest spilled ones while over the
+    # disk budget
+    def _enforce_budget(self):
+        exclusive = self._exclusive()
+        if exclusive > self.max_memory:
+            for key, artifact in list(self._entries.items()):
+                if exclusive <= self.max_memory:
+                    break
+                if artifact.data is not None and not self._shared(key, artifact) and self._spill(key, artifact):
+                    exclusive -= artifact.size
+        while self._disk > self.max_disk:
+            key = next((key for key, artifact in self._entries.items() if artifact.path), None)
+            if key is None:
+                break
+            self._remove(key)
+            self.dropped += 1
+
+    def _spill(self, key, artifact):
+        directory = self._directory()
+        fd, path = tempfile.mkstemp(prefix=key[:16] + ".", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(artifact.data)
+        except OSError:
+            # Spilling is best effort; an unwritable disk keeps the document in memory
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return False
+        artifact.path = path
+        artifact.data = None
+        self._memory -= artifact.size
+        self._disk += artifact.size
+        self.spills += 1
+        return True
+
+    def _directory(self):
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            return self.spill_dir
+        if self._own_dir is None:
+            self._own_dir = tempfile.mkdtemp(prefix="docgen-artifacts-")
+            atexit.register(shutil.rmtree, self._own_dir, True)
+        return self._own_dir
+
+    def _remove(self, key):
+        artifact = self._entries.pop(key)
+        if artifact.data is not None:
+            self._memory -= artifact.size
+        else:
+            self._disk -= artifact.size
+            try:
+                os.remove(artifact.path)
+            except OSError:
+                pass
+
+    # Drop expired session references and those of sessions that have ended,
+    # and every document no session refers to
+    def sweep(self, force=False):
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_sweep < SWEEP_INTERVAL:
+                return
+            self._last_sweep = now
+            sessions = {session for artifact in self._entries.values() for session in artifact.sessions}
+        ended = {session for session in sessions if session is not None and not self.session_active(session)}
+        with self._lock:
+            for key in list(self._entries):
+                references = self._entries[key].sessions
+                for session, expires in list(references.items()):
+                    if expires <= now or session in ended:
+                        del references[session]
+                if not references:
+                    self._remove(key)
+                    self.expired += 1
+
+    # Forget everything a session refers to, e.g. when it ends
+    def release_session(self, session):
+        with self._lock:
+            for artifact in self._entries.values():
+                artifact.sessions.pop(session, None)
+        self.sweep(force=True)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "spilled_entries": sum(1 for artifact in self._entries.values() if artifact.path),
+                "memory_bytes": self._exclusive(),
+                "shared_bytes": self._memory - self._exclusive(),
+                "disk_bytes": self._disk,
+                "max_memory_bytes": self.max_memory,
+                "max_disk_bytes": self.max_disk,
+                "ttl_seconds": self.ttl,
+                "sessions": len({session for artifact in self._entries.values() for session in artifact.sessions}),
+                "spills": self.spills,
+                "expired": self.expired,
+                "dropped": self.dropped,
+            }
+
+
+# Process-wide store shared by all sessions; bytes the render cache holds too
+# are not counted twice
+artifact_store = ArtifactStore.from_env(shared=render_cache)
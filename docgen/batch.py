@@ -0,0 +1,167 @@
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from docgen.documents import build_inputs, document_types, get_document_type
+from docgen.render import render_bytes
+
+FORMATS = ("txt", "pdf", "docx")
+
+# PDF and Word files are already compressed, so the zip only deflates text
+ZIP_COMPRESSION = {"txt": zipfile.ZIP_DEFLATED, "csv": zipfile.ZIP_DEFLATED, "pdf": zipfile.ZIP_STORED,
+                   "docx": zipfile.ZIP_STORED}
+
+# Every zip member gets this timestamp (the earliest zip allows) instead of the
+# time it was written, so archives of identical documents are identical bytes
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+# Read per-company inputs from a CSV (one column per field) or JSONL file, one row at a time
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith((".jsonl", ".ndjson")):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            for row in csv.DictReader(f):
+                # Empty cells fall back to the form defaults
+                yield {field: value for field, value in row.items() if field and value not in (None, "")}
+
+
+# Render one document in every requested format; runs inside a worker process
+def render_document(doc_type, values, formats):
+    doc = get_document_type(doc_type)
+    inputs = build_inputs(doc, values)
+    outline = doc.generate(inputs)
+    return doc.file_stem(inputs), {fmt: render_bytes(outline, fmt) for fmt in formats}
+
+
+# Zip member `name` holding a file of format `fmt`, with a fixed timestamp
+def zip_entry(name, fmt):
+    entry = zipfile.ZipInfo(name, ZIP_DATE_TIME)
+    entry.compress_type = ZIP_COMPRESSION[fmt]
+    entry.external_attr = 0o100644 << 16
+    return entry
+
+
+def safe_name(stem):
+    return re.sub(r"[^\w.-]+", "_", stem).strip("_") or "document"
+
+
+# Write rendered files either into a directory or into a single zip archive
+class OutputWriter:
+    def __init__(self, target):
+        self.zip = None
+        if target.lower().endswith(".zip"):
+            self.zip = zipfile.ZipFile(target, "w", compression=zipfile.ZIP_DEFLATED)
+        else:
+            os.makedirs(target, exist_ok=True)
+        self.target = target
+
+    def write(self, name, data, fmt):
+        if self.zip is not None:
+            self.zip.writestr(zip_entry(name, fmt), data)
+        else:
+            with open(os.path.join(self.target, name), "wb") as f:
+                f.write(data)
+
+    def close(self):
+        if self.zip is not None:
+            self.zip.close()
+
+
+def report_progress(done, failed, started, stream):
+    elapsed = time.perf_counter() - started
+    rate = done / elapsed if elapsed else 0.0
+    stream.write(f"\r{done} documents, {failed} failed, {rate:.1f} docs/s")
+    stream.flush()
+
+
+# Render every row of `input_path` across a process pool and return a summary
+def run_batch(doc_type, input_path, output, formats=FORMATS, workers=None, stream=sys.stderr):
+    get_document_type(doc_type)
+    workers = workers or os.cpu_count() or 1
+    writer = OutputWriter(output)
+    started = time.perf_counter()
+    done = failed = files = size = 0
+    pending = {}
+    last_report = 0.0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = enumerate(read_rows(input_path), start=1)
+            exhausted = False
+            while pending or not exhausted:
+                # Keep a bounded number of rows in flight so huge inputs are streamed
+                while not exhausted and len(pending) < workers * 4:
+                    try:
+                        number, values = next(rows)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending[pool.submit(render_document, doc_type, values, formats)] = number
+                if not pending:
+                    break
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    number = pending.pop(future)
+                    try:
+                        stem, outputs = future.result()
+                    except Exception as e:
+                        failed += 1
+                        stream.write(f"\nrow {number}: {e}\n")
+                        continue
+                    for fmt, data in outputs.items():
+                        writer.write(f"{number:05d}_{safe_name(stem)}.{fmt}", data, fmt)
+                        files += 1
+                        size += len(data)
+                    done += 1
+                # Refresh the progress line at most a few times per second
+                if time.perf_counter() - last_report > 0.25:
+                    report_progress(done, failed, started, stream)
+                    last_report = time.perf_counter()
+    finally:
+        writer.close()
+    report_progress(done, failed, started, stream)
+    stream.write("\n")
+    elapsed = time.perf_counter() - started
+    return {
+        "documents": done,
+        "failed": failed,
+        "files": files,
+        "bytes": size,
+        "seconds": round(elapsed, 3),
+        "documents_per_second": round(done / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m docgen.batch",
+        description="Generate documents in bulk from a CSV or JSONL file of per-company inputs.",
+    )
+    parser.add_argument("doc_type", choices=sorted(document_types()), help="document type to generate")
+    parser.add_argument("input", help="CSV or JSONL file, one document per row; list fields are separated by ';'")
+    parser.add_argument("-o", "--output", default="output", help="output directory, or a path ending in .zip")
+    parser.add_argument("-f", "--formats", default=",".join(FORMATS), help="comma separated formats (txt,pdf,docx)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    formats = tuple(fmt.strip() for fmt in args.formats.split(",") if fmt.strip())
+    unknown = set(formats) - set(FORMATS)
+    if unknown or not formats:
+        parser.error(f"unsupported format(s): {', '.join(sorted(unknown)) or 'none given'}")
+
+    summary = run_batch(args.doc_type, args.input, args.output, formats=formats, workers=args.workers)
+    print(json.dumps(summary))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
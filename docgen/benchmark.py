@@ -0,0 +1,263 @@
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+from docgen.cache import CACHE_VERSION
+from docgen.clauses import clause_library
+from docgen.deadlines import rule_table
+from docgen.documents import DOCUMENT_TYPES, build_inputs, document_types, get_document_type
+from docgen.render import render_bytes
+
+FORMATS = ("txt", "pdf", "docx")
+
+# Metrics compared against a baseline, and the slowdown that counts as a regression.
+# Differences below MIN_DELTA_MS are timer noise on sub-millisecond benchmarks.
+COMPARED = ("p50_ms", "p90_ms")
+DEFAULT_THRESHOLD = 1.25
+MIN_DELTA_MS = 0.05
+
+_SENTENCE = ("We review this practice regularly and update it whenever our services, suppliers or legal "
+             "obligations change, and we keep records of every change we make. ")
+
+_SERVICES = ("Google Analytics", "Stripe", "Mailchimp", "Salesforce", "Zendesk", "Amazon Web Services",
+             "HubSpot", "Intercom", "Segment", "Twilio")
+
+
+# Inputs for each scenario, built from the form defaults of a document type.
+# A scenario returns None when it does not apply to the document type.
+def default_form(doc):
+    return doc.default_inputs()
+
+
+# Every free-text field filled with a few paragraphs, as pasted from an existing policy
+def long_text(doc):
+    values = doc.default_inputs()
+    for field, value in values.items():
+        if isinstance(value, str) and field not in ("company_name", "website_url", "contact_email"):
+            values[field] = value + " " + _SENTENCE * 12
+    return values
+
+
+# Long lists of data types, purposes and third parties
+def many_third_parties(doc):
+    if not doc.LIST_FIELDS:
+        return None
+    values = doc.default_inputs()
+    for field in doc.LIST_FIELDS:
+        if field in ("jurisdictions", "notify_jurisdictions"):
+            continue
+        values[field] = [f"{_SERVICES[i % len(_SERVICES)]} {i + 1}" for i in range(200)]
+    if "third_party_sharing" in values:
+        values["third_party_sharing"] = "Yes"
+    return values
+
+
+# Every jurisdiction in the clause library (or the breach notification rules)
+# selected, with every data type
+def all_jurisdictions(doc):
+    values = doc.default_inputs()
+    if "notify_jurisdictions" in values:
+        values["notify_jurisdictions"] = list(rule_table().jurisdictions)
+        return values
+    if "jurisdictions" not in values:
+        return None
+    values["jurisdictions"] = list(clause_library().jurisdictions)
+    if "data_types" in values:
+        values["data_types"] = ['Personal Information', 'Email Address', 'Payment Information', 'Usage Data',
+                                'Cookies', 'IP Address']
+    return values
+
+
+# Enough text in every field to produce documents that run over many pages
+def multi_page(doc):
+    values = long_text(doc)
+    for field, value in values.items():
+        if isinstance(value, str) and field not in ("company_name", "website_url", "contact_email"):
+            values[field] = value + " " + _SENTENCE * 60
+    return values
+
+
+SCENARIOS = {
+    "default": default_form,
+    "long_text": long_text,
+    "many_third_parties": many_third_parties,
+    "all_jurisdictions": all_jurisdictions,
+    "multi_page": multi_page,
+}
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# Time `func` over `iterations` runs after `warmup` untimed runs, then measure
+# the allocations of one more run with tracemalloc (kept out of the timings)
+def measure(func, iterations, warmup):
+    started = time.perf_counter()
+    result = func()
+    first = time.perf_counter() - started
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(iterations):
+            started = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - started)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        func()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    allocated = sum(stat.size for stat in snapshot.statistics("filename"))
+
+    ms = [sample * 1000 for sample in samples]
+    return result, {
+        "iterations": iterations,
+        "first_ms": round(first * 1000, 4),
+        "min_ms": round(min(ms), 4),
+        "mean_ms": round(statistics.fmean(ms), 4),
+        "p50_ms": round(percentile(ms, 0.50), 4),
+        "p90_ms": round(percentile(ms, 0.90), 4),
+        "p99_ms": round(percentile(ms, 0.99), 4),
+        "max_ms": round(max(ms), 4),
+        "peak_alloc_bytes": peak,
+        "retained_alloc_bytes": allocated,
+    }
+
+
+# Benchmark every scenario, document type and format; results are keyed
+# "scenario/doc_type/stage", where the stage is "outline" or a format
+def run_benchmarks(scenarios=tuple(SCENARIOS), doc_types=tuple(DOCUMENT_TYPES), formats=FORMATS,
+                   iterations=50, warmup=5, stream=sys.stderr):
+    results = {}
+    for scenario in scenarios:
+        for doc_type in doc_types:
+            doc = get_document_type(doc_type)
+            values = SCENARIOS[scenario](doc)
+            if values is None:
+                continue
+            inputs = build_inputs(doc, values)
+            outline, stats = measure(lambda: doc.generate(inputs), iterations, warmup)
+            stats["output_bytes"] = len(render_bytes(outline, "txt"))
+            results[f"{scenario}/{doc_type}/outline"] = stats
+            for fmt in formats:
+                data, stats = measure(lambda: render_bytes(outline, fmt), iterations, warmup)
+                stats["output_bytes"] = len(data)
+                results[f"{scenario}/{doc_type}/{fmt}"] = stats
+            if stream:
+                stream.write(f"{scenario}/{doc_type} done\n")
+                stream.flush()
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cache_version": CACHE_VERSION,
+            "iterations": iterations,
+            "warmup": warmup,
+        },
+        "results": results,
+    }
+
+
+# Rows of (key, metric, baseline, current, ratio) for every result slower than
+# `threshold` times its baseline and at least `min_delta` ms slower
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD, min_delta=MIN_DELTA_MS):
+    regressions = []
+    for key, stats in current["results"].items():
+        base = baseline["results"].get(key)
+        if not base:
+            continue
+        for metric in COMPARED:
+            if stats[metric] - base[metric] < min_delta or base[metric] <= 0:
+                continue
+            if stats[metric] / base[metric] > threshold:
+                regressions.append((key, metric, base[metric], stats[metric], stats[metric] / base[metric]))
+    return regressions
+
+
+def format_table(report, baseline=None):
+    lines = [f"{'benchmark':<48}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'peak KiB':>10}{'bytes':>10}"
+             + (f"{'vs base':>9}" if baseline else "")]
+    for key, stats in report["results"].items():
+        line = (f"{key:<48}{stats['p50_ms']:>10.3f}{stats['p90_ms']:>10.3f}{stats['p99_ms']:>10.3f}"
+                f"{stats['peak_alloc_bytes'] / 1024:>10.1f}{stats['output_bytes']:>10}")
+        base = baseline["results"].get(key) if baseline else None
+        if base and base["p50_ms"] > 0:
+            line += f"{stats['p50_ms'] / base['p50_ms']:>8.2f}x"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _choices(value, allowed, parser, what):
+    chosen = tuple(item.strip() for item in value.split(",") if item.strip())
+    unknown = set(chosen) - set(allowed)
+    if unknown or not chosen:
+        parser.error(f"unknown {what}: {', '.join(sorted(unknown)) or 'none given'}")
+    return chosen
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m docgen.benchmark",
+        description="Benchmark document generation and TXT/PDF/Word rendering across realistic inputs.",
+    )
+    parser.add_argument("-s", "--scenarios", default=",".join(SCENARIOS), help="comma separated scenarios")
+    parser.add_argument("-t", "--types", default=",".join(DOCUMENT_TYPES), help="comma separated document types")
+    parser.add_argument("-f", "--formats", default=",".join(FORMATS), help="comma separated formats (txt,pdf,docx)")
+    parser.add_argument("-n", "--iterations", type=int, default=50, help="timed runs per benchmark")
+    parser.add_argument("--warmup", type=int, default=5, help="untimed runs before timing")
+    parser.add_argument("-o", "--save", help="write the results to this JSON file, e.g. as a new baseline")
+    parser.add_argument("-c", "--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"slowdown ratio that counts as a regression (default {DEFAULT_THRESHOLD})")
+    parser.add_argument("--min-delta", type=float, default=MIN_DELTA_MS,
+                        help=f"ignore slowdowns smaller than this many ms (default {MIN_DELTA_MS})")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(
+        scenarios=_choices(args.scenarios, SCENARIOS, parser, "scenario(s)"),
+        doc_types=_choices(args.types, document_types(), parser, "document type(s)"),
+        formats=_choices(args.formats, FORMATS, parser, "format(s)"),
+        iterations=max(1, args.iterations),
+        warmup=max(0, args.warmup),
+    )
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print(format_table(report, baseline))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    if baseline:
+        regressions = compare(baseline, report, args.threshold, args.min_delta)
+        for key, metric, before, after, ratio in regressions:
+            print(f"REGRESSION {key} {metric}: {before:.3f} -> {after:.3f} ms ({ratio:.2f}x)")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+import io
+import re
+import tempfile
+import zipfile
+
+from docgen.batch import zip_entry
+from docgen.documents import DOCUMENT_TYPES, build_inputs, get_document_type
+from docgen.render import render_bytes
+
+# Every document in the compliance bundle, in the order they are written
+BUNDLE_TYPES = tuple(DOCUMENT_TYPES)
+
+# Fields that mean the same thing in every document that has them
+SHARED_FIELDS = ("company_name", "website_url", "contact_email", "jurisdiction", "effective_date", "jurisdictions")
+
+# Bundles larger than this are spooled to a temporary file instead of memory
+SPOOL_MAX_BYTES = 1024 * 1024
+
+
+# Build each document's inputs from one shared set of company details plus
+# optional per-document overrides ({doc_type: {field: value}})
+def bundle_inputs(shared, overrides=None):
+    overrides = overrides or {}
+    documents = {}
+    for doc_type in BUNDLE_TYPES:
+        doc = get_document_type(doc_type)
+        fields = doc.default_inputs()
+        values = {field: value for field, value in shared.items() if field in fields}
+        values.update(overrides.get(doc_type, {}))
+        documents[doc_type] = build_inputs(doc, values)
+    return documents
+
+
+# Write-only sink that hands back whatever the zip writer produced since the last drain
+class _ChunkSink(io.RawIOBase):
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+# Yield the bundle as zip chunks, rendering one member at a time so only the
+# member being written is ever held in memory
+def iter_bundle(documents, formats):
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w") as archive:
+        for doc_type, inputs in documents.items():
+            doc = get_document_type(doc_type)
+            outline = doc.generate(inputs)
+            stem = re.sub(r"[^\w.-]+", "_", doc.file_stem(inputs)).strip("_") or doc_type
+            for fmt in formats:
+                archive.writestr(zip_entry(f"{stem}.{fmt}", fmt), render_bytes(outline, fmt))
+                yield sink.drain()
+    yield sink.drain()
+
+
+# Stream the bundle into a spooled temporary file and return it rewound,
+# for consumers that need a file object rather than an iterator
+def spool_bundle(documents, formats):
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    for chunk in iter_bundle(documents, formats):
+        spool.write(chunk)
+    spool.seek(0)
+    return spool
+
@@ -0,0 +1,359 @@
+import atexit
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+from docgen.registry import document_registry
+
+# Defaults for the process-wide render cache, overridable from the environment
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_FILE_CACHE_BYTES = 256 * 1024 * 1024
+
+# Mixed into every cache key; bump it whenever templates or renderers change so
+# outputs persisted in the disk tier by an older version are not served. Changes
+# to the data files documents are rendered from change the keys by themselves.
+CACHE_VERSION = 8
+
+# Content hashes are kept for this many times as many outputs as the cache holds
+HASHES_PER_ENTRY = 8
+
+
+# Reduce generator inputs to plain JSON types so equivalent inputs hash alike
+def normalize(value):
+    if isinstance(value, dict):
+        return {str(k): normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(normalize(v) for v in value)
+    if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+        return value.isoformat()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+# Canonical hash of the normalized inputs; lone surrogates are hashed as-is
+# so they cannot make the hash fail
+def input_hash(inputs):
+    payload = json.dumps(normalize(inputs), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+# Content-addressed key for one rendered output, covering the data files the
+# document type is rendered from
+def cache_key(doc_type, digest, fmt):
+    source = document_registry.source_digest(doc_type)
+    return hashlib.sha256(f"{CACHE_VERSION}\0{doc_type}\0{fmt}\0{digest}\0{source}".encode("utf-8")).hexdigest()
+
+
+# Hash of rendered bytes. Rendering is deterministic, so identical documents
+# share it whatever inputs or session produced them.
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+# Strong HTTP entity tag for rendered bytes
+def etag(digest):
+    return f'"{digest}"'
+
+
+# Whether an If-None-Match header value matches the entity tag of `digest`
+def etag_matches(header, digest):
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag(digest) in tags or f"W/{etag(digest)}" in tags
+
+
+# Size-bounded LRU cache of rendered documents shared by every session in the
+# process, with an optional on-disk tier that survives restarts. The content
+# hash of every output is remembered, for a while longer than the output
+# itself, so a client that already has a document can be told so without
+# rendering it again.
+class RenderCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_entries=DEFAULT_MAX_ENTRIES, disk_dir=None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._size = 0
+        self._hashes = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Build the cache from DOCGEN_CACHE_MAX_MB, DOCGEN_CACHE_MAX_ENTRIES and DOCGEN_CACHE_DIR
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        max_mb = environ.get("DOCGEN_CACHE_MAX_MB")
+        max_entries = environ.get("DOCGEN_CACHE_MAX_ENTRIES")
+        return cls(
+            max_bytes=int(float(max_mb) * 1024 * 1024) if max_mb else DEFAULT_MAX_BYTES,
+            max_entries=int(max_entries) if max_entries else DEFAULT_MAX_ENTRIES,
+            disk_dir=environ.get("DOCGEN_CACHE_DIR") or None,
+        )
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key)
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key, data):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            # The disk tier is best effort; the in-memory entry is still valid
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    # Remember the content hash and, when given, the format of the output
+    # under `key`; call with the lock held
+    def _remember(self, key, digest, fmt):
+        known = self._hashes.get(key)
+        self._hashes[key] = (digest, fmt or (known[1] if known else None))
+        self._hashes.move_to_end(key)
+        while len(self._hashes) > self.max_entries * HASHES_PER_ENTRY:
+            self._hashes.popitem(last=False)
+
+    def _store(self, key, data, fmt=None):
+        digest = content_hash(data)
+        with self._lock:
+            self._remember(key, digest, fmt)
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = data
+            self._size += len(data)
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    # Look up rendered bytes, falling back to the disk tier. `fmt`, when
+    # given, is remembered as the format of the output.
+    def get(self, key, fmt=None):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                if fmt and key in self._hashes:
+                    self._remember(key, self._hashes[key][0], fmt)
+                return data
+        data = self._read_disk(key)
+        if data is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.disk_hits += 1
+        self._store(key, data, fmt)
+        return data
+
+    # Whether `key` is cached, without counting a lookup
+    def contains(self, key):
+        with self._lock:
+            if key in self._entries:
+                return True
+        return bool(self.disk_dir) and os.path.exists(self._disk_path(key))
+
+    # Whether the memory tier holds this very bytes object under `key`
+    def holds(self, key, data):
+        with self._lock:
+            return self._entries.get(key) is data
+
+    # Content hash of the output cached under `key`, or None when it has not
+    # been rendered (or was forgotten) in this process
+    def digest(self, key):
+        with self._lock:
+            known = self._hashes.get(key)
+        return known[0] if known else None
+
+    # Format of the output cached under `key`, or None when it is not known
+    # in this process
+    def format(self, key):
+        with self._lock:
+            known = self._hashes.get(key)
+        return known[1] if known else None
+
+    # Cache rendered bytes, optionally with their format, and return them
+    def put(self, key, data, fmt=None):
+        self._store(key, data, fmt)
+        self._write_disk(key, data)
+        return data
+
+    # Return cached bytes for `key`, rendering and storing them on a miss
+    def get_or_render(self, key, render):
+        data = self.get(key)
+        if data is None:
+            data = render()
+            if hasattr(data, "getvalue"):
+                data = data.getvalue()
+            self.put(key, data)
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._hashes.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# Size-bounded LRU cache of rendered outputs kept on disk only, for outputs
+# such as zips that are too large to keep in memory. Outputs are copied to
+# disk in chunks and handed out as open files, which the caller closes; a file
+# being read stays readable after it is evicted.
+class FileCache:
+    def __init__(self, max_bytes=DEFAULT_FILE_CACHE_BYTES, directory=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self._own_dir = None
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Build the cache from DOCGEN_FILE_CACHE_MB and DOCGEN_FILE_CACHE_DIR
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        max_mb = environ.get("DOCGEN_FILE_CACHE_MB")
+        return cls(
+            max_bytes=int(float(max_mb) * 1024 * 1024) if max_mb else DEFAULT_FILE_CACHE_BYTES,
+            directory=environ.get("DOCGEN_FILE_CACHE_DIR") or None,
+        )
+
+    def _directory(self):
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            return self.directory
+        if self._own_dir is None:
+            self._own_dir = tempfile.mkdtemp(prefix="docgen-files-")
+            atexit.register(shutil.rmtree, self._own_dir, True)
+        return self._own_dir
+
+    def _path(self, key):
+        return os.path.join(self._directory(), key)
+
+    # An open file on the output cached under `key`, which the reader closes
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            path = self._path(key)
+        try:
+            return open(path, "rb")
+        except OSError:
+            with self._lock:
+                self._forget(key)
+            return None
+
+    def contains(self, key):
+        with self._lock:
+            return key in self._entries
+
+    # Cache an output given as bytes or a file object, which is consumed and
+    # closed, and return an open file on the cached copy
+    def put(self, key, data):
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            if isinstance(data, (bytes, bytearray, memoryview)):
+                f.write(data)
+            else:
+                with data:
+                    shutil.copyfileobj(data, f)
+            size = f.tell()
+        result = open(tmp, "rb")
+        os.replace(tmp, path)
+        with self._lock:
+            self._forget(key)
+            self._entries[key] = size
+            self._size += size
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                evicted = next(iter(self._entries))
+                self._forget(evicted)
+                self._remove(evicted)
+                self.evictions += 1
+        return result
+
+    def _forget(self, key):
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._size -= size
+
+    def _remove(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._forget(key)
+                self._remove(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# Process-wide cache shared by all sessions and document types
+render_cache = RenderCache.from_env()
+
+# Process-wide disk-only cache for zips too large for the render cache: the
+# compliance bundles and bulk PIA reports
+file_cache = FileCache.from_env()
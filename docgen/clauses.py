@@ -0,0 +1,138 @@
+import functools
+import hashlib
+import json
+import os
+
+from docgen.template import compile_text, fill_text, slot_names
+
+# Clause library shipped with the package
+CLAUSES_PATH = os.path.join(os.path.dirname(__file__), "data", "clauses.json")
+
+# Clauses that every document carries, whatever jurisdictions are selected
+DEFAULT = "default"
+
+# Clauses that apply whatever data categories are collected
+ALL = "all"
+
+# Section selections remembered per library until the cache reaches this many
+SELECT_CACHE_SIZE = 1024
+
+
+# One clause compiled into literal strings and slots. A clause without slots
+# keeps its finished text, so filling it costs nothing.
+class Clause:
+    __slots__ = ("id", "parts", "fields", "text")
+
+    def __init__(self, id, parts):
+        self.id = id
+        self.parts = parts
+        self.fields = slot_names(parts)
+        self.text = None if self.fields else "".join(parts)
+
+    def fill(self, values):
+        return self.text if self.text is not None else fill_text(self.parts, values)
+
+
+# Library of clauses indexed by (jurisdiction, doc_type, section, category).
+# Each key maps to the tuple of compiled clauses in library order, so finding
+# the clauses of one jurisdiction for a section is a single dict lookup.
+class ClauseLibrary:
+    def __init__(self, jurisdictions, clauses, digest=""):
+        # code -> display name, in the order the library lists them
+        self.jurisdictions = dict(jurisdictions)
+        # Hash of the file the library was read from, part of every cache key
+        self.digest = digest
+        self._order = {code: i for i, code in enumerate([DEFAULT, *self.jurisdictions])}
+        self._index = {}
+        self._fields = {}
+        self._selected = {}
+        for position, entry in enumerate(clauses):
+            parts = compile_text(entry["text"])
+            for code in entry["jurisdictions"]:
+                if code not in self._order:
+                    raise ValueError(f"Clause {entry['id']!r} uses unknown jurisdiction {code!r}")
+                for category in entry.get("categories") or (ALL,):
+                    key = (code, entry["doc_type"], entry["section"], category)
+                    self._index.setdefault(key, []).append((position, entry["id"], parts))
+            self._fields.setdefault((entry["doc_type"], entry["section"]), set()).update(slot_names(parts))
+        self._index = {key: tuple(entries) for key, entries in self._index.items()}
+
+    @classmethod
+    def from_file(cls, path=CLAUSES_PATH):
+        with open(path, "rb") as f:
+            raw = f.read()
+        data = json.loads(raw)
+        return cls(data["jurisdictions"], data["clauses"], hashlib.sha256(raw).hexdigest())
+
+    # Clauses of one jurisdiction for a section and data category
+    def lookup(self, jurisdiction, doc_type, section, category=ALL):
+        return self._index.get((jurisdiction, doc_type, section, category), ())
+
+    # Slots used by any clause of a section
+    def fields(self, doc_type, section):
+        return frozenset(self._fields.get((doc_type, section), ()))
+
+    # Accept jurisdiction codes or display names, in any case
+    def code(self, jurisdiction):
+        if jurisdiction in self._order:
+            return jurisdiction
+        wanted = str(jurisdiction).strip().casefold()
+        for code, name in self.jurisdictions.items():
+            if wanted in (code.casefold(), name.casefold()):
+                return code
+        raise ValueError(f"Unknown jurisdiction {jurisdiction!r}; expected one of {', '.join(self.jurisdictions)}")
+
+    # The clauses of a section for the selected jurisdictions and data
+    # categories, in library order, each once. Clauses required by only some
+    # of several selected jurisdictions name the laws they come from. The
+    # result is cached per selection, so each section costs one lookup per
+    # jurisdiction and category the first time and a single lookup after that.
+    def select(self, doc_type, section, jurisdictions=(), categories=()):
+        key = (doc_type, section, tuple(jurisdictions), tuple(categories))
+        selected = self._selected.get(key)
+        if selected is None:
+            if len(self._selected) >= SELECT_CACHE_SIZE:
+                self._selected.clear()
+            selected = self._selected[key] = self._select(doc_type, section, jurisdictions, categories)
+        return selected
+
+    def _select(self, doc_type, section, jurisdictions, categories):
+        codes = sorted({self.code(code) for code in jurisdictions}, key=self._order.get)
+        sources = {}
+        for code in (DEFAULT, *codes):
+            for category in (ALL, *categories):
+                for position, id, parts in self.lookup(code, doc_type, section, category):
+                    sources.setdefault((position, id, parts), []).append(code)
+        selected = []
+        for (position, id, parts), found in sorted(sources.items(), key=lambda item: item[0][0]):
+            if DEFAULT not in found and len(codes) > 1:
+                names = ", ".join(self.jurisdictions[code] for code in dict.fromkeys(found))
+                parts = (*parts, f" ({names})")
+            selected.append(Clause(id, parts))
+        return tuple(selected)
+
+
+# The library, loaded and indexed on first use
+@functools.lru_cache(maxsize=None)
+def clause_library():
+    return ClauseLibrary.from_file()
+
+
+# A bulleted list assembled from the clause library. `jurisdictions` names the
+# input holding the selected jurisdiction codes and `categories` an optional
+# slot holding the data categories the document covers.
+class Clauses:
+    kind = "bullets"
+
+    def __init__(self, doc_type, section, jurisdictions="jurisdictions", categories=None):
+        self.doc_type = doc_type
+        self.section = section
+        self.jurisdictions = jurisdictions
+        self.categories = categories
+        self.fields = {jurisdictions, *([categories] if categories else ()), *clause_library().fields(doc_type, section)}
+
+    def fill(self, values):
+        jurisdictions = tuple(values.get(self.jurisdictions, ()))
+        categories = tuple(values[self.categories]) if self.categories else ()
+        clauses = clause_library().select(self.doc_type, self.section, jurisdictions, categories)
+        return (self.kind, tuple(clause.fill(values) for clause in clauses))
@@ -0,0 +1,288 @@
+import datetime
+import functools
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import threading
+import uuid
+from collections import namedtuple
+
+# Notification rules shipped with the package
+RULES_PATH = os.path.join(os.path.dirname(__file__), "data", "breach_rules.json")
+
+# Breach deadlines remembered per rule table until the cache reaches this many
+DEADLINE_CACHE_SIZE = 4096
+
+# One notification rule. `window` counts `unit`s ("hours", "days",
+# "business_days" or "days_after_year_end") from discovery of the breach, or
+# from the due time of rule `after`. `basis` is "statutory" for deadlines set
+# by law and otherwise the law's wording ("without undue delay"), for which the
+# window is a target. The rule applies when the number of affected people is
+# within `min_affected`..`max_affected`, where given.
+Rule = namedtuple("Rule", "id jurisdiction recipient window unit basis source min_affected max_affected after")
+
+# A rule's deadline for one breach. `conditional` is set when the rule depends
+# on the number of affected people and that number is not known yet.
+Deadline = namedtuple("Deadline", "due rule conditional")
+
+# An outstanding deadline of an open incident in the register
+Obligation = namedtuple("Obligation", "due incident_id incident_title rule conditional")
+
+_UNITS = {"hours": "hours", "days": "days", "business_days": "business days",
+          "days_after_year_end": "days after the end of the year"}
+
+
+def add_business_days(start, days):
+    # Weekend discoveries start counting on the following Monday
+    if start.weekday() >= 5:
+        start = datetime.datetime.combine(start.date() + datetime.timedelta(days=7 - start.weekday()),
+                                          datetime.time.min, start.tzinfo)
+    weeks, rest = divmod(days, 5)
+    extra = rest + 2 if start.weekday() + rest >= 5 else rest
+    return start + datetime.timedelta(days=weeks * 7 + extra)
+
+
+def _due(start, window, unit):
+    if unit == "hours":
+        return start + datetime.timedelta(hours=window)
+    if unit == "days":
+        return start + datetime.timedelta(days=window)
+    if unit == "business_days":
+        return add_business_days(start, window)
+    if unit == "days_after_year_end":
+        return datetime.datetime(start.year, 12, 31, 23, 59, tzinfo=start.tzinfo) + datetime.timedelta(days=window)
+    raise ValueError(f"Unknown deadline unit {unit!r}")
+
+
+# The moment a breach was discovered; a date alone counts from its start, which
+# gives the earliest possible deadlines
+def as_datetime(value):
+    if isinstance(value, datetime.datetime):
+        return value
+    if isinstance(value, datetime.date):
+        return datetime.datetime.combine(value, datetime.time.min)
+    try:
+        return datetime.datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        raise ValueError(f"Discovery date must be a date or date and time like 2024-05-31 14:30, "
+                         f"not {value!r}") from None
+
+
+# Number of affected people, or None when unknown (blank or 0)
+def affected_number(value):
+    if value in (None, ""):
+        return None
+    try:
+        number = int(float(value))
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"Affected count must be a finite number, not {value!r}") from None
+    return number if number > 0 else None
+
+
+# Notification rules indexed by jurisdiction. Each jurisdiction's rules are
+# kept in an order where a rule counted from another follows it, so deadlines
+# are computed in one pass.
+class RuleTable:
+    def __init__(self, jurisdictions, rules, digest=""):
+        self.jurisdictions = dict(jurisdictions)
+        # Hash of the file the rules were read from, part of every cache key
+        self.digest = digest
+        self._deadlines = {}
+        self._rules = {code: [] for code in self.jurisdictions}
+        for entry in rules:
+            rule = Rule(entry["id"], entry["jurisdiction"], entry["recipient"], entry["window"], entry["unit"],
+                        entry.get("basis", "statutory"), entry.get("source", ""), entry.get("min_affected"),
+                        entry.get("max_affected"), entry.get("after"))
+            if rule.jurisdiction not in self._rules:
+                raise ValueError(f"Rule {rule.id!r} uses unknown jurisdiction {rule.jurisdiction!r}")
+            if rule.unit not in _UNITS:
+                raise ValueError(f"Rule {rule.id!r} uses unknown unit {rule.unit!r}")
+            self._rules[rule.jurisdiction].append(rule)
+        self._rules = {code: tuple(sorted(rules, key=lambda rule: rule.after is not None))
+                       for code, rules in self._rules.items()}
+
+    @classmethod
+    def from_file(cls, path=RULES_PATH):
+        with open(path, "rb") as f:
+            raw = f.read()
+        data = json.loads(raw)
+        return cls(data["jurisdictions"], data["rules"], hashlib.sha256(raw).hexdigest())
+
+    def rules(self, jurisdiction):
+        return self._rules[self.code(jurisdiction)]
+
+    # Accept jurisdiction codes or display names, in any case
+    def code(self, jurisdiction):
+        if jurisdiction in self._rules:
+            return jurisdiction
+        wanted = str(jurisdiction).strip().casefold()
+        for code, name in self.jurisdictions.items():
+            if wanted in (code.casefold(), name.casefold()):
+                return code
+        raise ValueError(f"Unknown notification jurisdiction {jurisdiction!r}")
+
+    # Deadlines of a breach discovered at `discovered` affecting `affected`
+    # people (None when unknown) in `jurisdictions`, earliest first. Cached per
+    # breach, so recomputing every open incident on each page load is a lookup.
+    def deadlines(self, discovered, jurisdictions, affected=None):
+        key = (discovered, tuple(jurisdictions), affected)
+        found = self._deadlines.get(key)
+        if found is None:
+            if len(self._deadlines) >= DEADLINE_CACHE_SIZE:
+                self._deadlines.clear()
+            found = self._deadlines[key] = self._deadlines_of(discovered, jurisdictions, affected)
+        return found
+
+    def _deadlines_of(self, discovered, jurisdictions, affected):
+        found = []
+        for code in dict.fromkeys(self.code(jurisdiction) for jurisdiction in jurisdictions):
+            due_by_rule = {}
+            for rule in self._rules[code]:
+                if affected is not None and not (
+                        (rule.min_affected is None or affected >= rule.min_affected)
+                        and (rule.max_affected is None or affected <= rule.max_affected)):
+                    continue
+                start = due_by_rule.get(rule.after, discovered) if rule.after else discovered
+                due = due_by_rule[rule.id] = _due(start, rule.window, rule.unit)
+                conditional = affected is None and (rule.min_affected is not None or rule.max_affected is not None)
+                found.append(Deadline(due, rule, conditional))
+        found.sort(key=lambda deadline: (deadline.due, deadline.rule.id))
+        return tuple(found)
+
+    # One line describing a deadline, as written into the response plan
+    def describe(self, deadline):
+        rule = deadline.rule
+        window = f"{rule.window} {_UNITS[rule.unit]}"
+        if rule.after:
+            window += " after the notice above"
+        if rule.basis != "statutory":
+            window += f"; {rule.basis}, target"
+        condition = ""
+        if deadline.conditional:
+            if rule.min_affected is not None:
+                condition = f" if at least {rule.min_affected} people are affected"
+            else:
+                condition = f" if at most {rule.max_affected} people are affected"
+        return (f"{self.jurisdictions[rule.jurisdiction]}: notify {rule.recipient} by "
+                f"{deadline.due:%Y-%m-%d %H:%M} ({window}; {rule.source}){condition}")
+
+
+# The rule table, loaded and indexed on first use
+@functools.lru_cache(maxsize=None)
+def rule_table():
+    return RuleTable.from_file()
+
+
+# Deadlines of a breach described by plan inputs
+def breach_deadlines(discovered, jurisdictions, affected=None):
+    return rule_table().deadlines(as_datetime(discovered), tuple(jurisdictions), affected_number(affected))
+
+
+# Open breach incidents and the notifications already sent, kept in one JSON
+# file. The file is re-read only when it changes on disk.
+class IncidentRegister:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._loaded = (None, [])
+
+    # The register in DOCGEN_INCIDENTS_FILE, or None when it is not set. It is
+    # off by default: everyone who can open the app sees and updates every
+    # incident, so it is only for deployments serving a single organisation.
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        path = environ.get("DOCGEN_INCIDENTS_FILE")
+        return cls(path) if path else None
+
+    def _read(self):
+        try:
+            stamp = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return []
+        if self._loaded[0] != stamp:
+            with open(self.path, encoding="utf-8") as f:
+                self._loaded = (stamp, json.load(f)["incidents"])
+        return self._loaded[1]
+
+    def _write(self, incidents):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"incidents": incidents}, f, indent=1, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def _update(self, change):
+        with self._lock:
+            incidents = [dict(incident) for incident in self._read()]
+            result = change(incidents)
+            self._write(incidents)
+            return result
+
+    def incidents(self, status=None):
+        with self._lock:
+            return [incident for incident in self._read() if status is None or incident["status"] == status]
+
+    # Register a breach and return its incident record
+    def add(self, title, discovered, jurisdictions, affected=None):
+        table = rule_table()
+        incident = {
+            "id": uuid.uuid4().hex[:12],
+            "title": title,
+            "discovered": as_datetime(discovered).isoformat(timespec="minutes"),
+            "jurisdictions": [table.code(jurisdiction) for jurisdiction in jurisdictions],
+            "affected": affected_number(affected),
+            "status": "open",
+            "completed": [],
+        }
+        return self._update(lambda incidents: incidents.append(incident) or incident)
+
+    def _change(self, incident_id, change):
+        def apply(incidents):
+            for incident in incidents:
+                if incident["id"] == incident_id:
+                    change(incident)
+                    return incident
+            raise KeyError(f"No incident {incident_id!r}")
+        return self._update(apply)
+
+    # Record that the notification required by `rule_id` was sent
+    def complete(self, incident_id, rule_id):
+        return self._change(incident_id, lambda incident: incident.update(
+            completed=sorted(set(incident["completed"]) | {rule_id})))
+
+    def close(self, incident_id):
+        return self._change(incident_id, lambda incident: incident.update(status="closed"))
+
+
+# Deadlines of a registered incident
+def incident_deadlines(incident):
+    return rule_table().deadlines(datetime.datetime.fromisoformat(incident["discovered"]),
+                                  tuple(incident["jurisdictions"]), incident["affected"])
+
+
+# Heap entries of an incident's outstanding notifications, cached on the
+# incident's contents so unchanged incidents cost one lookup per page load
+@functools.lru_cache(maxsize=8192)
+def _outstanding(incident_id, title, discovered, jurisdictions, affected, completed):
+    deadlines = rule_table().deadlines(datetime.datetime.fromisoformat(discovered), jurisdictions, affected)
+    return tuple((deadline.due, incident_id, deadline.rule.id,
+                  Obligation(deadline.due, incident_id, title, deadline.rule, deadline.conditional))
+                 for deadline in deadlines if deadline.rule.id not in completed)
+
+
+# Outstanding notifications of the open incidents, earliest due first. With a
+# `limit`, only the first ones are kept on a bounded heap instead of sorting all.
+def upcoming(incidents, limit=None):
+    entries = heapq.merge(*(
+        _outstanding(incident["id"], incident["title"], incident["discovered"], tuple(incident["jurisdictions"]),
+                     incident["affected"], frozenset(incident["completed"]))
+        for incident in incidents if incident["status"] == "open"))
+    if limit is not None:
+        entries = itertools.islice(entries, limit)
+    return [entry[-1] for entry in entries]
+
+
+# Process-wide register used by the pages; None while incident tracking is off
+incident_register = IncidentRegister.from_env()
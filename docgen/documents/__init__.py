@@ -0,0 +1,55 @@
+import importlib
+
+from docgen.clauses import clause_library
+from docgen.deadlines import affected_number, as_datetime, rule_table
+from docgen.registry import coerce_value, document_registry
+
+# Document templates and generators, importable without Streamlit.
+# Maps each document type to the module defining its template and generator.
+DOCUMENT_TYPES = {
+    "privacy_policy": "docgen.documents.privacy_policy",
+    "terms": "docgen.documents.terms",
+    "pia": "docgen.documents.pia",
+    "breach_response_plan": "docgen.documents.breach_response_plan",
+}
+
+
+# Names of every document type: the modules above, then the types declared as
+# data in docgen/data/documents (and DOCGEN_DOCUMENTS_DIR), found without
+# parsing their definitions
+def document_types():
+    return tuple(dict.fromkeys((*DOCUMENT_TYPES, *document_registry.names())))
+
+
+# Import the module for a document type, or parse its definition, on first use
+def get_document_type(name):
+    if name in DOCUMENT_TYPES:
+        return importlib.import_module(DOCUMENT_TYPES[name])
+    try:
+        return document_registry.get(name)
+    except KeyError:
+        raise KeyError(f"Unknown document type {name!r}; expected one of {', '.join(document_types())}") from None
+
+
+# Merge user-supplied values over a document type's defaults, each converted
+# to the type of its default. Unknown fields, values of the wrong type,
+# jurisdictions, discovery dates and affected counts are rejected with a
+# ValueError.
+def build_inputs(doc, values):
+    inputs = doc.default_inputs()
+    unknown = set(values) - set(inputs)
+    if unknown:
+        raise ValueError(f"Unknown field(s) for {doc.TITLE}: {', '.join(sorted(unknown))}")
+    for field, value in values.items():
+        inputs[field] = coerce_value(field, inputs[field], value, field in doc.LIST_FIELDS)
+    if "jurisdictions" in inputs:
+        inputs["jurisdictions"] = [clause_library().code(code) for code in inputs["jurisdictions"]]
+    if "notify_jurisdictions" in inputs:
+        inputs["notify_jurisdictions"] = [rule_table().code(code) for code in inputs["notify_jurisdictions"]]
+    # Breach details the notification deadlines are computed from, checked here
+    # so bad values are rejected before anything is rendered
+    if "discovery_date" in inputs:
+        inputs["discovery_date"] = as_datetime(inputs["discovery_date"])
+    if "affected_count" in inputs:
+        inputs["affected_count"] = affected_number(inputs["affected_count"]) or 0
+    return inputs
@@ -0,0 +1,115 @@
+import datetime
+
+from docgen.deadlines import as_datetime, breach_deadlines, rule_table
+from docgen.template import ListBullets, Paragraph, Section, Template
+
+TITLE = "Data Breach Response Plan"
+
+# Inputs holding lists of values; batch files separate the items with ";"
+LIST_FIELDS = ("notify_jurisdictions",)
+
+
+# Section 10 lists the notification deadlines of the affected jurisdictions
+def deadline_summary(discovery_date, notify_jurisdictions, affected_count):
+    if not notify_jurisdictions:
+        return "No notification jurisdictions were selected."
+    deadlines = breach_deadlines(discovery_date, notify_jurisdictions, affected_count)
+    first = f" The first is due {deadlines[0].due:%Y-%m-%d %H:%M}." if deadlines else ""
+    return (f"Breach discovered {as_datetime(discovery_date):%Y-%m-%d %H:%M}. Notifications are due as follows, counted from "
+            f"discovery; verify each deadline with counsel.{first}")
+
+
+def deadline_lines(discovery_date, notify_jurisdictions, affected_count):
+    table = rule_table()
+    return [table.describe(deadline)
+            for deadline in breach_deadlines(discovery_date, notify_jurisdictions, affected_count)]
+
+
+TEMPLATE = Template(
+    "Data Breach Response Plan",
+    Section(
+        "1. Incident Overview",
+        Paragraph("Incident Type: {incident_type}"),
+        Paragraph("Date of Breach: {breach_date}"),
+        Paragraph("Affected Systems: {affected_systems}"),
+        Paragraph("Description: {description}"),
+    ),
+    Section(
+        "2. Data Affected",
+        Paragraph("Types of Data Affected: {data_affected}"),
+    ),
+    Section(
+        "3. Detection and Response",
+        Paragraph("How was the breach detected: {detection_method}"),
+        Paragraph("Immediate Response: {immediate_response}"),
+    ),
+    Section(
+        "4. Mitigation Steps",
+        Paragraph("Mitigation Actions: {mitigation_steps}"),
+    ),
+    Section(
+        "5. Communication",
+        Paragraph("Internal Communication Plan: {internal_communication}"),
+        Paragraph("External Communication Plan (e.g., authorities, customers): {external_communication}"),
+    ),
+    Section(
+        "6. Preventive Measures",
+        Paragraph("Steps to prevent future breaches: {preventive_measures}"),
+    ),
+    Section(
+        "7. Assigned Responsibility",
+        Paragraph("Assigned Team/Person: {responsible_person}"),
+    ),
+    Section(
+        "8. Review and Improvement",
+        Paragraph("Future Improvements and Lessons Learned: {improvements}"),
+    ),
+    Section(
+        "9. Conclusion",
+        Paragraph("Summary of Actions Taken: {summary}"),
+    ),
+    Section(
+        "10. Notification Deadlines",
+        Paragraph("{deadline_summary}"),
+        ListBullets("deadlines"),
+    ),
+    derived={
+        "deadline_summary": (("discovery_date", "notify_jurisdictions", "affected_count"), deadline_summary),
+        "deadlines": (("discovery_date", "notify_jurisdictions", "affected_count"), deadline_lines),
+    },
+)
+
+
+# Function to generate the Data Breach Response Plan
+def generate_response_plan(details):
+    return TEMPLATE.fill(details)
+
+
+# Inputs used when a field is not provided, matching the form defaults
+def default_inputs():
+    return {
+        "incident_type": "Unauthorized access",
+        "breach_date": datetime.date.today(),
+        "affected_systems": "Customer database, Financial records",
+        "description": "An unauthorized party accessed customer data.",
+        "data_affected": "Personal information, Financial data",
+        "detection_method": "The breach was detected via routine security monitoring.",
+        "immediate_response": "Disabled access, locked down affected systems, and started internal investigation.",
+        "mitigation_steps": "Notified affected individuals, initiated password resets, implemented stronger authentication protocols.",
+        "internal_communication": "Notify senior leadership, legal team, and IT team.",
+        "external_communication": "Notify affected customers and report the incident to relevant authorities.",
+        "preventive_measures": "Conduct regular security audits, improve network monitoring, and enhance staff training.",
+        "responsible_person": "John Doe, IT Security Team",
+        "improvements": "Review and enhance access control policies, conduct more frequent security drills.",
+        "summary": "All affected systems were secured, customers notified, and preventive steps were taken.",
+        "discovery_date": datetime.date.today(),
+        "notify_jurisdictions": [],
+        "affected_count": 0,
+    }
+
+
+generate = generate_response_plan
+
+
+def file_stem(inputs):
+    return f"Data_Breach_Response_Plan_{inputs['incident_type']}"
@@ -0,0 +1,33 @@
+from docgen.template import Paragraph, Section, Template
+
+TITLE = "Privacy Impact Assessment"
+
+LIST_FIELDS = ()
+
+TEMPLATE = Template(
+    "Privacy Impact Assessment (PIA) Report",
+    Section("1. What is the purpose of the project?", Paragraph("Answer: {purpose}")),
+    Section("2. What types of personal data will be collected?", Paragraph("Answer: {data_types}")),
+    Section("3. Who will have access to the data?", Paragraph("Answer: {access}")),
+    Section("4. How will the data be protected?", Paragraph("Answer: {protection}")),
+    Section("5. How long will the data be retained?", Paragraph("Answer: {retention}")),
+    Section("6. Are there any risks to data privacy, and how will they be mitigated?", Paragraph("Answer: {risks}")),
+    Section("7. Additional Comments", Paragraph("Answer: {comments}")),
+)
+
+
+# Function to generate the Privacy Impact Assessment report
+def generate_pia_content(answers):
+    return TEMPLATE.fill(answers)
+
+
+# Inputs used when a field is not provided; the form starts out empty
+def default_inputs():
+    return {field: "" for field in ("purpose", "data_types", "access", "protection", "retention", "risks", "comments")}
+
+
+generate = generate_pia_content
+
+
+def file_stem(inputs):
+    return "PIA_Report"
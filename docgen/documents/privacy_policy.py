@@ -0,0 +1,128 @@
+from docgen.clauses import Clauses
+from docgen.template import Paragraph, Section, Template
+
+TITLE = "Privacy Policy"
+
+# Inputs holding lists of values; batch files separate the items with ";"
+LIST_FIELDS = ("data_types", "collection_methods", "usage_purposes", "third_party_names", "jurisdictions")
+
+# Clause library data categories of the data types offered on the form
+DATA_CATEGORIES = {
+    'Personal Information': "personal",
+    'Email Address': "contact",
+    'Payment Information': "financial",
+    'Usage Data': "online",
+    'Cookies': "cookies",
+    'IP Address': "online",
+}
+
+
+# Section 3 depends on whether data is shared with third parties
+def third_party_statement(third_party_sharing, third_party_names):
+    if third_party_sharing == 'Yes':
+        return f"We share your information with third-party services, including: {', '.join(third_party_names)}."
+    return "We do not share your personal data with third-party services without your consent."
+
+
+# Section 5 adds the rights clauses that apply to the data collected
+def data_categories(data_types):
+    return tuple(sorted({DATA_CATEGORIES[name] for name in data_types if name in DATA_CATEGORIES}))
+
+
+TEMPLATE = Template(
+    "Privacy Policy for {company_name}",
+    Section(
+        None,
+        Paragraph("At {company_name}, accessible from {website_url}, one of our main priorities is the privacy of our "
+                  "visitors. This Privacy Policy document contains types of information that is collected and recorded "
+                  "by {company_name} and how we use it."),
+        Paragraph("If you have additional questions or require more information about our Privacy Policy, do not "
+                  "hesitate to contact us through email at {contact_email}."),
+    ),
+    Section(
+        "1. Information We Collect",
+        Paragraph("We collect the following types of information:\n{data_types}."),
+        Paragraph("We collect this information through the following methods:\n{collection_methods}."),
+    ),
+    Section(
+        "2. How We Use Your Information",
+        Paragraph("The information we collect is used for various purposes, including:\n{usage_purposes}."),
+    ),
+    Section(
+        "3. Sharing Your Information",
+        Paragraph("{third_party_statement}"),
+    ),
+    Section(
+        "4. Data Security Measures",
+        Paragraph("We implement the following data security measures to protect your information:\n{security_measures}."),
+    ),
+    Section(
+        "5. Your Data Protection Rights",
+        Paragraph("You have the right to request copies of your personal data, rectify any inaccurate information, and "
+                  "request the erasure of your personal data under certain conditions. The rights you are entitled to "
+                  "include:\n{user_rights}."),
+        Clauses("privacy_policy", "rights", categories="data_categories"),
+    ),
+    Section(
+        "6. Data Retention",
+        Paragraph("We retain personal data for {retention_period}. After this period, we delete or anonymize the data."),
+    ),
+    Section(
+        "7. Changes to Our Privacy Policy",
+        Paragraph("{policy_changes}"),
+        Paragraph("For more detailed information, feel free to contact us at {contact_email}."),
+    ),
+    derived={
+        "third_party_statement": (("third_party_sharing", "third_party_names"), third_party_statement),
+        "data_categories": (("data_types",), data_categories),
+    },
+)
+
+
+# Function to generate the full privacy policy based on inputs
+def generate_privacy_policy(company_name, website_url, contact_email, data_types, collection_methods, usage_purposes,
+                            third_party_sharing, third_party_names, security_measures, user_rights, retention_period,
+                            policy_changes, jurisdictions=()):
+    return TEMPLATE.fill({
+        "company_name": company_name,
+        "website_url": website_url,
+        "contact_email": contact_email,
+        "data_types": data_types,
+        "collection_methods": collection_methods,
+        "usage_purposes": usage_purposes,
+        "third_party_sharing": third_party_sharing,
+        "third_party_names": third_party_names,
+        "security_measures": security_measures,
+        "user_rights": user_rights,
+        "retention_period": retention_period,
+        "policy_changes": policy_changes,
+        "jurisdictions": jurisdictions,
+    })
+
+
+# Inputs used when a field is not provided, matching the form defaults
+def default_inputs():
+    return {
+        "company_name": "My Company",
+        "website_url": "https://www.mycompany.com",
+        "contact_email": "info@mycompany.com",
+        "data_types": ['Personal Information', 'Email Address'],
+        "collection_methods": ['Website Forms', 'Cookies'],
+        "usage_purposes": ['Personalizing User Experience', 'Customer Support'],
+        "third_party_sharing": "Yes",
+        "third_party_names": [],
+        "security_measures": "Encryption, Secure Data Storage, Regular Audits",
+        "user_rights": "Right to Access, Right to Rectification, Right to Erasure, Right to Data Portability",
+        "retention_period": "1 year",
+        "policy_changes": "We will notify users via email and update the policy on our website.",
+        "jurisdictions": [],
+    }
+
+
+# Generate the privacy policy from a dictionary of inputs
+def generate(inputs):
+    return generate_privacy_policy(**inputs)
+
+
+def file_stem(inputs):
+    return f"{inputs['company_name']}_privacy_policy"
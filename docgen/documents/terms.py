@@ -0,0 +1,83 @@
+import datetime
+
+from docgen.clauses import Clauses
+from docgen.template import Paragraph, Section, Template
+
+TITLE = "Terms and Conditions"
+
+# Inputs holding lists of values; batch files separate the items with ";"
+LIST_FIELDS = ("jurisdictions",)
+
+TEMPLATE = Template(
+    "Terms and Conditions",
+    Section(
+        None,
+        Paragraph("Effective Date: {effective_date}"),
+    ),
+    Section(
+        "1. Introduction",
+        Paragraph("Welcome to {company_name}! These terms and conditions outline the rules and regulations for the use "
+                  "of {company_name}'s Website, located at {website_url}."),
+    ),
+    Section(
+        "2. Intellectual Property Rights",
+        Paragraph("Unless otherwise stated, {company_name} and/or its licensors own the intellectual property rights for "
+                  "all material on {website_url}. All intellectual property rights are reserved. You may access this "
+                  "from {website_url} for your own personal use subjected to restrictions set in these terms and "
+                  "conditions."),
+    ),
+    Section(
+        "3. Restrictions",
+        Paragraph("You are specifically restricted from all of the following:"),
+        Clauses("terms", "restrictions"),
+    ),
+    Section(
+        "4. User Content",
+        Paragraph("In these Website Standard Terms and Conditions, \"User Content\" shall mean any audio, video text, "
+                  "images, or other material you choose to display on this Website. By displaying it, you grant "
+                  "{company_name} a non-exclusive, worldwide irrevocable, sub-licensable license to use, reproduce, "
+                  "adapt, publish, translate, and distribute it in any media."),
+    ),
+    Section(
+        "5. No warranties",
+        Paragraph("This Website is provided \"as is,\" with all faults, and {company_name} express no representations "
+                  "or warranties of any kind related to this Website or the materials contained on this Website."),
+    ),
+    Section(
+        "6. Limitation of liability",
+        Paragraph("In no event shall {company_name}, nor any of its officers, directors, or employees, be held liable "
+                  "for anything arising out of or in any way connected with your use of this Website whether such "
+                  "liability is under contract. {company_name} shall not be held liable for any indirect, "
+                  "consequential, or special liability arising out of or in any way related to your use of this "
+                  "Website."),
+    ),
+    Section(
+        "7. Governing Law & Jurisdiction",
+        Paragraph("These Terms will be governed by and interpreted in accordance with the laws of {jurisdiction}, and "
+                  "you submit to the non-exclusive jurisdiction of the state and federal courts located in "
+                  "{jurisdiction} for the resolution of any disputes."),
+    ),
+)
+
+
+# Function to generate the Terms and Conditions based on user input
+def generate_terms_content(details):
+    return TEMPLATE.fill(details)
+
+
+# Inputs used when a field is not provided, matching the form defaults
+def default_inputs():
+    return {
+        "company_name": "Acme Corp",
+        "website_url": "https://www.acme.com",
+        "effective_date": datetime.date.today(),
+        "jurisdiction": "New York, USA",
+        "jurisdictions": [],
+    }
+
+
+generate = generate_terms_content
+
+
+def file_stem(inputs):
+    return f"Terms_and_Conditions_{inputs['company_name']}"
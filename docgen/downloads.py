@@ -0,0 +1,87 @@
+import streamlit as st
+
+from docgen.artifacts import artifact_store
+from docgen.cache import cache_key, render_cache
+from docgen.exports import current_session, deferred_export, submit_export
+from docgen.jobs import export_jobs
+
+# How often a page waiting for background exports checks on them, in seconds
+POLL_INTERVAL = 0.5
+
+
+def _state_key(doc_type):
+    return f"exports.{doc_type}"
+
+
+# Start rendering a page's exports in the background into `cache`. `renders`
+# maps each format to a function returning its bytes (or a file object, for a
+# cache that keeps files). Exports this session started earlier on the same
+# page for other inputs are cancelled if not yet running.
+def start_exports(doc_type, digest, renders, cache=render_cache):
+    owner = (current_session(), doc_type)
+    for fmt, render in renders.items():
+        submit_export(doc_type, digest, fmt, render, owner, cache=cache)
+    export_jobs.supersede(owner, keep={cache_key(doc_type, digest, fmt) for fmt in renders})
+    st.session_state[_state_key(doc_type)] = (digest, renders)
+
+
+# Whether exports were started for these inputs on this page
+def exports_started(doc_type, digest):
+    started = st.session_state.get(_state_key(doc_type))
+    return started is not None and started[0] == digest
+
+
+# Download buttons for the exports started for the current inputs, with a
+# progress bar instead while any of them is still rendering. `downloads` lists
+# (format, label, file name, mime type). Once the inputs change, the exports
+# started for the old ones are dropped. `cache` is the one the exports were
+# started into; downloads are handed out through `store`, or straight from
+# the cache when it is None.
+def export_downloads(doc_type, digest, downloads, cache=render_cache, store=artifact_store):
+    started = st.session_state.get(_state_key(doc_type))
+    if started is None:
+        return
+    started_digest, renders = started
+    owner = (current_session(), doc_type)
+    if started_digest != digest:
+        export_jobs.supersede(owner)
+        del st.session_state[_state_key(doc_type)]
+        return
+
+    pending = []
+    for fmt, _, _, _ in downloads:
+        key = cache_key(doc_type, digest, fmt)
+        job = export_jobs.get(key)
+        if job is None and not cache.contains(key):
+            # Evicted since it was started; render it again
+            job = submit_export(doc_type, digest, fmt, renders[fmt], owner, cache=cache)
+        if job is not None and not job.done():
+            pending.append(key)
+    if pending:
+        _progress(pending, len(downloads))
+        return
+
+    for fmt, label, file_name, mime in downloads:
+        job = export_jobs.get(cache_key(doc_type, digest, fmt))
+        error = job.future.exception() if job is not None and not job.future.cancelled() else None
+        if error is not None:
+            st.error(f"Could not render the {fmt.upper()} export: {error}")
+            continue
+        st.download_button(
+            label=label,
+            data=deferred_export(doc_type, digest, fmt, renders[fmt], cache=cache, store=store),
+            file_name=file_name,
+            mime=mime,
+        )
+
+
+# Progress of the exports still rendering, checked every POLL_INTERVAL seconds
+# without rerunning the rest of the page; the page reruns once all are done
+@st.fragment(run_every=POLL_INTERVAL)
+def _progress(keys, total):
+    jobs = [export_jobs.get(key) for key in keys]
+    remaining = sum(1 for job in jobs if job is not None and not job.done())
+    if not remaining:
+        st.rerun()
+    ready = total - remaining
+    st.progress(ready / total, text=f"Rendering exports… {ready} of {total} ready")
@@ -0,0 +1,81 @@
+from docgen.artifacts import artifact_store
+from docgen.cache import cache_key, render_cache
+from docgen.jobs import export_jobs
+from docgen.metrics import metrics
+
+
+# Id of the Streamlit session running the current script, or None outside Streamlit
+def current_session():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return None
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else None
+
+
+# Wrap an export renderer so it only runs when its download is requested.
+# Rendered bytes live in the process-wide render cache under a content-addressed
+# key of (document type, input hash, format), so reruns, repeat downloads and
+# identical submissions from other sessions are served without re-rendering.
+# Downloads are handed out through the artifact store, which keeps them for the
+# requesting session within a global memory budget. Without a store they are
+# handed out straight from the cache. Either way Streamlit is handed bytes: it
+# reads a file object whole into its media storage and never closes it.
+def deferred_export(doc_type, digest, fmt, render, cache=render_cache, store=artifact_store):
+    key = cache_key(doc_type, digest, fmt)
+    # The callable runs outside the script thread, so the session is captured now
+    session = current_session()
+
+    def build():
+        with metrics.timed("export", doc_type=doc_type):
+            if store is None:
+                return _read(cached_export(doc_type, digest, fmt, render, cache))
+            data = store.get(key, session)
+            if data is not None:
+                metrics.count_export(fmt, "artifact")
+                return data
+            return store.put(key, cached_export(doc_type, digest, fmt, render, cache), session)
+
+    return build
+
+
+# The bytes of an export, reading and closing it when it is a file
+def _read(data):
+    if hasattr(data, "read"):
+        with data:
+            return data.read()
+    return data
+
+
+# An export from the render cache (or another cache given), rendered and
+# cached on a miss; bytes, or an open file from a cache that keeps files
+def cached_export(doc_type, digest, fmt, render, cache=render_cache):
+    key = cache_key(doc_type, digest, fmt)
+    data = cache.get(key)
+    metrics.count_export(fmt, "miss" if data is None else "hit", doc_type)
+    if data is None:
+        data = render()
+        if hasattr(data, "getvalue"):
+            with metrics.timed("copy"):
+                data = data.getvalue()
+        data = cache.put(key, data)
+    return data
+
+
+# Render an export into the render cache on a background thread for `owner`
+# (a session and page). Returns the job, or None when the export is already
+# cached. Identical exports requested by several sessions share one job.
+def submit_export(doc_type, digest, fmt, render, owner=None, cache=render_cache, jobs=export_jobs):
+    key = cache_key(doc_type, digest, fmt)
+    if cache.contains(key):
+        return None
+
+    # The export is left in the cache; the finished job keeps no copy of it
+    def run():
+        with metrics.timed("background_export", doc_type=doc_type):
+            data = cached_export(doc_type, digest, fmt, render, cache)
+            if hasattr(data, "close"):
+                data.close()
+
+    return jobs.submit(key, run, owner)
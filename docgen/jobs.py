@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from docgen.metrics import metrics
+
+# Threads rendering exports in the background, overridable with DOCGEN_EXPORT_WORKERS
+DEFAULT_WORKERS = 2
+
+# Finished jobs are forgotten this many seconds after they end; their results
+# stay in the render cache
+FINISHED_TTL = 60.0
+
+
+# One background render. Every session page waiting for it is an owner; a job
+# whose owners have all moved on to other inputs is cancelled if it has not
+# started yet.
+class Job:
+    def __init__(self, key):
+        self.key = key
+        self.future = None
+        self.owners = set()
+        self.submitted = time.monotonic()
+        self.finished = None
+
+    @property
+    def status(self):
+        future = self.future
+        if future.cancelled():
+            return "cancelled"
+        if not future.done():
+            return "running" if future.running() else "pending"
+        return "failed" if future.exception() is not None else "done"
+
+    def done(self):
+        return self.future.done()
+
+    # The rendered bytes, waiting up to `timeout` seconds for them
+    def result(self, timeout=None):
+        return self.future.result(timeout)
+
+
+# Runs export renders on background threads so Streamlit script runs never
+# wait for them. Jobs are keyed by the render cache key of their output:
+# submitting a key that is already queued or running joins that job instead of
+# starting another one, whichever session submitted it first.
+class JobExecutor:
+    def __init__(self, workers=DEFAULT_WORKERS, finished_ttl=FINISHED_TTL):
+        self.workers = workers
+        self.finished_ttl = finished_ttl
+        self._pool = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.coalesced = 0
+        self.cancelled = 0
+
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        workers = environ.get("DOCGEN_EXPORT_WORKERS")
+        return cls(workers=int(workers) if workers else DEFAULT_WORKERS)
+
+    # The job rendering `key` with `render()` on behalf of `owner`
+    def submit(self, key, render, owner=None):
+        with self._lock:
+            self._prune()
+            job = self._jobs.get(key)
+            # Cancelled and failed jobs are started afresh
+            if job is not None and job.future.done() and job.status in ("cancelled", "failed"):
+                job = None
+            if job is None:
+                job = self._jobs[key] = Job(key)
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="docgen-export")
+                job.future = self._pool.submit(self._run, job, render)
+                job.future.add_done_callback(self._finished(job))
+                self.submitted += 1
+            else:
+                self.coalesced += 1
+            if owner is not None:
+                job.owners.add(owner)
+            return job
+
+    def _run(self, job, render):
+        metrics.observe("export_queue", time.monotonic() - job.submitted)
+        return render()
+
+    def _finished(self, job):
+        def callback(future):
+            job.finished = time.monotonic()
+        return callback
+
+    # The job for `key`, if one is queued, running or recently finished
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    # Release `owner` from every job except those for `keep`, cancelling the
+    # jobs nobody is waiting for any more. Jobs already running finish, and
+    # their output goes to the render cache for whoever asks next.
+    def supersede(self, owner, keep=()):
+        with self._lock:
+            for key, job in list(self._jobs.items()):
+                if key in keep or owner not in job.owners:
+                    continue
+                job.owners.discard(owner)
+                if not job.owners and job.future.cancel():
+                    del self._jobs[key]
+                    self.cancelled += 1
+
+    def _prune(self):
+        now = time.monotonic()
+        for key, job in list(self._jobs.items()):
+            if job.finished is not None and now - job.finished > self.finished_ttl:
+                del self._jobs[key]
+
+    def stats(self):
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+            return {
+                "workers": self.workers,
+                "pending": statuses.count("pending"),
+                "running": statuses.count("running"),
+                "finished": statuses.count("done") + statuses.count("failed"),
+                "submitted": self.submitted,
+                "coalesced": self.coalesced,
+                "cancelled": self.cancelled,
+            }
+
+
+# Process-wide executor shared by all sessions
+export_jobs = JobExecutor.from_env()
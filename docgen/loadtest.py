@@ -0,0 +1,453 @@
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Repository root, where the Streamlit pages live
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The pages driven by the load test: document type -> (page script, label of
+# the button that generates the document)
+PAGES = {
+    "privacy_policy": ("Privacy_Policy.py", "Generate Privacy Policy"),
+    "terms": ("Terms_And_Conditions.py", "Generate Terms and Conditions"),
+    "pia": ("Privacy_Impact_Assessment.py", "Generate Report"),
+    "breach_response_plan": ("Data_Breach_Response_Plan.py", "Generate Response Plan"),
+}
+
+# What each simulated user does, timed separately: open the page, change an
+# input, press the generate button, wait for the background exports, rerun
+# once they are ready and download every export
+STEPS = ("load", "edit", "generate", "exports_ready", "downloads", "download")
+
+# Steps a user waits on in the browser; their p90 decides the capacity
+INTERACTIVE = ("load", "edit", "generate", "downloads")
+
+# Longest p90 of an interactive step, in ms, that still counts as serving the users
+DEFAULT_MAX_P90_MS = 1000
+
+# How often RSS and CPU use are sampled during a run, in seconds
+SAMPLE_INTERVAL = 0.25
+
+_session = threading.local()
+
+
+# Resident set size of this process in bytes, or its peak where the current
+# size is not available; None when neither is
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+# Samples RSS and CPU use on a background thread while a run is in progress.
+# CPU is the process time of every thread, so 100% is one core fully busy.
+class ResourceSampler:
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self.rss = []
+        self.cpu = []
+
+    def start(self):
+        gc.collect()
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+        self.rss_start = rss_bytes()
+        self._thread = threading.Thread(target=self._run, name="docgen-loadtest-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        wall, cpu = self.started, self.cpu_started
+        while not self._stop.wait(self.interval):
+            now, used = time.perf_counter(), time.process_time()
+            self.cpu.append(100 * (used - cpu) / (now - wall))
+            wall, cpu = now, used
+            rss = rss_bytes()
+            if rss is not None:
+                self.rss.append(rss)
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        elapsed = time.perf_counter() - self.started
+        cpu_seconds = time.process_time() - self.cpu_started
+        rss_end = rss_bytes()
+        cores = os.cpu_count() or 1
+        return {
+            "cpu_percent": round(100 * cpu_seconds / elapsed, 1),
+            "cpu_peak_percent": round(max(self.cpu, default=0.0), 1),
+            "cpu_saturation": round(cpu_seconds / (elapsed * cores), 3),
+            "rss_start_bytes": self.rss_start,
+            "rss_end_bytes": rss_end,
+            "rss_peak_bytes": max(self.rss + [rss_end or 0]) or None,
+            "rss_growth_bytes": rss_end - self.rss_start if rss_end is not None and self.rss_start is not None else None,
+        }
+
+
+# Latencies of every step and the errors seen, shared by all simulated users
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {step: [] for step in STEPS}
+        self.sessions = 0
+        self.runs = 0
+        self.downloaded_bytes = 0
+        self.errors = {}
+
+    @contextlib.contextmanager
+    def step(self, name):
+        started = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.samples[name].append(elapsed * 1000)
+            if name in INTERACTIVE:
+                self.runs += 1
+
+    def downloaded(self, data):
+        with self._lock:
+            self.downloaded_bytes += len(data)
+
+    def finished(self):
+        with self._lock:
+            self.sessions += 1
+
+    def error(self, step, message):
+        with self._lock:
+            count, first = self.errors.get(step, (0, message))
+            self.errors[step] = (count + 1, first)
+
+
+# AppTest runs one app at a time: each run installs its own mock Streamlit
+# runtime globally and every run uses the same session id. To run many
+# sessions at once in one process, as the Streamlit server does, all runs here
+# share one runtime (with a real media file manager, so downloads go through
+# the same deferred callables as in the server) and each simulated user keeps
+# its own session id.
+@contextlib.contextmanager
+def concurrent_sessions():
+    from unittest import mock
+
+    from streamlit import config
+    from streamlit.components.v2.component_manager import BidiComponentManager
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.dataframe_source_manager import DataframeSourceManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.testing.v1 import app_test
+    from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+    class SessionScriptRunner(LocalScriptRunner):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self._session_id = getattr(_session, "id", self._session_id)
+
+    runtime = mock.MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/media"))
+    runtime.dataframe_source_mgr = DataframeSourceManager()
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    components = BidiComponentManager()
+    components.discover_and_register_components(start_file_watching=False)
+    runtime.bidi_component_registry = components
+
+    # AppTest switches this option on for each run and back off after it;
+    # with it already on, overlapping runs never see it off
+    app_test_option = config.get_option("global.appTest")
+    config.set_option("global.appTest", True)
+    try:
+        with mock.patch.object(Runtime, "instance", classmethod(lambda cls: runtime)), \
+                mock.patch.object(Runtime, "exists", classmethod(lambda cls: True)), \
+                mock.patch.object(app_test, "LocalScriptRunner", SessionScriptRunner):
+            yield runtime
+    finally:
+        config.set_option("global.appTest", app_test_option)
+
+
+def _page_path(doc_type):
+    return os.path.join(ROOT, "pages", PAGES[doc_type][0])
+
+
+def _check(at, recorder, step):
+    if at.exception:
+        recorder.error(step, at.exception[0].value)
+        return False
+    return True
+
+
+# Block until the exports the page started in the background are rendered,
+# as the page's progress fragment would
+def _wait_for_exports(at, doc_type, timeout):
+    from docgen.cache import cache_key
+    from docgen.jobs import export_jobs
+
+    started = at.session_state[f"exports.{doc_type}"] if f"exports.{doc_type}" in at.session_state else None
+    if started is None:
+        raise RuntimeError("the page started no exports")
+    digest, renders = started
+    for fmt in renders:
+        job = export_jobs.get(cache_key(doc_type, digest, fmt))
+        if job is not None:
+            job.result(timeout)
+
+
+# One simulated user filling in a page once: a fresh session opens the page,
+# edits its first text field, generates the document and downloads every
+# export. A share `hit_ratio` of sessions enter the same text as each other,
+# so their exports come from the render cache; the rest enter their own.
+def simulate_session(runtime, doc_type, user, iteration, recorder, hit_ratio=0.0, rng=random, timeout=30):
+    from streamlit.testing.v1 import AppTest
+
+    session_id = _session.id = f"loadtest-{doc_type}-{user}-{iteration}"
+    media = runtime.media_file_mgr
+    try:
+        at = AppTest.from_file(_page_path(doc_type), default_timeout=timeout)
+        with recorder.step("load"):
+            at.run()
+        if not _check(at, recorder, "load"):
+            return
+
+        field = next(field for field in (*at.text_input, *at.text_area) if not field.disabled)
+        suffix = "shared" if rng.random() < hit_ratio else f"{user}-{iteration}"
+        field.set_value(f"{field.value} load test {suffix}".strip())
+        with recorder.step("edit"):
+            at.run()
+        if not _check(at, recorder, "edit"):
+            return
+
+        button = next(button for button in at.button if button.label == PAGES[doc_type][1])
+        button.click()
+        with recorder.step("generate"):
+            at.run()
+        if not _check(at, recorder, "generate"):
+            return
+        with recorder.step("exports_ready"):
+            _wait_for_exports(at, doc_type, timeout)
+
+        with recorder.step("downloads"):
+            at.run()
+        if not _check(at, recorder, "downloads"):
+            return
+        for element in at.get("download_button"):
+            with recorder.step("download"):
+                url = media.execute_deferred(element.proto.deferred_file_id)
+                data = media._storage.get_file(url.rsplit("/", 1)[-1]).content
+            recorder.downloaded(data)
+        recorder.finished()
+    except Exception as e:
+        recorder.error("session", f"{type(e).__name__}: {e}")
+    finally:
+        # What the server does when a session ends
+        media.clear_session_refs(session_id)
+        media.remove_orphaned_files()
+        _session.id = None
+
+
+def _percentiles(samples):
+    from docgen.benchmark import percentile
+
+    if not samples:
+        return None
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 0.50), 2),
+        "p90_ms": round(percentile(samples, 0.90), 2),
+        "p99_ms": round(percentile(samples, 0.99), 2),
+        "max_ms": round(max(samples), 2),
+    }
+
+
+# Run `users` simulated users against one page for `duration` seconds. Users
+# start spread over `ramp` seconds and pause for `think` seconds on average
+# between sessions (0 keeps every user busy all the time).
+def run_page(runtime, doc_type, users, duration, ramp=0.0, think=0.0, hit_ratio=0.0, timeout=30, seed=0):
+    recorder = Recorder()
+    sampler = ResourceSampler().start()
+    stop_at = time.monotonic() + duration
+
+    def user_loop(user):
+        rng = random.Random(seed * 100003 + user)
+        time.sleep(ramp * user / users)
+        iteration = 0
+        while time.monotonic() < stop_at:
+            simulate_session(runtime, doc_type, user, iteration, recorder, hit_ratio, rng, timeout)
+            iteration += 1
+            if think:
+                time.sleep(min(rng.expovariate(1 / think), max(0.0, stop_at - time.monotonic())))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(users, thread_name_prefix="docgen-loadtest") as pool:
+        list(pool.map(user_loop, range(users)))
+    elapsed = time.perf_counter() - started
+    resources = sampler.stop()
+
+    return {
+        "page": doc_type,
+        "users": users,
+        "seconds": round(elapsed, 2),
+        "sessions": recorder.sessions,
+        "sessions_per_s": round(recorder.sessions / elapsed, 3),
+        "runs_per_s": round(recorder.runs / elapsed, 3),
+        "downloads_per_s": round(len(recorder.samples["download"]) / elapsed, 3),
+        "downloaded_bytes": recorder.downloaded_bytes,
+        "steps": {step: _percentiles(samples) for step, samples in recorder.samples.items()},
+        "errors": {step: {"count": count, "first": message} for step, (count, message) in recorder.errors.items()},
+        **resources,
+    }
+
+
+# Whether a run kept every interactive step's p90 within `max_p90_ms`, without errors
+def within_budget(result, max_p90_ms=DEFAULT_MAX_P90_MS):
+    if result["errors"] or not result["sessions"]:
+        return False
+    return all(result["steps"][step] is None or result["steps"][step]["p90_ms"] <= max_p90_ms
+               for step in INTERACTIVE)
+
+
+# Load every page at each number of concurrent users in turn. Each page's
+# capacity is the most users it served within the latency budget.
+def run_load_test(pages=tuple(PAGES), user_counts=(1, 5, 10), duration=30.0, ramp=0.0, think=0.0, hit_ratio=0.0,
+                  timeout=30, max_p90_ms=DEFAULT_MAX_P90_MS, stream=sys.stderr):
+    results = []
+    capacity = {}
+    with concurrent_sessions() as runtime:
+        for doc_type in pages:
+            # One untimed session loads the page's modules and fonts first
+            simulate_session(runtime, doc_type, "warmup", 0, Recorder(), timeout=timeout)
+            capacity[doc_type] = 0
+            for users in user_counts:
+                result = run_page(runtime, doc_type, users, duration, ramp, think, hit_ratio, timeout)
+                results.append(result)
+                if within_budget(result, max_p90_ms):
+                    capacity[doc_type] = max(capacity[doc_type], users)
+                if stream:
+                    stream.write(f"{doc_type} x{users}: {result['sessions']} sessions, "
+                                 f"{sum(error['count'] for error in result['errors'].values())} errors\n")
+                    stream.flush()
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "duration": duration,
+            "ramp": ramp,
+            "think": think,
+            "hit_ratio": hit_ratio,
+            "max_p90_ms": max_p90_ms,
+        },
+        "results": results,
+        "capacity": capacity,
+    }
+
+
+def _mib(value):
+    return str(round(value / (1024 * 1024))) if value is not None else "-"
+
+
+def format_table(report):
+    lines = [f"{'page':<22}{'users':>6}{'sess/s':>8}{'runs/s':>8}{'edit p90':>10}{'gen p90':>9}{'ready p90':>10}"
+             f"{'dl p90':>8}{'cpu %':>7}{'sat':>6}{'rss MiB':>9}{'growth':>8}{'errors':>8}"]
+    for result in report["results"]:
+        steps = result["steps"]
+
+        def p90(step):
+            return f"{steps[step]['p90_ms']:.1f}" if steps[step] else "-"
+
+        lines.append(
+            f"{result['page']:<22}{result['users']:>6}{result['sessions_per_s']:>8.2f}{result['runs_per_s']:>8.2f}"
+            f"{p90('edit'):>10}{p90('generate'):>9}{p90('exports_ready'):>10}{p90('download'):>8}"
+            f"{result['cpu_percent']:>7.0f}{result['cpu_saturation']:>6.2f}{_mib(result['rss_end_bytes']):>9}"
+            f"{_mib(result['rss_growth_bytes']):>8}{sum(error['count'] for error in result['errors'].values()):>8}")
+    lines.append("")
+    for doc_type, users in report["capacity"].items():
+        lines.append(f"{doc_type}: {users or 'no'} concurrent users within "
+                     f"{report['meta']['max_p90_ms']:g} ms p90")
+    for result in report["results"]:
+        for step, error in result["errors"].items():
+            lines.append(f"{result['page']} x{result['users']} {step}: {error['count']} x {error['first']}")
+    return "\n".join(lines)
+
+
+def _choices(value, allowed, parser, what):
+    chosen = tuple(item.strip() for item in value.split(",") if item.strip())
+    unknown = set(chosen) - set(allowed)
+    if unknown or not chosen:
+        parser.error(f"unknown {what}: {', '.join(sorted(unknown)) or 'none given'}")
+    return chosen
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m docgen.loadtest",
+        description="Simulate many concurrent users filling in the document pages and report throughput, "
+                    "latency percentiles, memory and CPU use per page.",
+    )
+    parser.add_argument("-p", "--pages", default=",".join(PAGES), help="comma separated pages (document types)")
+    parser.add_argument("-u", "--users", default="1,5,10",
+                        help="comma separated numbers of concurrent users, each run in turn (default 1,5,10)")
+    parser.add_argument("-d", "--duration", type=float, default=30.0, help="seconds per run (default 30)")
+    parser.add_argument("--ramp", type=float, default=0.0, help="seconds over which users start (default 0)")
+    parser.add_argument("--think", type=float, default=0.0,
+                        help="mean pause between a user's sessions in seconds (default 0: no pause)")
+    parser.add_argument("--hit-ratio", type=float, default=0.0,
+                        help="share of sessions entering the same inputs, served from the render cache (default 0)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds a page run or export may take")
+    parser.add_argument("--max-p90", type=float, default=DEFAULT_MAX_P90_MS,
+                        help=f"p90 latency in ms that still counts as serving the users (default {DEFAULT_MAX_P90_MS})")
+    parser.add_argument("-o", "--save", help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+    try:
+        user_counts = tuple(int(users) for users in args.users.split(",") if users.strip())
+    except ValueError:
+        parser.error("--users must be comma separated numbers")
+    if not user_counts or min(user_counts) < 1:
+        parser.error("--users must be positive")
+
+    # Keep the revisions and incidents the simulated users create out of the
+    # real ones; revision history and incident tracking are turned on in a
+    # scratch directory so their cost is measured. The warm-up session of each page replaces the app's
+    # own background warm-up, which would otherwise overlap the first run.
+    scratch = tempfile.TemporaryDirectory(prefix="docgen-loadtest-")
+    os.environ["DOCGEN_REVISIONS_DIR"] = os.path.join(scratch.name, "revisions")
+    os.environ["DOCGEN_INCIDENTS_FILE"] = os.path.join(scratch.name, "incidents.json")
+    os.environ.setdefault("DOCGEN_WARMUP", "0")
+    with scratch:
+        report = run_load_test(
+            pages=_choices(args.pages, PAGES, parser, "page(s)"),
+            user_counts=user_counts,
+            duration=args.duration,
+            ramp=args.ramp,
+            think=args.think,
+            hit_ratio=min(1.0, max(0.0, args.hit_ratio)),
+            timeout=args.timeout,
+            max_p90_ms=args.max_p90,
+        )
+    print(format_table(report))
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
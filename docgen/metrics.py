@@ -0,0 +1,347 @@
+import atexit
+import bisect
+import contextlib
+import contextvars
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Histogram bucket upper bounds: seconds for stage timings, bytes for output sizes
+TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Rewrite DOCGEN_METRICS_FILE at most this often, in seconds
+DUMP_INTERVAL = 10.0
+
+# Document type of the flow being measured, inherited by nested stages
+_doc_type = contextvars.ContextVar("docgen_doc_type", default="")
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    # Upper bound of the bucket holding the given quantile (the last bound when it overflows)
+    def quantile(self, fraction):
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.buckets):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.bounds[-1]
+
+    # Prometheus buckets are cumulative and end with +Inf
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.buckets):
+            total += count
+            yield bound, total
+
+
+def _labels(**labels):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _bound(value):
+    return "+Inf" if value == float("inf") else repr(value)
+
+
+# Process-wide timings of each stage of the generate flow (page rerun, preview,
+# outline, PDF layout, rendering, copies, exports), output sizes and render
+# cache outcomes. Shared by every Streamlit session, the batch CLI and the API.
+class Metrics:
+    def __init__(self, dump_path=None):
+        self.dump_path = dump_path
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._sizes = {}
+        self._exports = Counter()
+        self._last_dump = 0.0
+
+    # Time the enclosed block as `stage`; a given doc_type also applies to nested stages
+    @contextlib.contextmanager
+    def timed(self, stage, doc_type=None):
+        token = _doc_type.set(doc_type) if doc_type else None
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+            if token is not None:
+                _doc_type.reset(token)
+
+    def observe(self, stage, seconds, doc_type=None):
+        key = (stage, doc_type or _doc_type.get())
+        with self._lock:
+            histogram = self._stages.get(key)
+            if histogram is None:
+                histogram = self._stages[key] = Histogram(TIME_BUCKETS)
+            histogram.observe(seconds)
+        self.maybe_dump()
+
+    def observe_bytes(self, fmt, size, doc_type=None):
+        key = (fmt, doc_type or _doc_type.get())
+        with self._lock:
+            histogram = self._sizes.get(key)
+            if histogram is None:
+                histogram = self._sizes[key] = Histogram(SIZE_BUCKETS)
+            histogram.observe(size)
+
+    # Whether an export was served from the render cache ("hit") or rendered ("miss")
+    def count_export(self, fmt, outcome, doc_type=None):
+        with self._lock:
+            self._exports[(fmt, doc_type or _doc_type.get(), outcome)] += 1
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._sizes.clear()
+            self._exports.clear()
+            self.started = time.time()
+
+    # Rows for display: one per (stage, document type) with count and latency in ms
+    def stage_rows(self):
+        with self._lock:
+            items = sorted(self._stages.items())
+            return [{
+                "stage": stage,
+                "document": doc_type or "-",
+                "count": h.count,
+                "mean_ms": round(h.sum / h.count * 1000, 3),
+                "p50_ms": h.quantile(0.5) * 1000,
+                "p95_ms": h.quantile(0.95) * 1000,
+                "total_s": round(h.sum, 3),
+            } for (stage, doc_type), h in items]
+
+    def size_rows(self):
+        with self._lock:
+            return [{
+                "format": fmt,
+                "document": doc_type or "-",
+                "count": h.count,
+                "mean_bytes": round(h.sum / h.count),
+            } for (fmt, doc_type), h in sorted(self._sizes.items())]
+
+    def export_rows(self):
+        with self._lock:
+            return [{"format": fmt, "document": doc_type or "-", "cache": outcome, "count": count}
+                    for (fmt, doc_type, outcome), count in sorted(self._exports.items())]
+
+    # Prometheus text exposition format (version 0.0.4)
+    def prometheus_text(self):
+        from docgen.artifacts import artifact_store
+        from docgen.cache import render_cache
+        from docgen.jobs import export_jobs
+
+        lines = []
+        with self._lock:
+            lines.append("# HELP docgen_stage_seconds Time spent in each stage of document generation.")
+            lines.append("# TYPE docgen_stage_seconds histogram")
+            for (stage, doc_type), h in sorted(self._stages.items()):
+                self._histogram_lines(lines, "docgen_stage_seconds", h, stage=stage, doc_type=doc_type)
+            lines.append("# HELP docgen_output_bytes Size of rendered documents.")
+            lines.append("# TYPE docgen_output_bytes histogram")
+            for (fmt, doc_type), h in sorted(self._sizes.items()):
+                self._histogram_lines(lines, "docgen_output_bytes", h, format=fmt, doc_type=doc_type)
+            lines.append("# HELP docgen_exports_total Exports by format and render cache outcome.")
+            lines.append("# TYPE docgen_exports_total counter")
+            for (fmt, doc_type, outcome), count in sorted(self._exports.items()):
+                lines.append(f"docgen_exports_total{{{_labels(format=fmt, doc_type=doc_type, cache=outcome)}}} {count}")
+
+        stats = render_cache.stats()
+        lines.append("# HELP docgen_render_cache_lookups_total Render cache lookups by outcome.")
+        lines.append("# TYPE docgen_render_cache_lookups_total counter")
+        for outcome in ("hits", "disk_hits", "misses"):
+            lines.append(f"docgen_render_cache_lookups_total{{{_labels(outcome=outcome)}}} {stats[outcome]}")
+        lines.append("# TYPE docgen_render_cache_evictions_total counter")
+        lines.append(f"docgen_render_cache_evictions_total {stats['evictions']}")
+        lines.append("# TYPE docgen_render_cache_entries gauge")
+        lines.append(f"docgen_render_cache_entries {stats['entries']}")
+        lines.append("# TYPE docgen_render_cache_bytes gauge")
+        lines.append(f"docgen_render_cache_bytes {stats['bytes']}")
+        artifacts = artifact_store.stats()
+        lines.append("# HELP docgen_artifact_bytes Downloads held for sessions, in memory, shared with the render cache or spilled to disk.")
+        lines.append("# TYPE docgen_artifact_bytes gauge")
+        lines.append(f"docgen_artifact_bytes{{{_labels(tier='memory')}}} {artifacts['memory_bytes']}")
+        lines.append(f"docgen_artifact_bytes{{{_labels(tier='shared')}}} {artifacts['shared_bytes']}")
+        lines.append(f"docgen_artifact_bytes{{{_labels(tier='disk')}}} {artifacts['disk_bytes']}")
+        lines.append("# TYPE docgen_artifact_entries gauge")
+        lines.append(f"docgen_artifact_entries {artifacts['entries']}")
+        lines.append("# TYPE docgen_artifact_spills_total counter")
+        lines.append(f"docgen_artifact_spills_total {artifacts['spills']}")
+        lines.append("# TYPE docgen_artifact_expired_total counter")
+        lines.append(f"docgen_artifact_expired_total {artifacts['expired']}")
+        jobs = export_jobs.stats()
+        lines.append("# HELP docgen_export_jobs Background export renders by state.")
+        lines.append("# TYPE docgen_export_jobs gauge")
+        for state in ("pending", "running"):
+            lines.append(f"docgen_export_jobs{{{_labels(state=state)}}} {jobs[state]}")
+        lines.append("# TYPE docgen_export_jobs_total counter")
+        for outcome in ("submitted", "coalesced", "cancelled"):
+            lines.append(f"docgen_export_jobs_total{{{_labels(outcome=outcome)}}} {jobs[outcome]}")
+        lines.append("# TYPE docgen_profiler_running gauge")
+        lines.append(f"docgen_profiler_running {int(profiler.running)}")
+        lines.append("# TYPE docgen_profiler_samples_total counter")
+        lines.append(f"docgen_profiler_samples_total {profiler.samples}")
+        lines.append("# TYPE docgen_metrics_start_time_seconds gauge")
+        lines.append(f"docgen_metrics_start_time_seconds {self.started:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def _histogram_lines(self, lines, name, histogram, **labels):
+        for bound, total in histogram.cumulative():
+            lines.append(f"{name}_bucket{{{_labels(**labels, le=_bound(bound))}}} {total}")
+        lines.append(f"{name}_sum{{{_labels(**labels)}}} {histogram.sum:.6f}")
+        lines.append(f"{name}_count{{{_labels(**labels)}}} {histogram.count}")
+
+    # Write the Prometheus text to `path` (default DOCGEN_METRICS_FILE), atomically
+    def dump(self, path=None):
+        path = path or self.dump_path
+        if not path:
+            return None
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+        return path
+
+    def maybe_dump(self, force=False):
+        if not self.dump_path:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_dump < DUMP_INTERVAL:
+                return
+            self._last_dump = now
+        try:
+            self.dump()
+        except OSError:
+            pass
+
+
+# Leaf frames of threads that are waiting rather than working; their samples are skipped
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("socket.py", "accept"),
+    ("connection.py", "wait"),
+}
+
+
+def _frame_name(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+# Statistical profiler that samples the Python stacks of every thread with
+# sys._current_frames() from a background thread. It can be started and stopped
+# at any time, e.g. from the Metrics page, and its overhead is a stack walk per
+# thread per interval. Stacks are kept in folded form for flame graph tools.
+class SamplingProfiler:
+    def __init__(self, interval=0.005, max_depth=64, max_stacks=10000):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.max_stacks = max_stacks
+        self.stacks = Counter()
+        self.samples = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="docgen-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def reset(self):
+        with self._lock:
+            self.stacks.clear()
+            self.samples = 0
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+                names = []
+                while frame is not None and len(names) < self.max_depth:
+                    names.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                stack = ";".join(reversed(names))
+                with self._lock:
+                    if stack in self.stacks or len(self.stacks) < self.max_stacks:
+                        self.stacks[stack] += 1
+                    else:
+                        self.stacks["[other]"] += 1
+                    self.samples += 1
+
+    # "frame;frame;frame count" lines, the input format of flamegraph.pl and speedscope
+    def folded(self):
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    # Functions ranked by the share of samples in which they were running (self)
+    # or on the stack (total)
+    def top(self, limit=20):
+        own, total = Counter(), Counter()
+        with self._lock:
+            samples = self.samples or 1
+            for stack, count in self.stacks.items():
+                names = stack.split(";")
+                own[names[-1]] += count
+                for name in set(names):
+                    total[name] += count
+        return [{"function": name, "self_pct": round(100 * count / samples, 1),
+                 "total_pct": round(100 * total[name] / samples, 1)}
+                for name, count in own.most_common(limit)]
+
+
+metrics = Metrics(dump_path=os.environ.get("DOCGEN_METRICS_FILE") or None)
+profiler = SamplingProfiler()
+
+# Whether the Metrics page offers the controls that act on the whole process
+# (starting the profiler, resetting figures, writing the dump). Off by
+# default, since every visitor of the app shares them.
+controls_enabled = os.environ.get("DOCGEN_METRICS_CONTROLS", "").lower() in ("1", "true", "yes", "on")
+
+if metrics.dump_path:
+    atexit.register(metrics.maybe_dump, force=True)
+if os.environ.get("DOCGEN_PROFILE", "").lower() in ("1", "true", "yes", "on"):
+    profiler.start()
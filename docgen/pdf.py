@@ -0,0 +1,503 @@
+import functools
+import hashlib
+import io
+import os
+import threading
+import zlib
+from collections import OrderedDict, namedtuple
+
+from docgen.metrics import metrics
+from docgen.pdf_metrics import HELVETICA_BOLD_WIDTHS, HELVETICA_WIDTHS
+
+# A4 page in points, with 15mm margins
+PAGE_WIDTH = 595.28
+PAGE_HEIGHT = 841.89
+MARGIN = 15 * 72 / 25.4
+TEXT_WIDTH = PAGE_WIDTH - 2 * MARGIN
+
+TITLE_SIZE = 16
+HEADING_SIZE = 13
+BODY_SIZE = 11
+LEADING = 1.35
+BULLET_INDENT = 14
+FOOTER_SIZE = 9
+
+# Documents of this many pages or more get a table of contents after the
+# title, page numbers in the footer and bookmarks
+CONTENTS_MIN_PAGES = 2
+CONTENTS_HEADING = "Contents"
+
+# Room kept at the right of each contents line for its page number
+PAGE_NUMBER_WIDTH = 36
+
+# TrueType fonts looked up when DOCGEN_PDF_FONT is not set; the devcontainer
+# and Streamlit Cloud install them from packages.txt (fonts-dejavu-core)
+FONT_CANDIDATES = (
+    ("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"),
+    ("/usr/share/fonts/dejavu/DejaVuSans.ttf", "/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf"),
+    ("/usr/share/fonts/TTF/DejaVuSans.ttf", "/usr/share/fonts/TTF/DejaVuSans-Bold.ttf"),
+)
+
+# Font subsets kept per process, keyed by the set of characters they cover
+SUBSET_CACHE_SIZE = 64
+
+# Characters every font subset includes
+SUBSET_BASE = frozenset(map(chr, range(0x20, 0x7F)))
+
+# Word widths are memoized per font until the cache reaches this many words
+WORD_CACHE_SIZE = 50000
+
+
+# Characters that cannot be drawn (control characters and lone surrogates,
+# which are not printable) are dropped; tabs become spaces
+def clean_text(text):
+    if text.isprintable():
+        return text
+    return "".join(" " if ch == "\t" else ch for ch in text if ch == "\t" or ch.isprintable())
+
+
+# Width lookups shared by both font kinds; widths are in 1/1000 em
+class _Metrics:
+    def __init__(self):
+        self._char_widths = {}
+        self._word_widths = {}
+
+    def char_width(self, ch):
+        width = self._char_widths.get(ch)
+        if width is None:
+            width = self._char_widths[ch] = self._lookup_width(ch)
+        return width
+
+    def word_width(self, word):
+        width = self._word_widths.get(word)
+        if width is None:
+            if len(self._word_widths) >= WORD_CACHE_SIZE:
+                self._word_widths.clear()
+            char_width = self.char_width
+            width = self._word_widths[word] = sum(char_width(ch) for ch in word)
+        return width
+
+
+# One of the standard PDF fonts; needs no embedding but only covers cp1252
+class CoreFont(_Metrics):
+    embedded = False
+
+    def __init__(self, name, widths):
+        super().__init__()
+        self.name = name
+        self._widths = widths
+
+    def prepare(self, text):
+        # Show unsupported characters as "?" so measuring matches drawing
+        return clean_text(text).encode("cp1252", "replace").decode("cp1252")
+
+    def _lookup_width(self, ch):
+        code = ch.encode("cp1252", "replace")[0]
+        return self._widths[code - 32] if code >= 32 else 0
+
+    def encode(self, text):
+        escaped = text.encode("cp1252", "replace").replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+        return b"(" + escaped + b")"
+
+
+# A TrueType font parsed once per process; documents embed a subset of it
+class TrueTypeFont(_Metrics):
+    embedded = True
+
+    def __init__(self, path):
+        from fontTools.ttLib import TTFont
+
+        super().__init__()
+        with open(path, "rb") as f:
+            self.data = f.read()
+        font = TTFont(io.BytesIO(self.data), lazy=True)
+        scale = 1000 / font["head"].unitsPerEm
+        self.cmap = font.getBestCmap()
+        self._advances = {name: advance for name, (advance, _) in font["hmtx"].metrics.items()}
+        self._scale = scale
+        head, hhea = font["head"], font["hhea"]
+        os2 = font["OS/2"] if "OS/2" in font else None
+        self.name = "".join(ch for ch in (font["name"].getDebugName(6) or "Font") if ch.isalnum() or ch == "-")
+        self.bbox = [round(v * scale) for v in (head.xMin, head.yMin, head.xMax, head.yMax)]
+        self.ascent = round(hhea.ascent * scale)
+        self.descent = round(hhea.descent * scale)
+        self.cap_height = round(getattr(os2, "sCapHeight", 0) * scale) or self.ascent
+        self.italic_angle = font["post"].italicAngle if "post" in font else 0
+        self._subsets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def prepare(self, text):
+        return clean_text(text)
+
+    def _lookup_width(self, ch):
+        name = self.cmap.get(ord(ch))
+        if name is None:
+            return self._advances.get(".notdef", 0) * self._scale
+        return self._advances[name] * self._scale
+
+    # Subset the font to `chars` plus printable ASCII, so documents that differ
+    # only in their ASCII text share one subset; returns (font bytes, glyph id
+    # per char, width per glyph id)
+    def subset(self, chars):
+        key = SUBSET_BASE.union(chars)
+        with self._lock:
+            cached = self._subsets.get(key)
+            if cached is not None:
+                self._subsets.move_to_end(key)
+                return cached
+        cached = self._build_subset(key)
+        with self._lock:
+            self._subsets[key] = cached
+            while len(self._subsets) > SUBSET_CACHE_SIZE:
+                self._subsets.popitem(last=False)
+        return cached
+
+    def _build_subset(self, chars):
+        from fontTools import subset
+        from fontTools.ttLib import TTFont
+
+        options = subset.Options()
+        options.layout_features = []
+        options.hinting = False
+        options.notdef_outline = True
+        options.name_IDs = []
+        options.glyph_names = False
+        options.drop_tables += ["FFTM", "GDEF", "GPOS", "GSUB", "kern"]
+        # Keep the font's own modification time rather than stamping the
+        # current one, so a subset depends only on its characters
+        font = TTFont(io.BytesIO(self.data), recalcTimestamp=False)
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(unicodes=[ord(ch) for ch in chars if ord(ch) in self.cmap])
+        subsetter.subset(font)
+
+        gids = {}
+        widths = {0: round(self._advances.get(".notdef", 0) * self._scale)}
+        for ch in chars:
+            name = self.cmap.get(ord(ch))
+            gid = font.getGlyphID(name) if name is not None else 0
+            gids[ch] = gid
+            widths[gid] = round(self.char_width(ch))
+        output = io.BytesIO()
+        font.save(output)
+        return output.getvalue(), gids, widths
+
+
+# The regular and bold fonts used for every PDF, loaded once per process
+@functools.lru_cache(maxsize=1)
+def load_fonts():
+    regular = os.environ.get("DOCGEN_PDF_FONT")
+    bold = os.environ.get("DOCGEN_PDF_FONT_BOLD")
+    if not regular:
+        for candidate_regular, candidate_bold in FONT_CANDIDATES:
+            if os.path.exists(candidate_regular):
+                regular = candidate_regular
+                bold = bold or (candidate_bold if os.path.exists(candidate_bold) else None)
+                break
+    if regular:
+        regular_font = TrueTypeFont(regular)
+        return regular_font, TrueTypeFont(bold) if bold else regular_font
+    return CoreFont("Helvetica", HELVETICA_WIDTHS), CoreFont("Helvetica-Bold", HELVETICA_BOLD_WIDTHS)
+
+
+# Break text into lines no wider than `width` points, using cached word widths.
+# "\n" starts a new line; words wider than a line are split between characters.
+def wrap(text, font, size, width):
+    limit = width * 1000 / size
+    space = font.char_width(" ")
+    lines = []
+    for raw in text.split("\n"):
+        line, used = [], 0
+        for word in raw.split():
+            word_width = font.word_width(word)
+            if word_width > limit:
+                if line:
+                    lines.append(" ".join(line))
+                    line, used = [], 0
+                chunk, chunk_width = "", 0
+                for ch in word:
+                    ch_width = font.char_width(ch)
+                    if chunk and chunk_width + ch_width > limit:
+                        lines.append(chunk)
+                        chunk, chunk_width = "", 0
+                    chunk += ch
+                    chunk_width += ch_width
+                line, used = [chunk], chunk_width
+            elif line and used + space + word_width > limit:
+                lines.append(" ".join(line))
+                line, used = [word], word_width
+            else:
+                used += word_width + (space if line else 0)
+                line.append(word)
+        lines.append(" ".join(line))
+    return lines
+
+
+# A block of text measured once: its font, size and left edge, its wrapped
+# lines and the space above and below it, in points. A block that `keep`s
+# stays on the page of the first line after it (headings). `section` is the
+# index of the section a heading starts, `entry` the section a line of the
+# table of contents points to.
+Block = namedtuple("Block", "font size x lines prefix space_before space_after keep section entry")
+
+
+def _block(text, font, size, indent=0, prefix=None, space_before=0, space_after=4, keep=False, section=None,
+           entry=None, width=TEXT_WIDTH):
+    lines = tuple(wrap(font.prepare(text), font, size, width - indent))
+    return Block(font, size, MARGIN + indent, lines, prefix, space_before, space_after, keep, section, entry)
+
+
+# First pass: wrap every block of the outline into lines, once
+def measure(outline, regular, bold):
+    bullet = "•" if regular.embedded and ord("•") in regular.cmap else "-"
+    blocks = [_block(outline.title, bold, TITLE_SIZE, space_after=8)]
+    for index, section in enumerate(outline.sections):
+        if section.heading:
+            blocks.append(_block(section.heading, bold, HEADING_SIZE, space_before=6, keep=True, section=index))
+        for kind, value in section.blocks:
+            if kind == "bullets":
+                for item in value:
+                    blocks.append(_block(item, regular, BODY_SIZE, indent=BULLET_INDENT, prefix=bullet, space_after=2))
+                if value:
+                    blocks[-1] = blocks[-1]._replace(space_after=4)
+            else:
+                blocks.append(_block(value, regular, BODY_SIZE))
+    return blocks
+
+
+# The table of contents: a heading and one line per section heading, wrapped
+# short of the page number column
+def measure_contents(outline, regular, bold):
+    entries = [_block(section.heading, regular, BODY_SIZE, space_after=2, entry=index,
+                      width=TEXT_WIDTH - PAGE_NUMBER_WIDTH)
+               for index, section in enumerate(outline.sections) if section.heading]
+    if not entries:
+        return []
+    entries[-1] = entries[-1]._replace(space_after=8)
+    return [_block(CONTENTS_HEADING, bold, HEADING_SIZE, space_before=6, keep=True)] + entries
+
+
+# Second pass: break measured blocks into pages of positioned lines
+# (font, size, x, y, text). Only line heights are added up here, so this is
+# cheap enough to run again once a table of contents is inserted. Also
+# returns where each section starts, (page, y), and for each contents entry
+# the (page, y) of its lines and the slot, (page, position), left empty after
+# them for its page number.
+def paginate(blocks):
+    top = PAGE_HEIGHT - MARGIN
+    pages = [[]]
+    sections, entries = {}, {}
+    y = top
+    for index, block in enumerate(blocks):
+        leading = block.size * LEADING
+        if y < top:
+            y -= block.space_before
+        # A heading that would end a page starts the next one instead
+        if block.keep and y < top and index + 1 < len(blocks):
+            following = blocks[index + 1]
+            needed = (len(block.lines) * leading + block.space_after + following.space_before
+                      + following.size * LEADING)
+            if y - needed < MARGIN:
+                pages.append([])
+                y = top
+        placed = []
+        for i, line in enumerate(block.lines):
+            if y - leading < MARGIN:
+                pages.append([])
+                y = top
+            y -= leading
+            placed.append((len(pages) - 1, y))
+            if i == 0 and block.prefix:
+                pages[-1].append((block.font, block.size, block.x - BULLET_INDENT, y, block.prefix))
+            if line:
+                pages[-1].append((block.font, block.size, block.x, y, line))
+        if block.entry is not None:
+            pages[-1].append(None)
+            entries[block.entry] = (placed, (len(pages) - 1, len(pages[-1]) - 1))
+        y -= block.space_after
+        if block.section is not None:
+            sections[block.section] = (placed[0][0], placed[0][1] + block.size * LEADING)
+    return pages, sections, entries
+
+
+# Lay out an outline: measure it once, then paginate it. A document that runs
+# over CONTENTS_MIN_PAGES or more is paginated again with a table of contents
+# after its title, and its contents page numbers and page footers are filled
+# in from the final page breaks without wrapping any text again. Returns the
+# pages and the (page, y) where each section starts.
+def layout(outline, regular, bold):
+    blocks = measure(outline, regular, bold)
+    pages, sections, entries = paginate(blocks)
+    if len(pages) < CONTENTS_MIN_PAGES:
+        return pages, {}
+    pages, sections, entries = paginate(blocks[:1] + measure_contents(outline, regular, bold) + blocks[1:])
+
+    for index, (lines, (page, position)) in entries.items():
+        number = str(sections[index][0] + 1)
+        width = regular.word_width(number) * BODY_SIZE / 1000
+        pages[page][position] = (regular, BODY_SIZE, MARGIN + TEXT_WIDTH - width, lines[-1][1], number)
+    for number, page in enumerate(pages, start=1):
+        footer = f"Page {number} of {len(pages)}"
+        width = regular.word_width(footer) * FOOTER_SIZE / 1000
+        page.append((regular, FOOTER_SIZE, (PAGE_WIDTH - width) / 2, MARGIN / 2, footer))
+    return pages, {index: (start, entries[index][0] if index in entries else ()) for index, start in sections.items()}
+
+
+def _pdf_string(text):
+    return b"<FEFF" + clean_text(text).encode("utf-16-be").hex().upper().encode("ascii") + b">"
+
+
+def _stream(data, extra=b""):
+    compressed = zlib.compress(data, 6)
+    return b"<< /Length %d /Filter /FlateDecode%s >>\nstream\n%s\nendstream" % (len(compressed), extra, compressed)
+
+
+def _to_unicode(gids):
+    entries = sorted((gid, ch) for ch, gid in gids.items() if gid)
+    lines = [b"/CIDInit /ProcSet findresource begin 12 dict begin begincmap",
+             b"/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def",
+             b"/CMapName /Adobe-Identity-UCS def /CMapType 2 def",
+             b"1 begincodespacerange <0000> <FFFF> endcodespacerange"]
+    for start in range(0, len(entries), 100):
+        chunk = entries[start:start + 100]
+        lines.append(b"%d beginbfchar" % len(chunk))
+        for gid, ch in chunk:
+            lines.append(b"<%04X> <%s>" % (gid, ch.encode("utf-16-be").hex().upper().encode("ascii")))
+        lines.append(b"endbfchar")
+    lines.append(b"endcmap CMapName currentdict /CMap defineresource pop end end")
+    return b"\n".join(lines)
+
+
+# Collects numbered PDF objects and writes them with a cross-reference table
+class _Writer:
+    def __init__(self):
+        self.objects = []
+
+    def reserve(self):
+        self.objects.append(None)
+        return len(self.objects)
+
+    def set(self, number, body):
+        self.objects[number - 1] = body
+
+    def add(self, body):
+        self.objects.append(body)
+        return len(self.objects)
+
+    def output(self, root, info):
+        out = io.BytesIO()
+        out.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for number, body in enumerate(self.objects, start=1):
+            offsets.append(out.tell())
+            out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+        xref = out.tell()
+        out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(self.objects) + 1))
+        for offset in offsets:
+            out.write(b"%010d 00000 n \n" % offset)
+        # The file identifier is a hash of the content rather than of the time
+        # and place it was written, so identical documents are identical bytes
+        file_id = hashlib.md5(out.getbuffer(), usedforsecurity=False).hexdigest().upper().encode("ascii")
+        out.write(b"trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R /ID [<%s> <%s>] >>\nstartxref\n%d\n%%%%EOF\n"
+                  % (len(self.objects) + 1, root, info, file_id, file_id, xref))
+        return out.getvalue()
+
+
+def _embed_font(writer, font, chars):
+    if not font.embedded:
+        return writer.add(b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>"
+                          % font.name.encode("ascii")), None
+    data, gids, widths = font.subset(chars)
+    # Deterministic subset tag, so identical documents produce identical bytes
+    digest = hashlib.sha1("".join(sorted(chars)).encode("utf-8")).digest()
+    tag = "".join(chr(65 + b % 26) for b in digest[:6])
+    base_font = f"{tag}+{font.name}".encode("ascii")
+    font_file = writer.add(_stream(data, b" /Length1 %d" % len(data)))
+    descriptor = writer.add(
+        b"<< /Type /FontDescriptor /FontName /%s /Flags 32 /FontBBox [%s] /ItalicAngle %d /Ascent %d /Descent %d "
+        b"/CapHeight %d /StemV 80 /FontFile2 %d 0 R >>"
+        % (base_font, " ".join(map(str, font.bbox)).encode("ascii"), font.italic_angle, font.ascent, font.descent,
+           font.cap_height, font_file))
+    w = b" ".join(b"%d [%d]" % (gid, width) for gid, width in sorted(widths.items()))
+    cid_font = writer.add(
+        b"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /%s /CIDSystemInfo << /Registry (Adobe) "
+        b"/Ordering (Identity) /Supplement 0 >> /FontDescriptor %d 0 R /W [%s] /CIDToGIDMap /Identity >>"
+        % (base_font, descriptor, w))
+    to_unicode = writer.add(_stream(_to_unicode(gids)))
+    return writer.add(b"<< /Type /Font /Subtype /Type0 /BaseFont /%s /Encoding /Identity-H "
+                      b"/DescendantFonts [%d 0 R] /ToUnicode %d 0 R >>" % (base_font, cid_font, to_unicode)), gids
+
+
+# Function to generate the bytes of a PDF version of a document outline
+def render_outline_pdf(outline):
+    regular, bold = load_fonts()
+    with metrics.timed("pdf_layout"):
+        pages, sections = layout(outline, regular, bold)
+
+    fonts = [regular] if bold is regular else [regular, bold]
+    used = {id(font): set() for font in fonts}
+    for page in pages:
+        for font, _, _, _, text in page:
+            used[id(font)].update(text)
+
+    writer = _Writer()
+    catalog = writer.reserve()
+    page_tree = writer.reserve()
+    info = writer.add(b"<< /Producer (docgen) /Title %s >>" % _pdf_string(outline.title))
+    resources, encoders = [], {}
+    for number, font in enumerate(fonts, start=1):
+        ref, gids = _embed_font(writer, font, used[id(font)])
+        resources.append(b"/F%d %d 0 R" % (number, ref))
+        if gids is None:
+            encoders[id(font)] = (b"/F%d" % number, font.encode)
+        else:
+            # Glyph ids as hex, one translate() call per line
+            table = {ord(ch): "%04X" % gid for ch, gid in gids.items()}
+            encoders[id(font)] = (b"/F%d" % number,
+                                  lambda text, table=table: b"<" + text.translate(table).encode("ascii") + b">")
+    resources = b"<< /Font << %s >> >>" % b" ".join(resources)
+
+    kids = [writer.reserve() for _ in pages]
+
+    def destination(index):
+        page, y = sections[index][0]
+        return b"[%d 0 R /XYZ null %.2f null]" % (kids[page], y)
+
+    # Each line of the table of contents links to its section
+    links = [[] for _ in pages]
+    for index, (_, lines) in sections.items():
+        for page, y in lines:
+            links[page].append(writer.add(
+                b"<< /Type /Annot /Subtype /Link /Rect [%.2f %.2f %.2f %.2f] /Border [0 0 0] /Dest %s >>"
+                % (MARGIN, y - BODY_SIZE * 0.3, MARGIN + TEXT_WIDTH, y + BODY_SIZE, destination(index))))
+
+    for page, kid, annots in zip(pages, kids, links):
+        ops = []
+        for font, size, x, y, text in page:
+            name, encode = encoders[id(font)]
+            ops.append(b"BT %s %g Tf %.2f %.2f Td %s Tj ET" % (name, size, x, y, encode(text)))
+        contents = writer.add(_stream(b"\n".join(ops)))
+        annots = b" /Annots [%s]" % b" ".join(b"%d 0 R" % annot for annot in annots) if annots else b""
+        writer.set(kid, b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %.2f %.2f] /Resources %s /Contents %d 0 R%s >>"
+                   % (page_tree, PAGE_WIDTH, PAGE_HEIGHT, resources, contents, annots))
+    writer.set(page_tree, b"<< /Type /Pages /Kids [%s] /Count %d >>"
+               % (b" ".join(b"%d 0 R" % kid for kid in kids), len(kids)))
+
+    # Bookmarks mirroring the table of contents
+    bookmarks = b""
+    if sections:
+        root = writer.reserve()
+        order = sorted(sections)
+        items = [writer.reserve() for _ in order]
+        for n, index in enumerate(order):
+            item = [b"/Title " + _pdf_string(outline.sections[index].heading), b"/Parent %d 0 R" % root,
+                    b"/Dest " + destination(index)]
+            if n:
+                item.append(b"/Prev %d 0 R" % items[n - 1])
+            if n + 1 < len(items):
+                item.append(b"/Next %d 0 R" % items[n + 1])
+            writer.set(items[n], b"<< %s >>" % b" ".join(item))
+        writer.set(root, b"<< /Type /Outlines /First %d 0 R /Last %d 0 R /Count %d >>"
+                   % (items[0], items[-1], len(items)))
+        bookmarks = b" /Outlines %d 0 R /PageMode /UseOutlines" % root
+    writer.set(catalog, b"<< /Type /Catalog /Pages %d 0 R%s >>" % (page_tree, bookmarks))
+    return writer.output(catalog, info)
@@ -0,0 +1,234 @@
+import io
+import re
+import tempfile
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from docgen.batch import zip_entry
+from docgen.documents.pia import TEMPLATE, default_inputs
+from docgen.render import render_bytes
+from docgen.template import FilledSection, Outline
+
+# Rows parsed and scored at a time
+CHUNK_ROWS = 1000
+
+# Columns naming the project an assessment is for, checked in order
+PROJECT_COLUMNS = ("project", "project_name", "name", "title")
+
+# Weighted keyword patterns scored across every row of one answer at once.
+# Each pattern counts once per row however often it matches.
+RISK_TERMS = {
+    "risks": (
+        (r"\bbreach|leak|exfiltrat", 3, "past or expected breach"),
+        (r"unencrypted|plain ?text|not encrypted", 3, "unencrypted data"),
+        (r"profil|automated decision|scoring", 2, "profiling or automated decisions"),
+        (r"surveil|monitor|track", 2, "monitoring or tracking"),
+        (r"third[- ]part|vendor|processor|outsourc", 2, "third parties"),
+        (r"transfer|overseas|abroad|cross[- ]border", 2, "international transfers"),
+        (r"large[- ]scale|millions?|nationwide", 2, "large scale processing"),
+        (r"re-?identif|linkab", 2, "re-identification"),
+    ),
+    "data_types": (
+        (r"health|medical|diagnos|patient", 4, "health data"),
+        (r"biometric|fingerprint|face|facial|voice ?print", 4, "biometric data"),
+        (r"genetic|dna", 4, "genetic data"),
+        (r"racial|ethnic|religio|political|sexual|trade union", 4, "special category data"),
+        (r"criminal|conviction|offen[cs]e", 4, "criminal records"),
+        (r"child|minor|student|pupil", 3, "children's data"),
+        (r"social security|ssn|passport|national id|driver'?s? licen", 3, "government identifiers"),
+        (r"financial|payment|credit card|bank|iban", 2, "financial data"),
+        (r"location|gps|geoloc", 2, "location data"),
+    ),
+    "retention": (
+        (r"indefinite|forever|permanent|no limit|unlimited|not defined|undecided|unknown", 4, "no retention limit"),
+    ),
+}
+
+# Mitigations mentioned in the risks or protection answers lower the score
+MITIGATION_TERMS = (
+    (r"encrypt", 1, "encryption"),
+    (r"pseudonym|anonymi|de-?identif|tokeni", 1, "pseudonymization"),
+    (r"access control|least privilege|role[- ]based|mfa|multi[- ]factor", 1, "access controls"),
+    (r"mitigat|audit|review|dpia|training", 1, "reviews and training"),
+)
+
+# Report zips larger than this are spooled to a temporary file instead of memory
+SPOOL_MAX_BYTES = 1024 * 1024
+
+# Retention longer than this many months scores 2, beyond twice as long 3
+RETENTION_MONTHS = 24
+
+_UNIT_MONTHS = {"day": 1 / 30, "week": 7 / 30, "month": 1, "year": 12}
+
+# Score ranges of each risk level
+LEVELS = ((-np.inf, 4, "Low"), (4, 9, "Medium"), (9, np.inf, "High"))
+
+
+# Canonical column names: "Data Types" and "data-types" both become data_types
+def _column(name):
+    return re.sub(r"[^a-z0-9]+", "_", str(name).strip().lower()).strip("_")
+
+
+def _frame(rows, columns):
+    frame = pd.DataFrame(rows, columns=columns, dtype=object)
+    return frame.fillna("").astype(str)
+
+
+# Yield the assessments of a CSV or XLSX upload as DataFrames of up to
+# `chunk_rows` rows, so memory use does not grow with the file
+def read_chunks(file, name, chunk_rows=CHUNK_ROWS):
+    if name.lower().endswith((".xlsx", ".xlsm")):
+        yield from _read_xlsx(file, chunk_rows)
+        return
+    if isinstance(file, (bytes, bytearray)):
+        file = io.BytesIO(file)
+    reader = pd.read_csv(file, dtype=str, keep_default_na=False, chunksize=chunk_rows, encoding="utf-8-sig")
+    for chunk in reader:
+        yield chunk
+
+
+def _read_xlsx(file, chunk_rows):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("Reading .xlsx files requires openpyxl (pip install openpyxl)") from None
+    if isinstance(file, (bytes, bytearray)):
+        file = io.BytesIO(file)
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(value) if value is not None else f"column_{i}" for i, value in enumerate(header)]
+        batch = []
+        for row in rows:
+            if any(value not in (None, "") for value in row):
+                batch.append(row[:len(columns)])
+            if len(batch) == chunk_rows:
+                yield _frame(batch, columns)
+                batch = []
+        if batch:
+            yield _frame(batch, columns)
+    finally:
+        workbook.close()
+
+
+# Rename a chunk's columns to the PIA fields, fill missing fields with blanks
+# and name every row's project. `offset` is the number of rows already read.
+def normalize_chunk(chunk, offset=0):
+    chunk = chunk.rename(columns=_column)
+    fields = list(default_inputs())
+    if not set(fields) & set(chunk.columns):
+        raise ValueError(f"No assessment columns found; expected some of: {', '.join(fields)}")
+    frame = pd.DataFrame(index=chunk.index)
+    project = next((column for column in PROJECT_COLUMNS if column in chunk.columns), None)
+    rows = pd.Series(np.arange(offset + 1, offset + len(chunk) + 1), index=chunk.index)
+    fallback = "Row " + rows.astype(str)
+    frame["project"] = chunk[project].str.strip().replace("", np.nan).fillna(fallback) if project else fallback
+    for field in fields:
+        frame[field] = chunk[field].fillna("").astype(str).str.strip() if field in chunk.columns else ""
+    frame["row"] = rows
+    return frame
+
+
+def _matches(text, pattern):
+    return text.str.contains(pattern, case=False, regex=True).to_numpy()
+
+
+def _retention_months(retention):
+    found = retention.str.extract(r"(\d+(?:\.\d+)?)\s*(day|week|month|year)", flags=re.IGNORECASE)
+    amount = pd.to_numeric(found[0], errors="coerce").to_numpy()
+    unit = found[1].str.lower().map(_UNIT_MONTHS).to_numpy(dtype=float)
+    return amount * unit
+
+
+# Score every row of a normalized chunk at once. Adds the score, its level and
+# the reasons behind it; each keyword pattern is one vectorized pass per column.
+def score_chunk(frame):
+    count = len(frame)
+    score = np.zeros(count)
+    reasons = [[] for _ in range(count)]
+
+    def add(mask, points, reason):
+        np.add(score, np.where(mask, points, 0), out=score)
+        for i in np.flatnonzero(mask):
+            reasons[i].append(reason)
+
+    for field, terms in RISK_TERMS.items():
+        text = frame[field]
+        for pattern, points, reason in terms:
+            add(_matches(text, pattern), points, reason)
+
+    months = _retention_months(frame["retention"])
+    add(months > RETENTION_MONTHS * 2, 3, f"retention over {RETENTION_MONTHS * 2} months")
+    add((months > RETENTION_MONTHS) & (months <= RETENTION_MONTHS * 2), 2, f"retention over {RETENTION_MONTHS} months")
+
+    for field in ("risks", "data_types", "retention", "protection"):
+        add((frame[field] == "").to_numpy(), 2, f"no answer to {field.replace('_', ' ')}")
+
+    safeguards = frame["risks"] + " " + frame["protection"]
+    for pattern, points, reason in MITIGATION_TERMS:
+        add(_matches(safeguards, pattern), -points, f"mitigation: {reason}")
+
+    scored = frame.copy()
+    scored["score"] = np.maximum(score, 0).astype(int)
+    bins = [low for low, _, _ in LEVELS] + [LEVELS[-1][1]]
+    scored["level"] = pd.cut(scored["score"], bins=bins, labels=[level for _, _, level in LEVELS], right=False)
+    scored["level"] = scored["level"].astype(str)
+    scored["reasons"] = ["; ".join(found) for found in reasons]
+    return scored
+
+
+# Parse and score a whole upload chunk by chunk. Returns every assessment,
+# highest risk first.
+def score_upload(file, name, chunk_rows=CHUNK_ROWS):
+    scored = []
+    offset = 0
+    for chunk in read_chunks(file, name, chunk_rows):
+        scored.append(score_chunk(normalize_chunk(chunk, offset)))
+        offset += len(chunk)
+    if not scored:
+        raise ValueError("The file has no assessments")
+    ranked = pd.concat(scored, ignore_index=True)
+    ranked = ranked.sort_values(["score", "row"], ascending=[False, True], kind="stable", ignore_index=True)
+    ranked.insert(0, "rank", np.arange(1, len(ranked) + 1))
+    return ranked
+
+
+# Ranked summary as CSV: rank, project, score, level and reasons
+def summary_csv(ranked):
+    return ranked[["rank", "project", "score", "level", "reasons"]].to_csv(index=False).encode("utf-8")
+
+
+# The PIA report of one scored assessment, with its risk score as a last section
+def assessment_outline(row):
+    outline = TEMPLATE.fill({field: row[field] for field in default_inputs()})
+    scoring = FilledSection("8. Risk Score", (
+        ("paragraph", f"Project: {row['project']}\nScore: {row['score']} ({row['level']} risk, "
+                      f"rank {row['rank']})"),
+        ("bullets", tuple(row["reasons"].split("; ")) if row["reasons"] else ("No risk indicators found.",)),
+    ))
+    return Outline(f"{outline.title}: {row['project']}", outline.sections + (scoring,))
+
+
+def _safe_name(name):
+    return re.sub(r"[^\w.-]+", "_", name).strip("_")[:80] or "project"
+
+
+# Zip of the ranked summary and one report per assessment in each format,
+# rendered one row at a time into a spooled file, returned rewound
+def reports_zip(ranked, formats=("pdf",)):
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    with zipfile.ZipFile(spool, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(zip_entry("summary.csv", "csv"), summary_csv(ranked))
+        width = len(str(len(ranked)))
+        for row in ranked.to_dict("records"):
+            outline = assessment_outline(row)
+            stem = f"{row['rank']:0{width}d}_{_safe_name(row['project'])}"
+            for fmt in formats:
+                archive.writestr(zip_entry(f"{fmt}/{stem}.{fmt}", fmt), render_bytes(outline, fmt))
+    spool.seek(0)
+    return spool
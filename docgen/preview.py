@@ -0,0 +1,43 @@
+from docgen.metrics import metrics
+from docgen.render import join_text, render_section_text
+from docgen.template import fill_text
+
+
+# Live plain-text preview of a template that keeps each section's rendered
+# text and, on every update, re-renders only the sections (and title) whose
+# form inputs changed since the previous update
+class IncrementalPreview:
+    def __init__(self, template):
+        self.template = template
+        self.inputs = None
+        self.title = None
+        self.section_texts = [None] * len(template.sections)
+        self.sections_rendered = 0
+
+    def _changed(self, inputs):
+        if self.inputs is None:
+            return None
+        return {name for name in self.template.fields if inputs.get(name) != self.inputs.get(name)}
+
+    def update(self, inputs):
+        with metrics.timed("preview"):
+            changed = self._changed(inputs)
+            if changed is None or changed:
+                values = self.template.resolve(inputs)
+                if changed is None or self.template.title_inputs & changed:
+                    self.title = fill_text(self.template.title, values)
+                for i, section in enumerate(self.template.sections):
+                    if changed is None or self.template.section_inputs[i] & changed:
+                        self.section_texts[i] = render_section_text(section.fill(values))
+                        self.sections_rendered += 1
+                self.inputs = dict(inputs)
+            return join_text(self.title, self.section_texts)
+
+
+# The preview kept in a session's state for `key`; it is replaced when the
+# template changes, e.g. after the module was reloaded during development
+def session_preview(state, key, template):
+    preview = state.get(key)
+    if preview is None or preview.template is not template:
+        preview = state[key] = IncrementalPreview(template)
+    return preview
@@ -0,0 +1,348 @@
+import datetime
+import functools
+import hashlib
+import json
+import os
+from collections import namedtuple
+
+from docgen.clauses import Clauses, clause_library
+from docgen.deadlines import rule_table
+from docgen.template import Bullets, ListBullets, Paragraph, Section, Template, compile_text, fill_text
+
+# Document types declared as data, one JSON file per type named after it.
+# DOCGEN_DOCUMENTS_DIR adds a directory of further definitions, which may also
+# replace the shipped ones.
+DEFINITIONS_DIR = os.path.join(os.path.dirname(__file__), "data", "documents")
+
+# Export formats a definition may offer; all of them unless it lists fewer
+EXPORT_FORMATS = ("txt", "pdf", "docx")
+
+# Form widget of each field type. Multiselect and list fields hold lists.
+FIELD_TYPES = ("text", "textarea", "date", "number", "select", "radio", "multiselect", "list")
+LIST_TYPES = ("multiselect", "list")
+
+# Option lists a field can take from the package's data instead of listing
+# them, as code -> display name
+OPTION_SOURCES = {
+    "jurisdictions": lambda: clause_library().jurisdictions,
+    "notify_jurisdictions": lambda: rule_table().jurisdictions,
+}
+
+# One form field of a declared document. `options` maps each choice to its
+# label; `minimum` and `maximum` bound number fields.
+Field = namedtuple("Field", "name label type default options help minimum maximum")
+
+
+_KIND_NAMES = {str: "a string", int: "a number", float: "a number", list: "a list", dict: "an object"}
+
+
+def _kind_name(kind):
+    kinds = kind if isinstance(kind, tuple) else (kind,)
+    return " or ".join(dict.fromkeys(_KIND_NAMES.get(k, k.__name__) for k in kinds))
+
+
+# The value of a required key of one part of a definition, checked to be of
+# the expected type, so a malformed file is reported by name and key
+def _require(path, entry, key, kind, where="the definition"):
+    if not isinstance(entry, dict):
+        raise ValueError(f"{path}: {where} must be an object")
+    if key not in entry:
+        raise ValueError(f"{path}: {where} is missing {key!r}")
+    return _optional(path, entry, key, kind, None, where)
+
+
+# The value of an optional key, checked like _require when it is given; null
+# stands for "not given" where the default is None
+def _optional(path, entry, key, kind, default, where="the definition"):
+    value = entry.get(key, default)
+    if value is None and default is None:
+        return None
+    if key in entry and (not isinstance(value, kind) or isinstance(value, bool)):
+        raise ValueError(f"{path}: {key!r} of {where} must be {_kind_name(kind)}")
+    return value
+
+
+# Template text, checked to be well formed
+def _text(path, text, where):
+    try:
+        compile_text(text)
+    except ValueError as e:
+        raise ValueError(f"{path}: {where} is not valid template text: {e}") from None
+    return text
+
+
+def _strings(path, value, key, where):
+    if not all(isinstance(item, str) for item in value):
+        raise ValueError(f"{path}: every item of {key!r} of {where} must be a string")
+    return value
+
+
+# A user-supplied value converted to the type of the field's default: lists
+# (text is split on ";"), dates given as ISO text, numbers and non-null text.
+# Anything else is rejected with a ValueError naming the field.
+def coerce_value(field, default, value, list_field=False):
+    if list_field or isinstance(default, list):
+        if isinstance(value, str):
+            return [item.strip() for item in value.split(";") if item.strip()]
+        if isinstance(value, (list, tuple)) and all(isinstance(item, (str, int, float)) for item in value):
+            return [str(item).strip() for item in value]
+        raise ValueError(f"{field} must be a list or text separated by ';'")
+    if isinstance(default, datetime.date):
+        if isinstance(value, datetime.date):
+            return value
+        if isinstance(value, str):
+            for parse in (datetime.date.fromisoformat, datetime.datetime.fromisoformat):
+                try:
+                    return parse(value.strip())
+                except ValueError:
+                    pass
+        raise ValueError(f"{field} must be a date like 2024-05-31, not {value!r}")
+    if isinstance(default, (int, float)) and not isinstance(default, bool):
+        if isinstance(value, str):
+            try:
+                value = float(value) if value.strip() else 0
+            except ValueError:
+                raise ValueError(f"{field} must be a number, not {value!r}") from None
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{field} must be a number, not {value!r}")
+        return int(value) if isinstance(default, int) and float(value).is_integer() else value
+    if isinstance(default, str):
+        if value is None or isinstance(value, (bool, list, tuple, dict)):
+            raise ValueError(f"{field} must be text, not {value!r}")
+        return str(value)
+    return value
+
+
+# Value of each field type the declared default is converted to
+_PROTOTYPES = {"number": 0, "date": datetime.date.min}
+
+
+def _field(path, entry):
+    name = _require(path, entry, "name", str, "a field")
+    where = f"field {name!r}"
+    kind = _optional(path, entry, "type", str, "text", where)
+    if kind not in FIELD_TYPES:
+        raise ValueError(f"{path}: field {name!r} has unknown type {kind!r}; expected one of {', '.join(FIELD_TYPES)}")
+    options = None
+    if "options_from" in entry:
+        if entry["options_from"] not in OPTION_SOURCES:
+            raise ValueError(f"{path}: field {name!r} takes options from unknown source {entry['options_from']!r}")
+        options = dict(OPTION_SOURCES[entry["options_from"]]())
+    elif "options" in entry:
+        options = {str(option): str(option) for option in _require(path, entry, "options", list, where)}
+    if kind in ("select", "radio", "multiselect") and not options:
+        raise ValueError(f"{path}: {kind} field {name!r} needs options")
+    default = entry.get("default", [] if kind in LIST_TYPES else 0 if kind == "number" else "")
+    if kind == "date" and default in ("", "today"):
+        default = "today"
+    elif kind in ("select", "radio") and default == "":
+        default = next(iter(options))
+    else:
+        try:
+            default = coerce_value(name, _PROTOTYPES.get(kind, ""), default, kind in LIST_TYPES)
+        except ValueError as e:
+            raise ValueError(f"{path}: the default of {e}") from None
+    chosen = default if kind == "multiselect" else [default] if kind in ("select", "radio") else []
+    unknown = [choice for choice in chosen if choice not in options]
+    if unknown:
+        raise ValueError(f"{path}: the default of {where} is not one of its options: {', '.join(unknown)}")
+    minimum = _optional(path, entry, "min", (int, float), None, where)
+    maximum = _optional(path, entry, "max", (int, float), None, where)
+    return Field(name, _optional(path, entry, "label", str, name.replace("_", " ").title(), where), kind, default,
+                 options, _optional(path, entry, "help", str, None, where), minimum, maximum)
+
+
+def _block(path, name, entry):
+    if not isinstance(entry, dict):
+        raise ValueError(f"{path}: every block must be an object")
+    if "paragraph" in entry:
+        return Paragraph(_text(path, _require(path, entry, "paragraph", str, "a paragraph block"), "a paragraph"))
+    if "bullets" in entry:
+        items = _strings(path, _require(path, entry, "bullets", list, "a bullets block"), "bullets", "a block")
+        return Bullets(*(_text(path, item, "a bullet") for item in items))
+    if "list" in entry:
+        return ListBullets(_require(path, entry, "list", str, "a list block"))
+    if "clauses" in entry:
+        clauses = _require(path, entry, "clauses", dict, "a clauses block")
+        where = "a clauses block"
+        return Clauses(_optional(path, clauses, "doc_type", str, name, where),
+                       _require(path, clauses, "section", str, where),
+                       _optional(path, clauses, "jurisdictions", str, "jurisdictions", where),
+                       _optional(path, clauses, "categories", str, None, where))
+    raise ValueError(f"{path}: unknown block {sorted(entry)!r}; expected paragraph, bullets, list or clauses")
+
+
+def _section(path, name, entry):
+    blocks = _require(path, entry, "blocks", list, "a section")
+    heading = _optional(path, entry, "heading", str, None, "a section")
+    return Section(heading and _text(path, heading, "a section heading"),
+                   *(_block(path, name, block) for block in blocks))
+
+
+# Inputs a block goes through item by item, which must hold lists
+def _listed(block):
+    if isinstance(block, ListBullets):
+        return (block.name,)
+    if isinstance(block, Clauses):
+        return (block.jurisdictions, *((block.categories,) if block.categories else ()))
+    return ()
+
+
+def _key(value):
+    return "yes" if value is True else "no" if value is False else str(value)
+
+
+# A slot holding the text given for the value of one field, or `default` for
+# values not listed. For a list field it holds the texts of the items listed.
+def _choice(values, default):
+    def derive(value):
+        if isinstance(value, (list, tuple)):
+            return [values[_key(item)] for item in value if _key(item) in values]
+        return values.get(_key(value), default)
+    return derive
+
+
+# A document type read from its definition. It offers what the modules in
+# docgen.documents do (TITLE, LIST_FIELDS, TEMPLATE, default_inputs, generate
+# and file_stem), so everything that renders those renders it too, plus the
+# FIELDS and FORMATS the generic form page is built from. A malformed
+# definition is rejected with a ValueError naming its file.
+class DeclaredDocument:
+    def __init__(self, name, definition, path="<definition>", digest=""):
+        self.name = name
+        self.path = path
+        # Hash of the definition file, part of the cache keys of this type
+        self.digest = digest
+        if not isinstance(definition, dict):
+            raise ValueError(f"{path}: a document definition must be a JSON object")
+        self.TITLE = _require(path, definition, "title", str)
+        self.DESCRIPTION = _optional(path, definition, "description", str, "")
+        self.FIELDS = tuple(_field(path, entry) for entry in _require(path, definition, "fields", list))
+        self.LIST_FIELDS = tuple(field.name for field in self.FIELDS if field.type in LIST_TYPES)
+        self.FORMATS = tuple(_strings(path, _optional(path, definition, "formats", list, EXPORT_FORMATS),
+                                      "formats", "the definition"))
+        unknown = set(self.FORMATS) - set(EXPORT_FORMATS)
+        if unknown or not self.FORMATS:
+            raise ValueError(f"{path}: unsupported format(s) {', '.join(sorted(unknown)) or 'none given'}")
+        derived = {}
+        for slot, entry in _optional(path, definition, "derived", dict, {}).items():
+            where = f"derived slot {slot!r}"
+            values = _require(path, entry, "values", dict, where)
+            _strings(path, values.values(), "values", where)
+            derived[slot] = ((_require(path, entry, "from", str, where),),
+                             _choice(values, _optional(path, entry, "default", str, "", where)))
+        sections = [_section(path, name, section) for section in _require(path, definition, "sections", list)]
+        heading = _text(path, _optional(path, definition, "heading", str, self.TITLE), "the heading")
+        self.TEMPLATE = Template(heading, *sections, derived=derived)
+        stem = _optional(path, definition, "file_stem", str, self.TITLE.replace(" ", "_"))
+        self._stem = compile_text(_text(path, stem, "the file stem"))
+        missing = self.TEMPLATE.fields - {field.name for field in self.FIELDS}
+        if missing:
+            raise ValueError(f"{path}: the template uses undeclared field(s) {', '.join(sorted(missing))}")
+        # Bulleted lists and clause selections need list values: a list field,
+        # or a slot derived from one
+        lists = set(self.LIST_FIELDS)
+        lists.update(slot for slot, (sources, _) in derived.items() if sources[0] in self.LIST_FIELDS)
+        for section in sections:
+            for block in section.blocks:
+                for listed in _listed(block):
+                    if listed not in lists:
+                        raise ValueError(f"{path}: {listed!r} is not a list field, so it cannot be listed")
+
+    # Inputs used when a field is not provided, matching the form defaults
+    def default_inputs(self):
+        inputs = {}
+        for field in self.FIELDS:
+            default = field.default
+            if default == "today":
+                default = datetime.date.today()
+            inputs[field.name] = list(default) if field.type in LIST_TYPES else default
+        return inputs
+
+    def generate(self, inputs):
+        return self.TEMPLATE.fill(inputs)
+
+    def file_stem(self, inputs):
+        return fill_text(self._stem, inputs)
+
+
+@functools.lru_cache(maxsize=256)
+def _parse(name, path, stamp):
+    with open(path, "rb") as f:
+        raw = f.read()
+    try:
+        definition = json.loads(raw)
+    except ValueError as e:
+        raise ValueError(f"{path}: not valid JSON: {e}") from None
+    return DeclaredDocument(name, definition, path, hashlib.sha256(raw).hexdigest())
+
+
+# Finds the declared document types and parses each on first use. Listing the
+# types only reads directory entries, so the landing and form pages cost the
+# same however many are declared. A parsed definition is kept until its file
+# changes on disk.
+class DocumentRegistry:
+    def __init__(self, directories):
+        self.directories = tuple(directories)
+        self._listings = {}
+
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        extra = environ.get("DOCGEN_DOCUMENTS_DIR")
+        return cls((DEFINITIONS_DIR, *([extra] if extra else ())))
+
+    # Definition files in one directory, re-read only when files were added,
+    # removed or renamed there. File names that are not identifiers are
+    # skipped, since the name is used in URLs and cache keys.
+    def _listing(self, directory):
+        try:
+            stamp = os.stat(directory).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        cached = self._listings.get(directory)
+        if cached is None or cached[0] != stamp:
+            found = {}
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    name, ext = os.path.splitext(entry.name)
+                    if ext == ".json" and name.isidentifier() and entry.is_file():
+                        found[name] = entry.path
+            cached = self._listings[directory] = (stamp, found)
+        return cached[1]
+
+    # Definition file of each declared type; later directories win
+    def paths(self):
+        found = {}
+        for directory in self.directories:
+            found.update(self._listing(directory))
+        return dict(sorted(found.items()))
+
+    def names(self):
+        return tuple(self.paths())
+
+    # Display name of a type taken from its file name, for menus that should
+    # not parse every definition
+    @staticmethod
+    def label(name):
+        return name.replace("_", " ").title()
+
+    def get(self, name):
+        for directory in reversed(self.directories):
+            path = self._listing(directory).get(name)
+            if path is not None:
+                return _parse(name, path, os.stat(path).st_mtime_ns)
+        raise KeyError(f"No document definition named {name!r}")
+
+    # Hash of the data documents of type `name` are rendered from: the clause
+    # library and notification rules, plus its definition when it is declared.
+    # Cache keys include it, so editing any of them stops cached outputs from
+    # being served.
+    def source_digest(self, name):
+        parts = [clause_library().digest, rule_table().digest]
+        if name in self.paths():
+            parts.append(self.get(name).digest)
+        return "\0".join(parts)
+
+
+# Process-wide registry used by the pages, the server and the command line tools
+document_registry = DocumentRegistry.from_env()
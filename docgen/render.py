@@ -0,0 +1,81 @@
+from io import BytesIO
+
+from docgen.metrics import metrics
+
+
+# Plain text of one filled section, ending with a blank line
+def render_section_text(section):
+    lines = []
+    if section.heading:
+        lines.append(section.heading)
+    for kind, value in section.blocks:
+        if kind == "bullets":
+            lines.extend(f"- {item}" for item in value)
+        else:
+            lines.append(value)
+    lines.append("")
+    return "\n".join(lines)
+
+
+def join_text(title, section_texts):
+    return "\n".join([title, "", *section_texts])
+
+
+# Function to generate the plain text version of a document outline
+def render_text(outline):
+    with metrics.timed("txt"):
+        return join_text(outline.title, [render_section_text(section) for section in outline.sections])
+
+
+# The PDF and Word writers (and their fontTools / zip dependencies) are only
+# imported on the first export, so viewing a form does not pay for them
+def _pdf_bytes(outline):
+    from docgen.pdf import render_outline_pdf
+
+    with metrics.timed("pdf"):
+        data = render_outline_pdf(outline)
+    metrics.observe_bytes("pdf", len(data))
+    return data
+
+
+def _docx_bytes(outline):
+    from docgen.wordml import render_outline_docx
+
+    with metrics.timed("docx"):
+        data = render_outline_docx(outline)
+    metrics.observe_bytes("docx", len(data))
+    return data
+
+
+def _buffer(data):
+    with metrics.timed("copy"):
+        return BytesIO(data)
+
+
+# Function to generate a PDF version of a document outline
+def render_pdf(outline):
+    return _buffer(_pdf_bytes(outline))
+
+
+# Function to generate a Word (docx) version of a document outline
+def render_word(outline):
+    return _buffer(_docx_bytes(outline))
+
+
+# UTF-8 text of an export; lone surrogates (which the API accepts in JSON
+# strings) are dropped as the PDF and Word writers drop them
+def text_bytes(text):
+    return text.encode("utf-8", "ignore")
+
+
+# Render an outline to the bytes of one export format ("txt", "pdf" or "docx")
+def render_bytes(outline, fmt):
+    if fmt == "txt":
+        data = text_bytes(render_text(outline))
+        metrics.observe_bytes("txt", len(data))
+        return data
+    if fmt == "pdf":
+        return _pdf_bytes(outline)
+    if fmt == "docx":
+        return _docx_bytes(outline)
+    raise ValueError(f"Unsupported export format {fmt!r}")
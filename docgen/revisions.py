@@ -0,0 +1,243 @@
+import datetime
+import difflib
+import hashlib
+import html
+import json
+import os
+import re
+import threading
+import zlib
+from collections import namedtuple
+
+from docgen.render import render_section_text
+from docgen.template import FilledSection, Outline
+
+# Changes to one section between two revisions. `status` is "unchanged",
+# "changed", "added" or "removed"; `ops` is a list of ("equal" | "delete" |
+# "insert", text) word runs for changed sections.
+SectionChange = namedtuple("SectionChange", "heading status ops")
+
+_TOKENS = re.compile(r"\s+|[^\s]+")
+
+
+def _section_json(section):
+    return json.dumps({"heading": section.heading, "blocks": [[kind, value] for kind, value in section.blocks]},
+                      sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _section_from_json(data):
+    value = json.loads(data)
+    return FilledSection(value["heading"], tuple(
+        (kind, tuple(items) if kind == "bullets" else items) for kind, items in value["blocks"]))
+
+
+def section_text(section):
+    return render_section_text(section).rstrip("\n")
+
+
+def company_slug(company):
+    name = re.sub(r"[^\w.-]+", "_", company).strip("_")[:60] or "company"
+    return f"{name}-{hashlib.sha256(company.encode('utf-8')).hexdigest()[:8]}"
+
+
+# Append-only history of generated documents, per company and document type.
+#
+#   <root>/blobs/ab/<sha256>                 one zlib-compressed filled section
+#   <root>/log/<company>/<doc_type>.jsonl    one line per revision
+#
+# Sections are content-addressed, so a section that did not change between
+# revisions is stored once and a revision record is just the title and the list
+# of its section hashes. Committing a document identical to the latest revision
+# adds nothing. Diffs are computed from the stored sections, skipping sections
+# whose hashes match, so no revision is ever re-rendered.
+class RevisionStore:
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        self._latest = {}
+
+    # The store in DOCGEN_REVISIONS_DIR, or None when it is not set. History is
+    # off by default: everyone who can open the app sees every stored revision,
+    # so it is only for deployments serving a single organisation.
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        root = environ.get("DOCGEN_REVISIONS_DIR")
+        return cls(root) if root else None
+
+    def _blob_path(self, digest):
+        return os.path.join(self.root, "blobs", digest[:2], digest)
+
+    def _log_path(self, company, doc_type):
+        return os.path.join(self.root, "log", company_slug(company), f"{doc_type}.jsonl")
+
+    def _put_blob(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(zlib.compress(data, 9))
+            os.replace(tmp, path)
+        return digest
+
+    def _get_blob(self, digest):
+        with open(self._blob_path(digest), "rb") as f:
+            return zlib.decompress(f.read())
+
+    # Record a generated outline as the next revision. Returns the revision
+    # record and whether it is new (False when nothing changed since the latest).
+    def commit(self, company, doc_type, outline, inputs_digest=None, note=None):
+        sections = [self._put_blob(_section_json(section)) for section in outline.sections]
+        path = self._log_path(company, doc_type)
+        with self._lock:
+            latest = self._latest_record(path)
+            if latest and latest["title"] == outline.title and latest["sections"] == sections:
+                return latest, False
+            record = {
+                "revision": latest["revision"] + 1 if latest else 1,
+                "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+                "company": company,
+                "doc_type": doc_type,
+                "title": outline.title,
+                "sections": sections,
+                "inputs": inputs_digest,
+                "note": note,
+            }
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._latest[path] = record
+            return record, True
+
+    def _latest_record(self, path):
+        if path not in self._latest:
+            records = self._read_log(path)
+            self._latest[path] = records[-1] if records else None
+        return self._latest[path]
+
+    def _read_log(self, path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    # Every revision record of a company's document, oldest first
+    def revisions(self, company, doc_type):
+        return self._read_log(self._log_path(company, doc_type))
+
+    # {company: [doc_type, ...]} for every company with at least one revision
+    def companies(self):
+        found = {}
+        log_dir = os.path.join(self.root, "log")
+        if not os.path.isdir(log_dir):
+            return found
+        for slug in sorted(os.listdir(log_dir)):
+            for name in sorted(os.listdir(os.path.join(log_dir, slug))):
+                if name.endswith(".jsonl"):
+                    records = self._read_log(os.path.join(log_dir, slug, name))
+                    if records:
+                        found.setdefault(records[0]["company"], []).append(records[0]["doc_type"])
+        return found
+
+    def _record(self, company, doc_type, revision):
+        for record in self.revisions(company, doc_type):
+            if record["revision"] == revision:
+                return record
+        raise KeyError(f"No revision {revision} of {doc_type} for {company!r}")
+
+    # The outline of a stored revision
+    def load(self, company, doc_type, revision):
+        record = self._record(company, doc_type, revision)
+        return Outline(record["title"], tuple(_section_from_json(self._get_blob(h)) for h in record["sections"]))
+
+    # Section by section changes from revision `old` to revision `new`
+    def diff(self, company, doc_type, old, new):
+        old_record, new_record = self._record(company, doc_type, old), self._record(company, doc_type, new)
+        before, after = old_record["sections"], new_record["sections"]
+        changes = []
+        if old_record["title"] != new_record["title"]:
+            changes.append(SectionChange("Title", "changed", word_diff(old_record["title"], new_record["title"])))
+        matcher = difflib.SequenceMatcher(None, before, after, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                for digest in after[j1:j2]:
+                    changes.append(SectionChange(self._heading(digest), "unchanged", None))
+                continue
+            old_sections = [_section_from_json(self._get_blob(h)) for h in before[i1:i2]]
+            new_sections = [_section_from_json(self._get_blob(h)) for h in after[j1:j2]]
+            # Replaced sections are compared pairwise; any surplus was added or removed
+            for old_section, new_section in zip(old_sections, new_sections):
+                ops = word_diff(section_text(old_section), section_text(new_section))
+                changes.append(SectionChange(new_section.heading or old_section.heading, "changed", ops))
+            for section in old_sections[len(new_sections):]:
+                changes.append(SectionChange(section.heading, "removed", [("delete", section_text(section))]))
+            for section in new_sections[len(old_sections):]:
+                changes.append(SectionChange(section.heading, "added", [("insert", section_text(section))]))
+        return changes
+
+    def _heading(self, digest):
+        return _section_from_json(self._get_blob(digest)).heading
+
+    # Number and total size of the stored section blobs
+    def blob_stats(self):
+        count = size = 0
+        for directory, _, files in os.walk(os.path.join(self.root, "blobs")):
+            for name in files:
+                count += 1
+                size += os.path.getsize(os.path.join(directory, name))
+        return {"blobs": count, "bytes": size}
+
+
+# Word-level changes between two texts as ("equal" | "delete" | "insert", text) runs
+def word_diff(old, new):
+    a, b = _TOKENS.findall(old), _TOKENS.findall(new)
+    ops = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if tag == "equal":
+            ops.append(("equal", "".join(a[i1:i2])))
+            continue
+        if i2 > i1:
+            ops.append(("delete", "".join(a[i1:i2])))
+        if j2 > j1:
+            ops.append(("insert", "".join(b[j1:j2])))
+    return ops
+
+
+# HTML redline of a diff: deletions struck through in red, insertions underlined in green
+def redline_html(changes, show_unchanged=False):
+    parts = []
+    for change in changes:
+        if change.status == "unchanged":
+            if show_unchanged:
+                parts.append(f'<p style="color:gray">{html.escape(change.heading or "")} (unchanged)</p>')
+            continue
+        text = []
+        for op, value in change.ops:
+            value = html.escape(value).replace("\n", "<br>")
+            if op == "delete":
+                text.append(f'<del style="color:#b00020">{value}</del>')
+            elif op == "insert":
+                text.append(f'<ins style="color:#00701a">{value}</ins>')
+            else:
+                text.append(value)
+        label = {"changed": "Changed", "added": "Added", "removed": "Removed"}[change.status]
+        parts.append(f"<p><b>{label}: {html.escape(change.heading or 'Introduction')}</b><br>{''.join(text)}</p>")
+    return "\n".join(parts)
+
+
+# Plain text redline: [-deleted-] and {+inserted+}, as in `git diff --word-diff`
+def redline_text(changes):
+    parts = []
+    for change in changes:
+        if change.status == "unchanged":
+            continue
+        text = "".join(value if op == "equal" else f"[-{value}-]" if op == "delete" else f"{{+{value}+}}"
+                       for op, value in change.ops)
+        parts.append(f"## {change.status.upper()}: {change.heading or 'Introduction'}\n{text}\n")
+    return "\n".join(parts)
+
+
+# Process-wide store used by the pages; None while revision history is off
+revision_store = RevisionStore.from_env()
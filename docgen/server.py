@@ -0,0 +1,401 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from docgen.batch import FORMATS, safe_name
+from docgen.cache import cache_key, content_hash, etag, etag_matches, input_hash, normalize, render_cache
+from docgen.documents import build_inputs, document_types, get_document_type
+from docgen.metrics import metrics, profiler
+from docgen.render import render_bytes
+
+DEFAULT_PORT = 8502
+DEFAULT_QUEUE = 32
+DEFAULT_MAX_BODY = 1024 * 1024
+
+# Seconds to wait for a request head or body, and for the next request on a kept-alive connection
+READ_TIMEOUT = 30
+KEEPALIVE_TIMEOUT = 15
+
+CONTENT_TYPES = {
+    "txt": "text/plain; charset=utf-8",
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+# Formats rendered in the worker pool; plain text is cheap enough for the event loop
+POOL_FORMATS = ("pdf", "docx")
+
+# Rendered outputs are addressed by their inputs and never change, so shared
+# caches may keep them for as long as they like
+IMMUTABLE = "public, max-age=31536000, immutable"
+EXPORT_KEY = re.compile("[0-9a-f]{64}")
+
+
+# A request that is answered with a JSON error body
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = HTTPStatus(status)
+        self.message = message
+        self.headers = headers or {}
+
+
+# Render one document and time its stages. PDF and Word are rendered inside a
+# worker process, so the timings are returned for the server to record.
+def render_document(doc_type, inputs, fmt):
+    started = time.perf_counter()
+    outline = get_document_type(doc_type).generate(inputs)
+    generated = time.perf_counter()
+    data = render_bytes(outline, fmt)
+    return data, {"generate": generated - started, fmt: time.perf_counter() - generated}
+
+
+# Exceptions that inputs the generators reject are raised as
+INPUT_ERRORS = (ValueError, TypeError, LookupError, ArithmeticError)
+
+
+# The response for building inputs or rendering that raised: inputs the
+# generator rejects are the client's mistake, anything else is ours
+def render_error(error):
+    if isinstance(error, INPUT_ERRORS):
+        return HTTPError(400, f"Could not generate the document: {error}")
+    return HTTPError(500, f"Rendering failed: {error}")
+
+
+# Field names and form defaults of every document type. A declared type whose
+# definition is malformed is listed with the error instead.
+def describe_documents():
+    documents = {}
+    for doc_type in document_types():
+        try:
+            doc = get_document_type(doc_type)
+        except ValueError as e:
+            documents[doc_type] = {"error": str(e)}
+            continue
+        documents[doc_type] = {
+            "title": doc.TITLE,
+            "defaults": normalize(doc.default_inputs()),
+            "list_fields": list(doc.LIST_FIELDS),
+            "formats": list(getattr(doc, "FORMATS", FORMATS)),
+        }
+    return documents
+
+
+# asyncio HTTP/JSON front end for the document generators.
+#
+#   GET  /health                          liveness and queue depth
+#   GET  /documents                       document types, fields and defaults
+#   POST /render/<doc_type>?format=pdf    JSON object of inputs -> document bytes
+#   GET  /exports/<key>.<format>          a rendered document by its Content-Location
+#   GET  /metrics                         stage timings in Prometheus text format
+#   GET  /profile                         sampled stacks in folded format
+#   POST /profile?enabled=1|0&reset=1     switch the sampling profiler on or off
+#
+# PDF and Word rendering runs in a bounded process pool. At most `workers`
+# renders run at once and `queue` more wait for a worker; beyond that requests
+# are refused with 503 and Retry-After instead of piling up. Identical
+# concurrent requests share one render, and finished documents are kept in
+# the process-wide render cache.
+#
+# Rendering is deterministic, so every document carries a strong ETag (the
+# SHA-256 of its bytes) and a Content-Location under /exports/ that names it
+# by its inputs. A GET there with a matching If-None-Match is answered 304
+# from the remembered hash, without reading or rendering the document.
+class RenderServer:
+    def __init__(self, workers=None, queue=DEFAULT_QUEUE, max_body=DEFAULT_MAX_BODY, cache=render_cache):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue = queue
+        self.max_body = max_body
+        self.cache = cache
+        self.pool = None
+        self.pending = 0
+        self._inflight = {}
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT):
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        return await asyncio.start_server(self.handle, host, port)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    # Serve requests on one connection until the client closes it or asks to
+    async def handle(self, reader, writer):
+        try:
+            keep_alive = True
+            timeout = READ_TIMEOUT
+            while keep_alive:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self.send_error(writer, HTTPError(431, "Request headers too large"), False)
+                    break
+                timeout = KEEPALIVE_TIMEOUT
+                keep_alive = False
+                try:
+                    method, target, version, headers = self.parse_head(head)
+                    keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                    body = await self.read_body(reader, method, headers)
+                    status, response_headers, payload = await self.dispatch(method, target, body, headers)
+                except HTTPError as e:
+                    # The rest of a rejected request body may still be unread
+                    keep_alive = keep_alive and e.status < 500 and e.status not in (411, 413)
+                    await self.send_error(writer, e, keep_alive)
+                    continue
+                except Exception as e:
+                    await self.send_error(writer, HTTPError(500, f"Internal error: {e}"), False)
+                    break
+                await self.send(writer, status, response_headers, payload, keep_alive)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    def parse_head(self, head):
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ")
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+        return method, target, version, headers
+
+    async def read_body(self, reader, method, headers):
+        if method not in ("POST", "PUT"):
+            return b""
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise HTTPError(411, "Chunked request bodies are not supported; send Content-Length")
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length > self.max_body:
+            raise HTTPError(413, f"Request body larger than {self.max_body} bytes")
+        try:
+            return await asyncio.wait_for(reader.readexactly(length), READ_TIMEOUT)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+            raise HTTPError(400, "Incomplete request body")
+
+    async def dispatch(self, method, target, body, headers=None):
+        url = urlsplit(target)
+        path = url.path.rstrip("/") or "/"
+        if path == "/health":
+            self.require(method, "GET")
+            return self.json(200, {"status": "ok", "workers": self.workers, "pending": self.pending,
+                                   "queue": self.queue})
+        if path == "/documents":
+            self.require(method, "GET")
+            return self.json(200, describe_documents())
+        if path.startswith("/render/"):
+            self.require(method, "POST")
+            doc_type = path[len("/render/"):]
+            fmt = parse_qs(url.query).get("format", ["pdf"])[-1]
+            with metrics.timed("request", doc_type=doc_type if doc_type in document_types() else None):
+                return await self.render(doc_type, fmt, body)
+        if path.startswith("/exports/"):
+            self.require(method, "GET")
+            return self.export(path[len("/exports/"):], (headers or {}).get("if-none-match"))
+        if path == "/metrics":
+            self.require(method, "GET")
+            return 200, {"Content-Type": "text/plain; version=0.0.4"}, metrics.prometheus_text().encode("utf-8")
+        if path == "/profile":
+            if method == "POST":
+                return self.json(200, self.toggle_profiler(parse_qs(url.query)))
+            self.require(method, "GET")
+            return 200, {"Content-Type": "text/plain; charset=utf-8"}, profiler.folded().encode("utf-8")
+        raise HTTPError(404, f"No such endpoint: {url.path}")
+
+    def toggle_profiler(self, query):
+        if query.get("reset", ["0"])[-1] == "1":
+            profiler.reset()
+        enabled = query.get("enabled", [None])[-1]
+        if enabled == "1":
+            profiler.start()
+        elif enabled == "0":
+            profiler.stop()
+        elif enabled is not None:
+            raise HTTPError(400, "enabled must be 1 or 0")
+        return {"running": profiler.running, "samples": profiler.samples}
+
+    def require(self, method, allowed):
+        if method != allowed:
+            raise HTTPError(405, f"Method {method} not allowed", {"Allow": allowed})
+
+    async def render(self, doc_type, fmt, body):
+        known = document_types()
+        if doc_type not in known:
+            raise HTTPError(404, f"Unknown document type {doc_type!r}; expected one of {', '.join(known)}")
+        doc = get_document_type(doc_type)
+        formats = getattr(doc, "FORMATS", FORMATS)
+        if fmt not in formats:
+            raise HTTPError(400, f"Unsupported format {fmt!r}; expected one of {', '.join(formats)}")
+        try:
+            values = json.loads(body or b"{}")
+        except ValueError as e:
+            raise HTTPError(400, f"Request body is not valid JSON: {e}")
+        if not isinstance(values, dict):
+            raise HTTPError(400, "Request body must be a JSON object of document inputs")
+        try:
+            inputs = build_inputs(doc, values)
+        except Exception as e:
+            raise render_error(e)
+
+        key = cache_key(doc_type, input_hash(inputs), fmt)
+        data = self.cache.get(key, fmt)
+        outcome = "hit"
+        if data is None:
+            outcome = "miss"
+            data = await self.render_once(key, doc_type, inputs, fmt)
+        metrics.count_export(fmt, outcome)
+        headers = {
+            "Content-Type": CONTENT_TYPES[fmt],
+            "Content-Disposition": f'attachment; filename="{safe_name(doc.file_stem(inputs))}.{fmt}"',
+            "Content-Location": f"/exports/{key}.{fmt}",
+            "ETag": etag(self.cache.digest(key) or content_hash(data)),
+            "X-Cache": outcome,
+        }
+        return 200, headers, data
+
+    # A document rendered earlier, by the key in its Content-Location. The
+    # format must be the one it was rendered in; after a restart a document is
+    # found again once it has been requested from /render.
+    def export(self, name, if_none_match):
+        key, _, fmt = name.partition(".")
+        if fmt not in FORMATS or not EXPORT_KEY.fullmatch(key):
+            raise HTTPError(404, f"No such export: {name}")
+        rendered = self.cache.format(key)
+        if rendered is None:
+            raise HTTPError(404, "Export is no longer cached; render it again")
+        if rendered != fmt:
+            raise HTTPError(404, f"No such export: {name}")
+        digest = self.cache.digest(key)
+        if digest is not None and etag_matches(if_none_match, digest):
+            metrics.count_export(fmt, "not_modified")
+            return 304, {"ETag": etag(digest), "Cache-Control": IMMUTABLE}, b""
+        data = self.cache.get(key)
+        if data is None:
+            raise HTTPError(404, "Export is no longer cached; render it again")
+        metrics.count_export(fmt, "hit")
+        headers = {
+            "Content-Type": CONTENT_TYPES[fmt],
+            "ETag": etag(digest or content_hash(data)),
+            "Cache-Control": IMMUTABLE,
+        }
+        return 200, headers, data
+
+    # Render through the pool, sharing the result with identical requests already in flight
+    async def render_once(self, key, doc_type, inputs, fmt):
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            # Waiters on a shared render that fails get the same error response
+            try:
+                data, _ = await asyncio.shield(inflight)
+            except Exception as e:
+                raise render_error(e)
+            return data
+        if fmt not in POOL_FORMATS:
+            # Rendered in this process, where its stages are recorded directly
+            try:
+                data, _ = render_document(doc_type, inputs, fmt)
+            except Exception as e:
+                raise render_error(e)
+            self.cache.put(key, data, fmt)
+            return data
+        if self.pending >= self.workers + self.queue:
+            raise HTTPError(503, "Render queue is full, retry later", {"Retry-After": "1"})
+
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        future = loop.run_in_executor(self.pool, render_document, doc_type, inputs, fmt)
+        self._inflight[key] = future
+        self.pending += 1
+        try:
+            data, timings = await asyncio.shield(future)
+        except Exception as e:
+            raise render_error(e)
+        finally:
+            self.pending -= 1
+            self._inflight.pop(key, None)
+
+        # Time spent queued for a worker and passing data between processes
+        for stage, seconds in timings.items():
+            metrics.observe(stage, seconds)
+        metrics.observe("pool_wait", max(0.0, time.perf_counter() - started - sum(timings.values())))
+        metrics.observe_bytes(fmt, len(data))
+        self.cache.put(key, data, fmt)
+        return data
+
+    def json(self, status, value):
+        return status, {"Content-Type": "application/json"}, json.dumps(value).encode("utf-8")
+
+    async def send_error(self, writer, error, keep_alive):
+        body = json.dumps({"error": {"status": error.status.value, "message": error.message}}).encode("utf-8")
+        headers = dict(error.headers, **{"Content-Type": "application/json"})
+        await self.send(writer, error.status, headers, body, keep_alive)
+
+    async def send(self, writer, status, headers, body, keep_alive):
+        status = HTTPStatus(status)
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        # A 304 has no body, and its length would describe the document instead
+        if status != HTTPStatus.NOT_MODIFIED:
+            lines.append(f"Content-Length: {len(body)}")
+        lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        writer.write(body)
+        await writer.drain()
+
+
+async def serve(host, port, workers, queue, max_body):
+    server = RenderServer(workers=workers, queue=queue, max_body=max_body)
+    listener = await server.start(host, port)
+    address = listener.sockets[0].getsockname()
+    print(f"Rendering API listening on http://{address[0]}:{address[1]} "
+          f"({server.workers} workers, queue {server.queue})", file=sys.stderr)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m docgen.server",
+        description="Local HTTP/JSON API that renders documents as TXT, PDF or Word.",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default 127.0.0.1)")
+    parser.add_argument("-p", "--port", type=int, default=DEFAULT_PORT, help=f"port (default {DEFAULT_PORT})")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="render processes (default: all cores)")
+    parser.add_argument("-q", "--queue", type=int, default=DEFAULT_QUEUE,
+                        help=f"renders allowed to wait for a worker before returning 503 (default {DEFAULT_QUEUE})")
+    parser.add_argument("--max-body", type=int, default=DEFAULT_MAX_BODY,
+                        help=f"largest accepted request body in bytes (default {DEFAULT_MAX_BODY})")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.queue, args.max_body))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+import argparse
+import json
+import logging
+import math
+import os
+import subprocess
+import sys
+import threading
+import time
+
+# Seconds to wait after the first page run before warming up, so the first
+# page is not slowed down by it
+DEFAULT_WARMUP_DELAY = 1.0
+
+# Import budgets in milliseconds, measured on top of an already imported
+# Streamlit (which every page pays for anyway). `forbidden` lists modules that
+# must not be loaded yet at that point of the startup path.
+IMPORT_BUDGETS = {
+    "landing": {
+        "modules": ("docgen.startup",),
+        "budget_ms": 10,
+        "forbidden": ("docgen.documents", "docgen.render", "docgen.pdf", "docgen.wordml", "docx", "fontTools"),
+    },
+    "form_page": {
+        "modules": ("docgen.downloads", "docgen.exports", "docgen.preview", "docgen.render",
+                    "docgen.documents.privacy_policy", "docgen.documents.terms", "docgen.documents.pia",
+                    "docgen.documents.breach_response_plan"),
+        "budget_ms": 15,
+        "forbidden": ("docgen.pdf", "docgen.wordml", "docx", "fontTools"),
+    },
+    "declared_page": {
+        "modules": ("docgen.downloads", "docgen.exports", "docgen.preview", "docgen.render", "docgen.registry"),
+        "budget_ms": 15,
+        "forbidden": ("docgen.documents", "docgen.pdf", "docgen.wordml", "docx", "fontTools"),
+    },
+    "pdf_export": {
+        "modules": ("docgen.pdf",),
+        "budget_ms": 10,
+        "forbidden": ("fontTools",),
+    },
+    "docx_export": {
+        "modules": ("docgen.wordml",),
+        "budget_ms": 10,
+        "forbidden": ("docx",),
+    },
+}
+
+logger = logging.getLogger(__name__)
+
+_warmup_lock = threading.Lock()
+_warmup_thread = None
+
+
+# Load the PDF and Word writers, parse the font and the Word base package, and
+# render every document type once so the first real export finds warm caches
+def warm_up():
+    from docgen.documents import DOCUMENT_TYPES, get_document_type
+    from docgen.metrics import metrics
+    from docgen.render import render_bytes
+
+    with metrics.timed("warmup"):
+        for doc_type in DOCUMENT_TYPES:
+            doc = get_document_type(doc_type)
+            outline = doc.generate(doc.default_inputs())
+            for fmt in ("pdf", "docx"):
+                render_bytes(outline, fmt)
+
+
+# DOCGEN_WARMUP_DELAY in seconds; a value that is not a finite, non-negative
+# number is logged and the default used, so a typo cannot break a page
+def warmup_delay(environ=os.environ):
+    value = environ.get("DOCGEN_WARMUP_DELAY")
+    if value is None:
+        return DEFAULT_WARMUP_DELAY
+    try:
+        delay = float(value)
+    except ValueError:
+        delay = None
+    if delay is None or not math.isfinite(delay) or delay < 0:
+        logger.warning("Ignoring DOCGEN_WARMUP_DELAY=%r; using %s seconds", value, DEFAULT_WARMUP_DELAY)
+        return DEFAULT_WARMUP_DELAY
+    return delay
+
+
+# Start warming up in a background thread, once per process. Called from the
+# app's pages; DOCGEN_WARMUP=0 turns it off and DOCGEN_WARMUP_DELAY sets the delay.
+def start_warmup(environ=os.environ):
+    global _warmup_thread
+    if environ.get("DOCGEN_WARMUP", "1").lower() in ("0", "false", "no", "off"):
+        return None
+    with _warmup_lock:
+        if _warmup_thread is None:
+            delay = warmup_delay(environ)
+
+            def run():
+                time.sleep(delay)
+                try:
+                    warm_up()
+                except Exception:
+                    # Warming up is an optimization; exports still work without it
+                    logger.exception("docgen warm-up failed")
+
+            _warmup_thread = threading.Thread(target=run, name="docgen-warmup", daemon=True)
+            _warmup_thread.start()
+        return _warmup_thread
+
+
+_MEASURE = """
+import json, sys, time
+started = time.perf_counter()
+import streamlit
+baseline = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+done = time.perf_counter()
+print(json.dumps({{"streamlit_ms": (baseline - started) * 1000, "import_ms": (done - baseline) * 1000,
+                  "loaded": [name for name in {forbidden!r} if name in sys.modules]}}))
+"""
+
+
+# Import a startup step in a fresh interpreter and return its cost and any forbidden modules it loaded
+def measure_step(step, python=sys.executable):
+    code = _MEASURE.format(modules=step["modules"], forbidden=step["forbidden"])
+    env = dict(os.environ, DOCGEN_WARMUP="0", DOCGEN_PROFILE="0")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([python, "-c", code], cwd=root, env=env, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+# Best of `runs` fresh-interpreter measurements for each startup step
+def check_budgets(budgets=IMPORT_BUDGETS, runs=5, scale=1.0):
+    results = {}
+    for name, step in budgets.items():
+        samples = [measure_step(step) for _ in range(runs)]
+        best = min(samples, key=lambda sample: sample["import_ms"])
+        budget = step["budget_ms"] * scale
+        results[name] = {
+            "import_ms": round(best["import_ms"], 2),
+            "budget_ms": budget,
+            "streamlit_ms": round(min(sample["streamlit_ms"] for sample in samples), 1),
+            "forbidden_loaded": sorted(set().union(*(sample["loaded"] for sample in samples))),
+            "ok": best["import_ms"] <= budget and not any(sample["loaded"] for sample in samples),
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m docgen.startup",
+        description="Measure the import cost of each step of the app's startup path against its budget.",
+    )
+    parser.add_argument("-n", "--runs", type=int, default=5, help="fresh interpreters per step; the best is kept")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget, e.g. for slow CI machines")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    results = check_budgets(runs=max(1, args.runs), scale=args.scale)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, result in results.items():
+            status = "ok" if result["ok"] else "OVER BUDGET"
+            print(f"{name:<14}{result['import_ms']:>8.1f} ms  (budget {result['budget_ms']:g} ms)  {status}")
+            if result["forbidden_loaded"]:
+                print(f"{'':<14}loaded too early: {', '.join(result['forbidden_loaded'])}")
+        print(f"{'streamlit':<14}{min(r['streamlit_ms'] for r in results.values()):>8.1f} ms  (not budgeted)")
+    return 0 if all(result["ok"] for result in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+import string
+from collections import namedtuple
+
+from docgen.metrics import metrics
+
+_formatter = string.Formatter()
+
+# A placeholder filled from the generator inputs at render time
+Slot = namedtuple("Slot", "name")
+
+# A template filled with inputs: the title and a tuple of filled sections.
+# Each section holds its heading (or None) and blocks of ("paragraph", text)
+# or ("bullets", items) that the TXT, PDF and Word renderers walk directly.
+Outline = namedtuple("Outline", "title sections")
+FilledSection = namedtuple("FilledSection", "heading blocks")
+
+
+# Split template text into literal strings and slots once, when the template is defined
+def compile_text(text):
+    parts = []
+    for literal, field, _, _ in _formatter.parse(text):
+        if literal:
+            parts.append(literal)
+        if field is not None:
+            parts.append(Slot(field))
+    return tuple(parts)
+
+
+# Names of the slots used by compiled text
+def slot_names(parts):
+    return {part.name for part in parts if part.__class__ is Slot}
+
+
+# Lists are written as comma separated values, everything else as str()
+def format_value(value):
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(item) for item in value)
+    return str(value)
+
+
+def fill_text(parts, values):
+    return "".join(part if part.__class__ is str else format_value(values[part.name]) for part in parts)
+
+
+# A paragraph of text; "\n" in the text is kept as a line break
+class Paragraph:
+    kind = "paragraph"
+
+    def __init__(self, text):
+        self.parts = compile_text(text)
+        self.fields = slot_names(self.parts)
+
+    def fill(self, values):
+        return (self.kind, fill_text(self.parts, values))
+
+
+# A bulleted list with one compiled item per bullet
+class Bullets:
+    kind = "bullets"
+
+    def __init__(self, *items):
+        self.items = tuple(compile_text(item) for item in items)
+        self.fields = set().union(*(slot_names(item) for item in self.items))
+
+    def fill(self, values):
+        return (self.kind, tuple(fill_text(item, values) for item in self.items))
+
+
+# A bulleted list with one bullet per item of a list input or derived slot
+class ListBullets:
+    kind = "bullets"
+
+    def __init__(self, name):
+        self.name = name
+        self.fields = {name}
+
+    def fill(self, values):
+        return (self.kind, tuple(format_value(item) for item in values[self.name]))
+
+
+# A section with an optional heading followed by paragraphs and bullet lists;
+# bullet lists that come out empty are left out
+class Section:
+    def __init__(self, heading, *blocks):
+        self.heading = compile_text(heading) if heading else None
+        self.blocks = blocks
+        self.fields = frozenset(slot_names(self.heading or ()).union(*(block.fields for block in blocks)))
+
+    def fill(self, values):
+        heading = fill_text(self.heading, values) if self.heading else None
+        blocks = tuple(block.fill(values) for block in self.blocks)
+        return FilledSection(heading, tuple(block for block in blocks if block[1] or block[0] != "bullets"))
+
+
+# A document template compiled into a tree of sections.
+# `derived` maps a slot to (input names, function) for values computed from
+# other inputs, e.g. a sentence that depends on a Yes/No answer.
+class Template:
+    def __init__(self, title, *sections, derived=None):
+        self.title = compile_text(title)
+        self.sections = sections
+        self.derived = derived or {}
+        # The form inputs each part of the document depends on
+        self.title_inputs = self._inputs(slot_names(self.title))
+        self.section_inputs = tuple(self._inputs(section.fields) for section in sections)
+        self.fields = self.title_inputs.union(*self.section_inputs)
+
+    def _inputs(self, slots):
+        names = set()
+        for slot in slots:
+            names.update(self.derived[slot][0] if slot in self.derived else (slot,))
+        return frozenset(names)
+
+    # Add the derived slot values to the inputs
+    def resolve(self, inputs):
+        if not self.derived:
+            return inputs
+        values = dict(inputs)
+        for slot, (names, derive) in self.derived.items():
+            values[slot] = derive(*(inputs[name] for name in names))
+        return values
+
+    def fill(self, inputs):
+        with metrics.timed("generate"):
+            values = self.resolve(inputs)
+            return Outline(fill_text(self.title, values), tuple(section.fill(values) for section in self.sections))
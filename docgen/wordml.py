@@ -0,0 +1,118 @@
+import functools
+import os
+import re
+import struct
+import zipfile
+import zlib
+
+# Only word/document.xml changes between exports; every other part of the
+# base package is compressed once and spliced into each zip unchanged
+DOCUMENT_PART = "word/document.xml"
+
+# Fixed zip timestamp (1980-01-01 00:00) so identical documents are identical bytes
+_DOS_TIME = 0
+_DOS_DATE = (1 << 5) | 1
+
+# Characters that are not allowed in XML 1.0 documents
+_INVALID_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+
+
+# The Word package every export is built on: DOCGEN_DOCX_TEMPLATE, or the
+# default template shipped with python-docx (styles, numbering, theme)
+def template_path():
+    path = os.environ.get("DOCGEN_DOCX_TEMPLATE")
+    if path:
+        return path
+    import docx
+
+    return os.path.join(os.path.dirname(docx.__file__), "templates", "default.docx")
+
+
+def _compress(data):
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _local_header(name, crc, compressed_size, size):
+    return struct.pack("<4s5H3L2H", b"PK\x03\x04", 20, 0, zipfile.ZIP_DEFLATED, _DOS_TIME, _DOS_DATE,
+                       crc, compressed_size, size, len(name), 0) + name
+
+
+def _central_header(name, crc, compressed_size, size, offset):
+    return struct.pack("<4s6H3L5H2L", b"PK\x01\x02", 20, 20, 0, zipfile.ZIP_DEFLATED, _DOS_TIME, _DOS_DATE,
+                       crc, compressed_size, size, len(name), 0, 0, 0, 0, 0, offset) + name
+
+
+# The base package, parsed and compressed once per process: the local entries
+# of every static part, their central directory records, and the document.xml
+# markup around the body content (namespaces and section properties)
+class BasePackage:
+    def __init__(self, path):
+        with zipfile.ZipFile(path) as package:
+            parts = [(info.filename, package.read(info.filename)) for info in package.infolist()]
+        entries, central = [], []
+        offset = 0
+        document = None
+        for filename, data in parts:
+            if filename == DOCUMENT_PART:
+                document = data.decode("utf-8")
+                continue
+            name = filename.encode("utf-8")
+            crc, compressed = zlib.crc32(data), _compress(data)
+            entry = _local_header(name, crc, len(compressed), len(data)) + compressed
+            central.append(_central_header(name, crc, len(compressed), len(data), offset))
+            entries.append(entry)
+            offset += len(entry)
+        self.entries = b"".join(entries)
+        self.central = b"".join(central)
+        self.count = len(parts)
+
+        body = document.index("<w:body>") + len("<w:body>")
+        section = re.search(r"<w:sectPr\b.*</w:sectPr>", document, re.S)
+        self.document_head = document[:body]
+        self.document_tail = (section.group(0) if section else "") + "</w:body></w:document>"
+
+    # Assemble a complete .docx around the given document.xml
+    def package(self, document_xml):
+        name = DOCUMENT_PART.encode("utf-8")
+        crc, compressed = zlib.crc32(document_xml), _compress(document_xml)
+        offset = len(self.entries)
+        entry = _local_header(name, crc, len(compressed), len(document_xml)) + compressed
+        central = self.central + _central_header(name, crc, len(compressed), len(document_xml), offset)
+        end = struct.pack("<4s4H2LH", b"PK\x05\x06", 0, 0, self.count, self.count, len(central),
+                          offset + len(entry), 0)
+        return b"".join((self.entries, entry, central, end))
+
+
+@functools.lru_cache(maxsize=1)
+def base_package():
+    return BasePackage(template_path())
+
+
+def _text(text):
+    return _INVALID_XML.sub("", text).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+# One w:p element; "\n" in the text becomes a line break
+def _paragraph(text, style=None):
+    properties = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ""
+    if not text:
+        return f"<w:p>{properties}</w:p>"
+    runs = "<w:br/>".join(f'<w:t xml:space="preserve">{_text(line)}</w:t>' for line in text.replace("\r\n", "\n").split("\n"))
+    return f"<w:p>{properties}<w:r>{runs}</w:r></w:p>"
+
+
+# Function to generate the bytes of a Word (docx) version of a document outline
+def render_outline_docx(outline):
+    base = base_package()
+    body = [_paragraph(outline.title, "Title")]
+    for section in outline.sections:
+        if section.heading:
+            body.append(_paragraph(section.heading, "Heading1"))
+        for kind, value in section.blocks:
+            if kind == "bullets":
+                body.extend(_paragraph(item, "ListBullet") for item in value)
+            else:
+                body.append(_paragraph(value))
+    document = base.document_head + "".join(body) + base.document_tail
+    return base.package(document.encode("utf-8"))
@@ -0,0 +1,87 @@
+import streamlit as st
+import datetime
+from docgen.bundle import BUNDLE_TYPES, SHARED_FIELDS, bundle_inputs, spool_bundle
+from docgen.cache import file_cache, input_hash
+from docgen.clauses import clause_library
+from docgen.documents import get_document_type
+from docgen.downloads import export_downloads, exports_started, start_exports
+from docgen.metrics import metrics
+from docgen.registry import OPTION_SOURCES
+from docgen.startup import start_warmup
+
+# Choices of the fields that take one of a few values
+CHOICES = {"third_party_sharing": ["Yes", "No"]}
+
+# Widget for one document field, chosen from its choices or the type of its default value
+def field_input(doc, doc_type, field, default):
+    label = field.replace("_", " ").capitalize()
+    key = f"bundle.{doc_type}.{field}"
+    if isinstance(default, datetime.date):
+        return st.date_input(label, value=default, key=key)
+    if isinstance(default, (int, float)) and not isinstance(default, bool):
+        return st.number_input(label, value=default, min_value=0, key=key)
+    if field in CHOICES:
+        options = CHOICES[field]
+        return st.radio(label, options, index=options.index(default), horizontal=True, key=key)
+    if field in OPTION_SOURCES:
+        options = dict(OPTION_SOURCES[field]())
+        return st.multiselect(label, list(options), default=default, format_func=options.get, key=key)
+    if field in doc.LIST_FIELDS:
+        return st.text_input(f"{label} (separated by ';')", value="; ".join(default), key=key)
+    if len(str(default)) > 60:
+        return st.text_area(label, value=default, key=key)
+    return st.text_input(label, value=default, key=key)
+
+# Streamlit app
+def app():
+    st.title("Compliance Bundle")
+
+    st.write("Generate the Privacy Policy, Terms and Conditions, Privacy Impact Assessment and Data Breach Response "
+             "Plan for one company and download them together as a single zip file.")
+
+    # Details shared by every document in the bundle
+    laws = clause_library().jurisdictions
+    shared = {
+        "company_name": st.text_input("Company Name", value="My Company"),
+        "website_url": st.text_input("Website URL", value="https://www.mycompany.com"),
+        "contact_email": st.text_input("Contact Email", value="info@mycompany.com"),
+        "jurisdiction": st.text_input("Governing Law & Jurisdiction", value="New York, USA"),
+        "effective_date": st.date_input("Effective Date"),
+        "jurisdictions": st.multiselect("Applicable privacy and consumer laws", list(laws), format_func=laws.get),
+    }
+
+    # Every other field starts from the form defaults and can be changed per document
+    overrides = {}
+    for doc_type in BUNDLE_TYPES:
+        doc = get_document_type(doc_type)
+        with st.expander(f"Customize {doc.TITLE}"):
+            overrides[doc_type] = {
+                field: field_input(doc, doc_type, field, default)
+                for field, default in doc.default_inputs().items()
+                if field not in SHARED_FIELDS
+            }
+
+    formats = st.multiselect("Formats to include", ["txt", "pdf", "docx"], default=["pdf", "docx"])
+
+    if formats:
+        try:
+            documents = bundle_inputs(shared, overrides)
+        except ValueError as e:
+            st.error(f"Could not build the bundle: {e}")
+            return
+        digest = input_hash([documents, formats])
+
+        # The zip is built in the background, member by member into a spooled file,
+        # as soon as the details change; edits made meanwhile cancel it if it has not started.
+        # It is kept on disk only and downloaded from an open file.
+        renders = {"zip": lambda: spool_bundle(documents, formats)}
+        if not exports_started("bundle", digest):
+            start_exports("bundle", digest, renders, cache=file_cache)
+        export_downloads("bundle", digest, [
+            ("zip", "Download compliance bundle", f"{shared['company_name']}_compliance_bundle.zip", "application/zip"),
+        ], cache=file_cache, store=None)
+
+if __name__ == "__main__":
+    start_warmup()
+    with metrics.timed("rerun", doc_type="bundle"):
+        app()
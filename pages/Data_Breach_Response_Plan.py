@@ -1,74 +1,57 @@
 import streamlit as st
-from io import BytesIO
-from fpdf import FPDF
-from docx import Document
+from docgen.downloads import export_downloads, start_exports
+from docgen.deadlines import incident_register, rule_table, upcoming
+from docgen.cache import input_hash
+from docgen.documents.breach_response_plan import TEMPLATE, generate_response_plan
+from docgen.preview import session_preview
+from docgen.render import render_pdf, render_word
+from docgen.metrics import metrics
+from docgen.startup import start_warmup
 import datetime
 
-# Function to generate the Data Breach Response Plan content
-def generate_response_plan(details):
-    content = f"""
-    Data Breach Response Plan
-
-    1. Incident Overview:
-    Incident Type: {details['incident_type']}
-    Date of Breach: {details['breach_date']}
-    Affected Systems: {details['affected_systems']}
-    Description: {details['description']}
-
-    2. Data Affected:
-    Types of Data Affected: {details['data_affected']}
-
-    3. Detection and Response:
-    How was the breach detected: {details['detection_method']}
-    Immediate Response: {details['immediate_response']}
-
-    4. Mitigation Steps:
-    Mitigation Actions: {details['mitigation_steps']}
-
-    5. Communication:
-    Internal Communication Plan: {details['internal_communication']}
-    External Communication Plan (e.g., authorities, customers): {details['external_communication']}
-
-    6. Preventive Measures:
-    Steps to prevent future breaches: {details['preventive_measures']}
-    
-    7. Assigned Responsibility:
-    Assigned Team/Person: {details['responsible_person']}
-
-    8. Review and Improvement:
-    Future Improvements and Lessons Learned: {details['improvements']}
-    
-    9. Conclusion:
-    Summary of Actions Taken: {details['summary']}
-    """
-    return content
-
-# Function to generate a PDF version of the Data Breach Response Plan
-def generate_pdf(content):
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    pdf.multi_cell(200, 10, content)
-
-    pdf_output = BytesIO()
-    pdf_data = pdf.output(dest='S').encode('latin1')
-    pdf_output.write(pdf_data)
-    pdf_output.seek(0)
-    return pdf_output
-
-# Function to generate a Word (docx) version of the Data Breach Response Plan
-def generate_word(content):
-    doc = Document()
-    doc.add_heading('Data Breach Response Plan', 0)
-
-    for line in content.split("\n"):
-        doc.add_paragraph(line)
-
-    word_output = BytesIO()
-    doc.save(word_output)
-    word_output.seek(0)
-    return word_output
+# Open incidents across the register and their next notification deadlines
+def incident_panel(details):
+    st.header("Open Incidents")
+    if incident_register is None:
+        st.info("Incident tracking is off. The register is shared by everyone who can open this app, so enable it "
+                "only for a single organisation by setting DOCGEN_INCIDENTS_FILE to the file to keep it in.")
+        return
+    if details["notify_jurisdictions"] and st.button("Add this breach to the incident register"):
+        try:
+            incident_register.add(f"{details['incident_type']} ({details['discovery_date']:%Y-%m-%d})",
+                                  details["discovery_date"], details["notify_jurisdictions"], details["affected_count"])
+        except OSError as e:
+            st.warning(f"Could not save the incident: {e}")
+
+    incidents = incident_register.incidents("open")
+    obligations = upcoming(incidents, limit=50)
+    if not obligations:
+        st.info("No outstanding notifications. Select where affected people live and add a breach to track it.")
+        return
+
+    now = datetime.datetime.now()
+    laws = rule_table().jurisdictions
+    st.dataframe([{
+        "due": f"{obligation.due:%Y-%m-%d %H:%M}",
+        "status": "OVERDUE" if obligation.due < now else f"in {(obligation.due - now).days} days",
+        "incident": obligation.incident_title,
+        "jurisdiction": laws[obligation.rule.jurisdiction],
+        "notify": obligation.rule.recipient,
+        "condition": (f"{obligation.rule.min_affected}+ affected" if obligation.rule.min_affected
+                      else f"up to {obligation.rule.max_affected} affected") if obligation.conditional else "",
+    } for obligation in obligations], hide_index=True, width="stretch")
+
+    sent = st.selectbox("Notification sent", obligations, format_func=lambda obligation: (
+        f"{obligation.incident_title}: {laws[obligation.rule.jurisdiction]}, {obligation.rule.recipient}"))
+    if st.button("Mark as sent"):
+        incident_register.complete(sent.incident_id, sent.rule.id)
+        st.rerun()
+
+    titles = {incident["id"]: incident["title"] for incident in incidents}
+    closing = st.selectbox("Incident", list(titles), format_func=titles.get)
+    if st.button("Close incident"):
+        incident_register.close(closing)
+        st.rerun()
 
 # Streamlit app
 def app():
@@ -79,6 +62,12 @@ def app():
     # Collect user input
     incident_type = st.text_input("Incident Type", value="Unauthorized access")
     breach_date = st.date_input("Date of Breach", value=datetime.date.today())
+    discovery_day = st.date_input("Date the breach was discovered", value=datetime.date.today())
+    discovery_time = st.time_input("Time of discovery", value=datetime.time(0, 0))
+    laws = rule_table().jurisdictions
+    notify_jurisdictions = st.multiselect("Where do affected people live?", list(laws), format_func=laws.get,
+                                          help="Adds the notification deadlines of each jurisdiction to the plan.")
+    affected_count = st.number_input("Number of people affected (0 if not known yet)", min_value=0, value=0, step=1)
     affected_systems = st.text_area("Affected Systems", value="Customer database, Financial records")
     description = st.text_area("Incident Description", value="An unauthorized party accessed customer data.")
     data_affected = st.text_area("Types of Data Affected", value="Personal information, Financial data")
@@ -107,42 +96,43 @@ def app():
         "preventive_measures": preventive_measures,
         "responsible_person": responsible_person,
         "improvements": improvements,
-        "summary": summary
+        "summary": summary,
+        "discovery_date": datetime.datetime.combine(discovery_day, discovery_time),
+        "notify_jurisdictions": notify_jurisdictions,
+        "affected_count": affected_count,
     }
 
+    # Live preview; only the sections whose inputs changed are re-rendered
+    preview = session_preview(st.session_state, "preview.breach_response_plan", TEMPLATE)
+    content = preview.update(details)
+    st.subheader("Preview")
+    st.text_area("Response Plan", value=content, height=400, disabled=True)
+
+    # Exports are rendered in the background and shared through the render cache
+    digest = input_hash(details)
+
     if st.button("Generate Response Plan"):
         # Generate the data breach response plan content
-        content = generate_response_plan(details)
-
-        # Display the data breach response plan content
-        st.subheader("Generated Data Breach Response Plan")
-        st.text_area("Response Plan", value=content, height=400)
-
-        # Download options for TXT
-        st.download_button(
-            label="Download as TXT",
-            data=content.encode("utf-8"),  # Encode as utf-8 string
-            file_name=f"Data_Breach_Response_Plan_{incident_type}.txt",
-            mime="text/plain"
-        )
-
-        # Download options for PDF
-        pdf = generate_pdf(content)
-        st.download_button(
-            label="Download as PDF",
-            data=pdf,
-            file_name=f"Data_Breach_Response_Plan_{incident_type}.pdf",
-            mime="application/pdf"
-        )
-
-        # Download options for Word
-        word_doc = generate_word(content)
-        st.download_button(
-            label="Download as Word",
-            data=word_doc,
-            file_name=f"Data_Breach_Response_Plan_{incident_type}.docx",
-            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-        )
+        outline = generate_response_plan(details)
+
+        # Render the exports in the background; the page keeps responding meanwhile
+        start_exports("breach_response_plan", digest, {
+            "txt": lambda: content.encode("utf-8"),
+            "pdf": lambda: render_pdf(outline),
+            "docx": lambda: render_word(outline),
+        })
+
+    # Download buttons once the exports are ready, with their progress until then
+    export_downloads("breach_response_plan", digest, [
+        ("txt", "Download as TXT", f"Data_Breach_Response_Plan_{incident_type}.txt", "text/plain"),
+        ("pdf", "Download as PDF", f"Data_Breach_Response_Plan_{incident_type}.pdf", "application/pdf"),
+        ("docx", "Download as Word", f"Data_Breach_Response_Plan_{incident_type}.docx",
+         "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+    ])
+
+    incident_panel(details)
 
 if __name__ == "__main__":
-    app()
\ No newline at end of file
+    start_warmup()
+    with metrics.timed("rerun", doc_type="breach_response_plan"):
+        app()
\ No newline at end of file
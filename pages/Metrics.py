@@ -0,0 +1,92 @@
+import streamlit as st
+from docgen.artifacts import artifact_store
+from docgen.cache import file_cache, render_cache
+from docgen.jobs import export_jobs
+from docgen.metrics import controls_enabled, metrics, profiler
+
+# Streamlit app
+def app():
+    st.title("Performance Metrics")
+
+    st.write("Timings of each stage of document generation across all sessions of this app process, "
+             "with output sizes and render cache outcomes.")
+
+    if st.button("Refresh"):
+        st.rerun()
+
+    st.header("Stage timings")
+    st.caption("rerun: whole page script, preview: live preview text, generate: document outline, "
+               "pdf / pdf_layout / docx / txt: rendering, copy: buffer copies, export: download incl. cache lookup, "
+               "background_export / export_queue: background render and its wait for a worker. "
+               "p50 and p95 are histogram bucket bounds.")
+    stages = metrics.stage_rows()
+    if stages:
+        st.dataframe(stages, width="stretch")
+    else:
+        st.info("No documents generated yet.")
+
+    st.header("Output sizes")
+    sizes = metrics.size_rows()
+    if sizes:
+        st.dataframe(sizes, width="stretch")
+
+    st.header("Render cache")
+    st.dataframe(metrics.export_rows(), width="stretch")
+    st.json(render_cache.stats())
+
+    st.header("Download artifacts")
+    st.caption("Documents held for each session's downloads; beyond the memory budget they are spilled to disk.")
+    st.json(artifact_store.stats())
+
+    st.header("Zip exports")
+    st.caption("Compliance bundles and bulk PIA reports, kept on disk between downloads; each download is read "
+               "into Streamlit's media storage.")
+    st.json(file_cache.stats())
+
+    st.header("Background exports")
+    st.caption("Exports rendered off the page script; identical requests share a job and superseded ones are "
+               "cancelled before they start.")
+    st.json(export_jobs.stats())
+
+    st.header("Sampling profiler")
+    st.write("Samples the stacks of every thread in this process while switched on.")
+    if controls_enabled:
+        enabled = st.toggle("Profiler running", value=profiler.running)
+        if enabled and not profiler.running:
+            profiler.start()
+        elif not enabled and profiler.running:
+            profiler.stop()
+    else:
+        st.caption(f"Profiler {'running' if profiler.running else 'stopped'}. Set DOCGEN_METRICS_CONTROLS=1 to "
+                   "switch it and reset the figures from this page; they are shared by every visitor.")
+    st.write(f"{profiler.samples} samples")
+    if profiler.samples:
+        st.dataframe(profiler.top(25), width="stretch")
+        st.download_button(
+            label="Download folded stacks",
+            data=profiler.folded(),
+            file_name="docgen_profile.folded",
+            mime="text/plain",
+        )
+    if controls_enabled and st.button("Reset profile"):
+        profiler.reset()
+        st.rerun()
+
+    st.header("Export")
+    st.download_button(
+        label="Download Prometheus metrics",
+        data=metrics.prometheus_text(),
+        file_name="docgen_metrics.prom",
+        mime="text/plain",
+    )
+    if not controls_enabled:
+        return
+    if metrics.dump_path and st.button(f"Write {metrics.dump_path}"):
+        metrics.dump()
+        st.success(f"Metrics written to {metrics.dump_path}")
+    if st.button("Reset metrics"):
+        metrics.reset()
+        st.rerun()
+
+if __name__ == "__main__":
+    app()
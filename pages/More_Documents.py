@@ -0,0 +1,109 @@
+import streamlit as st
+from docgen.downloads import export_downloads, start_exports
+from docgen.cache import input_hash
+from docgen.preview import session_preview
+from docgen.registry import document_registry
+from docgen.render import render_pdf, render_word
+from docgen.metrics import metrics
+from docgen.revisions import revision_store
+from docgen.startup import start_warmup
+
+# Download button label and mime type of each export format
+EXPORTS = {
+    "txt": ("Download as TXT", "text/plain"),
+    "pdf": ("Download as PDF", "application/pdf"),
+    "docx": ("Download as Word", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+}
+
+
+# The form widget of one declared field, keyed per document type so fields of
+# the same name in different types do not share their state
+def field_input(doc_type, field, default):
+    key = f"{doc_type}.{field.name}"
+    options = list(field.options or ())
+    if field.type == "textarea":
+        return st.text_area(field.label, value=default, help=field.help, key=key)
+    if field.type == "date":
+        return st.date_input(field.label, value=default, help=field.help, key=key)
+    if field.type == "number":
+        return st.number_input(field.label, value=default, min_value=field.minimum,
+                               max_value=field.maximum, help=field.help, key=key)
+    if field.type == "select":
+        return st.selectbox(field.label, options, index=options.index(default), format_func=field.options.get,
+                            help=field.help, key=key)
+    if field.type == "radio":
+        return st.radio(field.label, options, index=options.index(default), format_func=field.options.get,
+                        help=field.help, key=key)
+    if field.type == "multiselect":
+        return st.multiselect(field.label, options, default=default, format_func=field.options.get,
+                              help=field.help, key=key)
+    if field.type == "list":
+        text = st.text_area(field.label, value="\n".join(default), help=field.help, key=key)
+        return [line.strip() for line in text.splitlines() if line.strip()]
+    return st.text_input(field.label, value=default, help=field.help, key=key)
+
+
+# Streamlit app
+def app():
+    st.title("More Documents")
+
+    st.write("Further document types, each declared as data in docgen/data/documents. Choose one and fill out "
+             "the fields below to generate it.")
+
+    names = document_registry.names()
+    if not names:
+        st.info("No document definitions found.")
+        return
+    doc_type = st.selectbox("Document", names, format_func=document_registry.label)
+    try:
+        doc = document_registry.get(doc_type)
+    except ValueError as e:
+        st.error(f"The definition of this document is invalid: {e}")
+        return
+    if doc.DESCRIPTION:
+        st.write(doc.DESCRIPTION)
+
+    # Collect input into a dictionary
+    details = doc.default_inputs()
+    for field in doc.FIELDS:
+        details[field.name] = field_input(doc_type, field, details[field.name])
+
+    # Live preview; only the sections whose inputs changed are re-rendered
+    preview = session_preview(st.session_state, f"preview.{doc_type}", doc.TEMPLATE)
+    content = preview.update(details)
+    st.subheader("Preview")
+    st.text_area(doc.TITLE, value=content, height=400, disabled=True)
+
+    # Exports are rendered in the background and shared through the render cache
+    digest = input_hash(details)
+
+    if st.button(f"Generate {doc.TITLE}"):
+        outline = doc.generate(details)
+
+        # Keep every generated version in the company's revision history, when enabled
+        if revision_store is not None and details.get("company_name"):
+            try:
+                record, created = revision_store.commit(details["company_name"], doc_type, outline, digest)
+                st.caption(f"Saved as revision {record['revision']}" if created
+                           else f"Unchanged since revision {record['revision']}")
+            except OSError as e:
+                st.warning(f"Could not save this revision: {e}")
+
+        # Render the exports in the background; the page keeps responding meanwhile
+        renders = {
+            "txt": lambda: content.encode("utf-8"),
+            "pdf": lambda: render_pdf(outline),
+            "docx": lambda: render_word(outline),
+        }
+        start_exports(doc_type, digest, {fmt: renders[fmt] for fmt in doc.FORMATS})
+
+    # Download buttons once the exports are ready, with their progress until then
+    stem = doc.file_stem(details)
+    export_downloads(doc_type, digest, [
+        (fmt, EXPORTS[fmt][0], f"{stem}.{fmt}", EXPORTS[fmt][1]) for fmt in doc.FORMATS
+    ])
+
+if __name__ == "__main__":
+    start_warmup()
+    with metrics.timed("rerun", doc_type="declared"):
+        app()
@@ -1,70 +1,67 @@
+import hashlib
 import streamlit as st
-from io import BytesIO
-from fpdf import FPDF
-from docx import Document
-
-# Function to generate the Privacy Impact Assessment content
-def generate_pia_content(answers):
-    content = f"""
-    Privacy Impact Assessment (PIA) Report
-    
-    1. What is the purpose of the project? 
-    Answer: {answers['purpose']}
-
-    2. What types of personal data will be collected? 
-    Answer: {answers['data_types']}
-
-    3. Who will have access to the data? 
-    Answer: {answers['access']}
-
-    4. How will the data be protected? 
-    Answer: {answers['protection']}
-
-    5. How long will the data be retained? 
-    Answer: {answers['retention']}
-
-    6. Are there any risks to data privacy, and how will they be mitigated? 
-    Answer: {answers['risks']}
-
-    7. Additional Comments: 
-    Answer: {answers['comments']}
-    """
-    return content
-
-# Function to generate a PDF version of the report
-def generate_pdf(content):
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    pdf.multi_cell(200, 10, content)
-
-    # Output the PDF as a byte stream
-    pdf_output = BytesIO()
-    pdf_data = pdf.output(dest='S').encode('latin1')
-    pdf_output.write(pdf_data)
-    pdf_output.seek(0)
-    return pdf_output
-
-# Function to generate a Word (docx) version of the report
-def generate_word(content):
-    doc = Document()
-    doc.add_heading('Privacy Impact Assessment (PIA) Report', 0)
-
-    # Split the content into lines and add each line as a paragraph
-    for line in content.split("\n"):
-        doc.add_paragraph(line)
-
-    # Save the document to a BytesIO object
-    word_output = BytesIO()
-    doc.save(word_output)
-    word_output.seek(0)
-    return word_output
+from docgen.cache import file_cache, input_hash
+from docgen.downloads import export_downloads, start_exports
+from docgen.documents.pia import TEMPLATE, generate_pia_content
+from docgen.preview import session_preview
+from docgen.render import render_pdf, render_word
+from docgen.metrics import metrics
+from docgen.startup import start_warmup
+
+# Score many assessments uploaded as one spreadsheet, one project per row
+def bulk_upload():
+    # pandas is only imported once a team switches to bulk mode
+    from docgen.pia_bulk import reports_zip, score_upload, summary_csv
+
+    st.write("Upload a CSV or Excel file with one assessment per row and one column per question: purpose, "
+             "data_types, access, protection, retention, risks and comments, plus an optional project column.")
+    upload = st.file_uploader("Assessments", type=["csv", "xlsx"])
+    if upload is None:
+        return
+
+    # Scoring runs once per uploaded file, not on every rerun
+    file_digest = hashlib.sha256(upload.getvalue()).hexdigest()
+    scored = st.session_state.get("pia_bulk")
+    if scored is None or scored[0] != file_digest:
+        try:
+            with st.spinner("Scoring assessments..."):
+                ranked = score_upload(upload, upload.name)
+        except (ValueError, UnicodeDecodeError) as e:
+            st.error(f"Could not read {upload.name}: {e}")
+            return
+        scored = st.session_state["pia_bulk"] = (file_digest, ranked)
+    ranked = scored[1]
+
+    levels = ranked["level"].value_counts()
+    columns = st.columns(3)
+    for column, level in zip(columns, ("High", "Medium", "Low")):
+        column.metric(f"{level} risk", int(levels.get(level, 0)))
+
+    st.subheader("Ranked assessments")
+    st.dataframe(ranked[["rank", "project", "score", "level", "reasons"]], hide_index=True, width="stretch")
+
+    # Rendering every report takes a while, so it waits for the button. The zip
+    # is written to disk and kept in the disk cache rather than in memory.
+    formats = st.multiselect("Report formats", ["pdf", "docx", "txt"], default=["pdf"])
+    digest = input_hash([file_digest, formats])
+    if st.button(f"Render {len(ranked)} reports", disabled=not formats):
+        start_exports("pia_bulk", digest, {
+            "csv": lambda: summary_csv(ranked),
+            "zip": lambda: reports_zip(ranked, formats),
+        }, cache=file_cache)
+    export_downloads("pia_bulk", digest, [
+        ("csv", "Download ranked summary", "PIA_Summary.csv", "text/csv"),
+        ("zip", "Download all reports", "PIA_Reports.zip", "application/zip"),
+    ], cache=file_cache, store=None)
 
 # Streamlit app
 def app():
     st.title("Privacy Impact Assessment (PIA)")
 
+    if st.radio("Mode", ["Single assessment", "Bulk upload"], horizontal=True) == "Bulk upload":
+        bulk_upload()
+        return
+
     st.write("Please fill out the following questions to complete the Privacy Impact Assessment.")
 
     # Collect user input
@@ -87,41 +84,35 @@ def app():
         "comments": comments,
     }
 
+    # Live preview; only the sections whose inputs changed are re-rendered
+    preview = session_preview(st.session_state, "preview.pia", TEMPLATE)
+    content = preview.update(answers)
+    st.subheader("Preview")
+    st.text_area("PIA Report", value=content, height=400, disabled=True)
+
+    # Exports are rendered in the background and shared through the render cache
+    digest = input_hash(answers)
+
     if st.button("Generate Report"):
         # Generate the PIA content
-        content = generate_pia_content(answers)
-
-        # Display the generated content
-        st.subheader("Generated Privacy Impact Assessment Report")
-        st.text_area("PIA Report", value=content, height=400)
-
-        # Provide options to download the report
-        txt_data = content.encode("utf-8")
-
-        st.download_button(
-            label="Download as TXT",
-            data=txt_data,
-            file_name="PIA_Report.txt",
-            mime="text/plain"
-        )
-
-        # Generate and provide the PDF
-        pdf = generate_pdf(content)
-        st.download_button(
-            label="Download as PDF",
-            data=pdf,
-            file_name="PIA_Report.pdf",
-            mime="application/pdf"
-        )
-
-        # Generate and provide the Word document
-        word_doc = generate_word(content)
-        st.download_button(
-            label="Download as Word",
-            data=word_doc,
-            file_name="PIA_Report.docx",
-            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-        )
+        outline = generate_pia_content(answers)
+
+        # Render the exports in the background; the page keeps responding meanwhile
+        start_exports("pia", digest, {
+            "txt": lambda: content.encode("utf-8"),
+            "pdf": lambda: render_pdf(outline),
+            "docx": lambda: render_word(outline),
+        })
+
+    # Download buttons once the exports are ready, with their progress until then
+    export_downloads("pia", digest, [
+        ("txt", "Download as TXT", "PIA_Report.txt", "text/plain"),
+        ("pdf", "Download as PDF", "PIA_Report.pdf", "application/pdf"),
+        ("docx", "Download as Word", "PIA_Report.docx",
+         "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+    ])
 
 if __name__ == "__main__":
-    app()
\ No newline at end of file
+    start_warmup()
+    with metrics.timed("rerun", doc_type="pia"):
+        app()
\ No newline at end of file
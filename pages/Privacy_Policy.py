@@ -1,105 +1,13 @@
 import streamlit as st
-from io import BytesIO
-from fpdf import FPDF
-from docx import Document
-from datetime import datetime
-
-# Function to generate the full privacy policy text based on inputs
-def generate_privacy_policy(company_name, website_url, contact_email, data_types, collection_methods, usage_purposes,
-                            third_party_sharing, third_party_names, security_measures, user_rights, retention_period, policy_changes):
-    
-    policy = f"""
-    Privacy Policy for {company_name}
-    
-    At {company_name}, accessible from {website_url}, one of our main priorities is the privacy of our visitors. 
-    This Privacy Policy document contains types of information that is collected and recorded by {company_name} 
-    and how we use it.
-
-    If you have additional questions or require more information about our Privacy Policy, do not hesitate to 
-    contact us through email at {contact_email}.
-    
-    ## 1. Information We Collect
-    
-    We collect the following types of information:
-    {', '.join(data_types)}.
-
-    We collect this information through the following methods:
-    {', '.join(collection_methods)}.
-
-    ## 2. How We Use Your Information
-    
-    The information we collect is used for various purposes, including:
-    {', '.join(usage_purposes)}.
-
-    ## 3. Sharing Your Information
-    
-    {f"We share your information with third-party services, including: {', '.join(third_party_names)}." if third_party_sharing == 'Yes' else "We do not share your personal data with third-party services without your consent."}
-
-    ## 4. Data Security Measures
-    
-    We implement the following data security measures to protect your information:
-    {security_measures}.
-    
-    ## 5. Your Data Protection Rights
-    
-    You have the right to request copies of your personal data, rectify any inaccurate information, and request the erasure of your personal data under certain conditions. The rights you are entitled to include:
-    {user_rights}.
-    
-    ## 6. Data Retention
-    
-    We retain personal data for {retention_period}. After this period, we delete or anonymize the data.
-
-    ## 7. Changes to Our Privacy Policy
-    
-    {policy_changes}
-
-    For more detailed information, feel free to contact us at {contact_email}.
-    """
-
-    return policy
-
-# Function to generate PDF version of the privacy policy
-def generate_pdf(privacy_policy):
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    pdf.multi_cell(200, 10, privacy_policy)
-    
-    # Output the PDF as a byte string
-    pdf_output = BytesIO()
-    pdf_data = pdf.output(dest='S').encode('latin1')  # 'S' to return as string
-    pdf_output.write(pdf_data)
-    pdf_output.seek(0)  # Move to the beginning of the file-like object
-    return pdf_output
-
-# Function to generate Word (docx) version of the privacy policy with formatting
-def generate_word(privacy_policy):
-    doc = Document()
-    doc.add_heading('Privacy Policy', 0)
-
-    # Split the policy text into lines and process each line
-    for line in privacy_policy.split("\n"):
-        # Check for lines with markdown-style bold (**text**)
-        if "**" in line:
-            # Split by '**' to identify bold sections
-            parts = line.split("**")
-            paragraph = doc.add_paragraph()
-            for i, part in enumerate(parts):
-                if i % 2 == 0:
-                    # Regular text
-                    paragraph.add_run(part)
-                else:
-                    # Bold text
-                    paragraph.add_run(part).bold = True
-        else:
-            doc.add_paragraph(line)
-
-    # Save the document to a BytesIO object
-    word_output = BytesIO()
-    doc.save(word_output)
-    word_output.seek(0)  # Move to the beginning of the file-like object
-    return word_output
+from docgen.clauses import clause_library
+from docgen.downloads import export_downloads, start_exports
+from docgen.cache import input_hash
+from docgen.documents.privacy_policy import TEMPLATE, generate_privacy_policy
+from docgen.preview import session_preview
+from docgen.render import render_pdf, render_word
+from docgen.metrics import metrics
+from docgen.revisions import revision_store
+from docgen.startup import start_warmup
 
 # Streamlit app
 def app():
@@ -139,6 +47,10 @@ def app():
     st.header("5. User Data Protection Rights")
     user_rights = st.text_area("What are the rights of the users with respect to their data?", 
                                "Right to Access, Right to Rectification, Right to Erasure, Right to Data Portability")
+    laws = clause_library().jurisdictions
+    jurisdictions = st.multiselect("Which data protection laws apply to your users?", list(laws),
+                                   format_func=laws.get,
+                                   help="Adds the rights clauses each law requires to section 5.")
 
     st.header("6. Data Retention")
     retention_period = st.text_input("How long do you retain personal data?", "1 year")
@@ -147,44 +59,62 @@ def app():
     policy_changes = st.text_area("How will you notify users of changes to the privacy policy?", 
                                   "We will notify users via email and update the policy on our website.")
 
-    # Get the current date
-    current_date = datetime.now().strftime("%Y-%m-%d")
+    inputs = {
+        "company_name": company_name,
+        "website_url": website_url,
+        "contact_email": contact_email,
+        "data_types": data_types,
+        "collection_methods": collection_methods,
+        "usage_purposes": usage_purposes,
+        "third_party_sharing": third_party_sharing,
+        "third_party_names": third_party_names,
+        "security_measures": security_measures,
+        "user_rights": user_rights,
+        "retention_period": retention_period,
+        "policy_changes": policy_changes,
+        "jurisdictions": jurisdictions,
+    }
+
+    # Live preview; only the sections whose inputs changed are re-rendered
+    preview = session_preview(st.session_state, "preview.privacy_policy", TEMPLATE)
+    privacy_policy = preview.update(inputs)
+    st.subheader("Preview")
+    st.text_area("Privacy Policy", value=privacy_policy, height=400, disabled=True)
+
+    # Exports are rendered in the background and shared through the render cache
+    digest = input_hash(inputs)
 
     if st.button("Generate Privacy Policy"):
         # Generate the privacy policy
-        privacy_policy = generate_privacy_policy(company_name, website_url, contact_email, data_types, collection_methods, 
-                                                 usage_purposes, third_party_sharing, third_party_names, security_measures, 
-                                                 user_rights, retention_period, policy_changes)
-        
-        # Display the generated policy
-        st.subheader("Generated Privacy Policy")
-        st.text_area("Privacy Policy", value=privacy_policy, height=400)
-
-        # Option to download as .txt file
-        st.download_button(
-            label="Download as .txt",
-            data=privacy_policy,
-            file_name=f"{company_name}_privacy_policy_{current_date}.txt",
-            mime="text/plain",
-        )
-
-        # Option to download as PDF
-        pdf = generate_pdf(privacy_policy)
-        st.download_button(
-            label="Download as PDF",
-            data=pdf,
-            file_name=f"{company_name}_privacy_policy_{current_date}.pdf",
-            mime="application/octet-stream"
-        )
-
-        # Option to download as Word (.docx)
-        word_doc = generate_word(privacy_policy)
-        st.download_button(
-            label="Download as Word",
-            data=word_doc,
-            file_name=f"{company_name}_privacy_policy_{current_date}.docx",
-            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-        )
+        outline = generate_privacy_policy(company_name, website_url, contact_email, data_types, collection_methods, 
+                                          usage_purposes, third_party_sharing, third_party_names, security_measures, 
+                                          user_rights, retention_period, policy_changes, jurisdictions)
+
+        # Keep every generated version in the company's revision history, when enabled
+        if revision_store is not None:
+            try:
+                record, created = revision_store.commit(company_name, "privacy_policy", outline, digest)
+                st.caption(f"Saved as revision {record['revision']}" if created
+                           else f"Unchanged since revision {record['revision']}")
+            except OSError as e:
+                st.warning(f"Could not save this revision: {e}")
+
+        # Render the exports in the background; the page keeps responding meanwhile
+        start_exports("privacy_policy", digest, {
+            "txt": lambda: privacy_policy.encode("utf-8"),
+            "pdf": lambda: render_pdf(outline),
+            "docx": lambda: render_word(outline),
+        })
+
+    # Download buttons once the exports are ready, with their progress until then
+    export_downloads("privacy_policy", digest, [
+        ("txt", "Download as .txt", f"{company_name}_privacy_policy.txt", "text/plain"),
+        ("pdf", "Download as PDF", f"{company_name}_privacy_policy.pdf", "application/pdf"),
+        ("docx", "Download as Word", f"{company_name}_privacy_policy.docx",
+         "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+    ])
 
 if __name__ == "__main__":
-    app()
\ No newline at end of file
+    start_warmup()
+    with metrics.timed("rerun", doc_type="privacy_policy"):
+        app()
\ No newline at end of file
@@ -0,0 +1,60 @@
+import streamlit as st
+from docgen.documents import get_document_type
+from docgen.render import render_text
+from docgen.revisions import redline_html, redline_text, revision_store
+
+# Streamlit app
+def app():
+    st.title("Revision History")
+
+    st.write("Every generated Privacy Policy and Terms and Conditions is kept as a revision per company. "
+             "Compare any two revisions to see what changed.")
+
+    if revision_store is None:
+        st.info("Revision history is off. It keeps every company's documents in one store that anyone who can "
+                "open this app can read, so enable it only for a single organisation by setting "
+                "DOCGEN_REVISIONS_DIR to the directory to keep the revisions in.")
+        return
+
+    companies = revision_store.companies()
+    if not companies:
+        st.info("No revisions yet. Generate a document to start its history.")
+        return
+
+    company = st.selectbox("Company", sorted(companies))
+    doc_type = st.selectbox("Document", companies[company],
+                            format_func=lambda name: get_document_type(name).TITLE)
+    revisions = revision_store.revisions(company, doc_type)
+    labels = {record["revision"]: f"Revision {record['revision']} ({record['created']})" for record in revisions}
+    numbers = list(labels)
+
+    if len(numbers) < 2:
+        st.info("Only one revision so far.")
+        st.text_area("Revision 1", value=render_text(revision_store.load(company, doc_type, numbers[0])),
+                     height=400, disabled=True)
+        return
+
+    old = st.selectbox("Compare revision", numbers, index=len(numbers) - 2, format_func=labels.get)
+    new = st.selectbox("with revision", numbers, index=len(numbers) - 1, format_func=labels.get)
+
+    changes = revision_store.diff(company, doc_type, old, new)
+    changed = [change for change in changes if change.status != "unchanged"]
+    st.subheader("Changes")
+    if not changed:
+        st.write("No differences.")
+    else:
+        st.caption(f"{len(changed)} of {len(changes)} sections changed. "
+                   "Deleted text is struck through, inserted text is underlined.")
+        st.markdown(redline_html(changes), unsafe_allow_html=True)
+        st.download_button(
+            label="Download redline",
+            data=redline_text(changes),
+            file_name=f"{company}_{doc_type}_r{old}_r{new}_redline.txt",
+            mime="text/plain",
+        )
+
+    with st.expander(f"Full text of revision {new}"):
+        st.text(render_text(revision_store.load(company, doc_type, new)))
+
+if __name__ == "__main__":
+    app()
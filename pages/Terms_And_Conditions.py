@@ -1,72 +1,13 @@
 import streamlit as st
-from io import BytesIO
-from fpdf import FPDF
-from docx import Document
-
-# Function to generate the Terms and Conditions content based on user input
-def generate_terms_content(details):
-    content = f"""
-    Terms and Conditions
-
-    Effective Date: {details['effective_date']}
-    
-    1. Introduction
-    Welcome to {details['company_name']}! These terms and conditions outline the rules and regulations for the use of {details['company_name']}'s Website, located at {details['website_url']}.
-    
-    2. Intellectual Property Rights
-    Unless otherwise stated, {details['company_name']} and/or its licensors own the intellectual property rights for all material on {details['website_url']}. All intellectual property rights are reserved. You may access this from {details['website_url']} for your own personal use subjected to restrictions set in these terms and conditions.
-    
-    3. Restrictions
-    You are specifically restricted from all of the following:
-    - Publishing any Website material in any other media;
-    - Selling, sublicensing, and/or otherwise commercializing any Website material;
-    - Publicly performing and/or showing any Website material;
-    - Using this Website in any way that is or may be damaging to this Website;
-    - Using this Website in any way that impacts user access to this Website;
-    - Engaging in any data mining, data harvesting, data extracting, or any other similar activity in relation to this Website;
-    - Using this Website to engage in any advertising or marketing.
-
-    4. User Content
-    In these Website Standard Terms and Conditions, "User Content" shall mean any audio, video text, images, or other material you choose to display on this Website. By displaying it, you grant {details['company_name']} a non-exclusive, worldwide irrevocable, sub-licensable license to use, reproduce, adapt, publish, translate, and distribute it in any media.
-
-    5. No warranties
-    This Website is provided "as is," with all faults, and {details['company_name']} express no representations or warranties of any kind related to this Website or the materials contained on this Website.
-
-    6. Limitation of liability
-    In no event shall {details['company_name']}, nor any of its officers, directors, or employees, be held liable for anything arising out of or in any way connected with your use of this Website whether such liability is under contract. {details['company_name']} shall not be held liable for any indirect, consequential, or special liability arising out of or in any way related to your use of this Website.
-
-    7. Governing Law & Jurisdiction
-    These Terms will be governed by and interpreted in accordance with the laws of {details['jurisdiction']}, and you submit to the non-exclusive jurisdiction of the state and federal courts located in {details['jurisdiction']} for the resolution of any disputes.
-
-    """
-    return content
-
-# Function to generate a PDF version of the terms and conditions
-def generate_pdf(content):
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    pdf.multi_cell(200, 10, content)
-
-    pdf_output = BytesIO()
-    pdf_data = pdf.output(dest='S').encode('latin1')
-    pdf_output.write(pdf_data)
-    pdf_output.seek(0)
-    return pdf_output
-
-# Function to generate a Word (docx) version of the terms and conditions
-def generate_word(content):
-    doc = Document()
-    doc.add_heading('Terms and Conditions', 0)
-
-    for line in content.split("\n"):
-        doc.add_paragraph(line)
-
-    word_output = BytesIO()
-    doc.save(word_output)
-    word_output.seek(0)
-    return word_output
+from docgen.clauses import clause_library
+from docgen.downloads import export_downloads, start_exports
+from docgen.cache import input_hash
+from docgen.documents.terms import TEMPLATE, generate_terms_content
+from docgen.preview import session_preview
+from docgen.render import render_pdf, render_word
+from docgen.metrics import metrics
+from docgen.revisions import revision_store
+from docgen.startup import start_warmup
 
 # Streamlit app
 def app():
@@ -79,6 +20,9 @@ def app():
     website_url = st.text_input("Website URL", value="https://www.acme.com")
     effective_date = st.date_input("Effective Date")
     jurisdiction = st.text_input("Governing Law & Jurisdiction", value="New York, USA")
+    laws = clause_library().jurisdictions
+    jurisdictions = st.multiselect("Where are your customers?", list(laws), format_func=laws.get,
+                                   help="Adds the consumer protection clauses of each region to the restrictions.")
 
     # Collect input into a dictionary
     details = {
@@ -86,41 +30,47 @@ def app():
         "website_url": website_url,
         "effective_date": effective_date,
         "jurisdiction": jurisdiction,
+        "jurisdictions": jurisdictions,
     }
 
-    if st.button("Generate Terms and Conditions"):
-        # Generate the terms and conditions content
-        content = generate_terms_content(details)
+    # Live preview; only the sections whose inputs changed are re-rendered
+    preview = session_preview(st.session_state, "preview.terms", TEMPLATE)
+    content = preview.update(details)
+    st.subheader("Preview")
+    st.text_area("Terms and Conditions", value=content, height=400, disabled=True)
 
-        # Display the terms and conditions content
-        st.subheader("Generated Terms and Conditions")
-        st.text_area("Terms and Conditions", value=content, height=400)
+    # Exports are rendered in the background and shared through the render cache
+    digest = input_hash(details)
 
-        # Download options for TXT
-        st.download_button(
-            label="Download as TXT",
-            data=content.encode("utf-8"),  # Encode as utf-8 string
-            file_name=f"Terms_and_Conditions_{company_name}.txt",
-            mime="text/plain"
-        )
-
-        # Download options for PDF
-        pdf = generate_pdf(content)
-        st.download_button(
-            label="Download as PDF",
-            data=pdf,
-            file_name=f"Terms_and_Conditions_{company_name}.pdf",
-            mime="application/pdf"
-        )
-
-        # Download options for Word
-        word_doc = generate_word(content)
-        st.download_button(
-            label="Download as Word",
-            data=word_doc,
-            file_name=f"Terms_and_Conditions_{company_name}.docx",
-            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-        )
+    if st.button("Generate Terms and Conditions"):
+        # Generate the terms and conditions content
+        outline = generate_terms_content(details)
+
+        # Keep every generated version in the company's revision history, when enabled
+        if revision_store is not None:
+            try:
+                record, created = revision_store.commit(company_name, "terms", outline, digest)
+                st.caption(f"Saved as revision {record['revision']}" if created
+                           else f"Unchanged since revision {record['revision']}")
+            except OSError as e:
+                st.warning(f"Could not save this revision: {e}")
+
+        # Render the exports in the background; the page keeps responding meanwhile
+        start_exports("terms", digest, {
+            "txt": lambda: content.encode("utf-8"),
+            "pdf": lambda: render_pdf(outline),
+            "docx": lambda: render_word(outline),
+        })
+
+    # Download buttons once the exports are ready, with their progress until then
+    export_downloads("terms", digest, [
+        ("txt", "Download as TXT", f"Terms_and_Conditions_{company_name}.txt", "text/plain"),
+        ("pdf", "Download as PDF", f"Terms_and_Conditions_{company_name}.pdf", "application/pdf"),
+        ("docx", "Download as Word", f"Terms_and_Conditions_{company_name}.docx",
+         "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+    ])
 
 if __name__ == "__main__":
-    app()
\ No newline at end of file
+    start_warmup()
+    with metrics.timed("rerun", doc_type="terms"):
+        app()
\ No newline at end of file
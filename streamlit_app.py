@@ -1,6 +1,21 @@
 import streamlit as st
+from docgen.startup import start_warmup
 
-st.title("🎈 My new app")
+# Landing page: kept free of the document modules and export libraries so the
+# first page load is fast; the exports are warmed up in the background instead
+start_warmup()
+
+st.title("DIY Privacy Templates")
 st.write(
-    "Let's start building! For help and inspiration, head over to [docs.streamlit.io](https://docs.streamlit.io/)."
+    "Generate privacy and compliance documents for your business by filling out a short form. "
+    "Every document can be previewed as you type and downloaded as text, PDF or Word."
 )
+
+st.page_link("pages/Privacy_Policy.py", label="Privacy Policy", icon="🔒")
+st.page_link("pages/Terms_And_Conditions.py", label="Terms and Conditions", icon="📜")
+st.page_link("pages/Privacy_Impact_Assessment.py", label="Privacy Impact Assessment", icon="🔍")
+st.page_link("pages/Data_Breach_Response_Plan.py", label="Data Breach Response Plan", icon="🚨")
+st.page_link("pages/More_Documents.py", label="More Documents (Cookie Policy, Acceptable Use Policy, …)", icon="🗂️")
+st.page_link("pages/Compliance_Bundle.py", label="Compliance Bundle (all documents as one zip)", icon="📦")
+st.page_link("pages/Revision_History.py", label="Revision History (compare saved versions)", icon="🕘")
+st.page_link("pages/Metrics.py", label="Performance Metrics", icon="📈")